@@ -0,0 +1,98 @@
+"""Shared FastAPI dependencies."""
+from dependency_injector.wiring import Provide, inject
+from fastapi import Depends, HTTPException, Request, Response, WebSocket, WebSocketException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.container import Container
+from app.core.config import get_settings
+from app.core.rate_limit import RateLimiter, RateLimitResult
+from app.core.security.token_verifier import TokenVerifier
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+@inject
+async def get_current_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    verifier: TokenVerifier = Depends(Provide[Container.token_verifier]),
+) -> dict:
+    """Claims of the request's bearer access token; 401 when missing or invalid."""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await verifier.verify_access_token(credentials.credentials)
+
+
+async def get_current_user_id(claims: dict = Depends(get_current_claims)) -> str:
+    return claims["sub"]
+
+
+@inject
+async def get_websocket_user_id(
+    websocket: WebSocket,
+    verifier: TokenVerifier = Depends(Provide[Container.token_verifier]),
+) -> str:
+    """
+    User id for a WebSocket handshake. Browsers cannot set headers on one, so
+    the access token may also come as ``?token=``. Closes with 1008 if invalid.
+    """
+    token = websocket.query_params.get("token")
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Not authenticated")
+    try:
+        claims = await verifier.verify_access_token(token)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+    return claims["sub"]
+
+
+def is_admin(user_id: str) -> bool:
+    admins = get_settings().ADMIN_USER_IDS
+    return bool(admins) and user_id in {a.strip() for a in admins.split(",")}
+
+
+def require_admin(user_id: str):
+    if not is_admin(user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+
+
+async def get_admin_user_id(user_id: str = Depends(get_current_user_id)) -> str:
+    require_admin(user_id)
+    return user_id
+
+
+@inject
+async def get_rate_limiter(limiter: RateLimiter = Depends(Provide[Container.rate_limiter])) -> RateLimiter:
+    return limiter
+
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy, uvicorn's proxy_headers has already applied X-Forwarded-For.
+    return request.client.host if request.client else "unknown"
+
+
+def check_rate_limit(result: RateLimitResult):
+    """Raise 429 (with the rate limit headers) when ``result`` refused the request."""
+    if result is not None and not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers=result.headers(),
+        )
+
+
+def rate_limited(route: str):
+    """Dependency limiting ``route`` per client IP, for endpoints used before login."""
+
+    async def dependency(request: Request, response: Response, limiter: RateLimiter = Depends(get_rate_limiter)):
+        result = await limiter.hit(route, f"ip:{client_ip(request)}")
+        check_rate_limit(result)
+        if result is not None:
+            response.headers.update(result.headers())
+
+    return dependency
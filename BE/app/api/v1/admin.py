@@ -0,0 +1,89 @@
+"""Admin-only endpoints."""
+import json
+
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.params import Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from app.api.deps import get_admin_user_id, get_rate_limiter
+from app.container import Container
+from app.core.admission import AdmissionController
+from app.core.config import get_settings
+from app.core.lifecycle import StreamTracker
+from app.core.rate_limit import RateLimiter
+from app.service.chat.batch_runner import BatchRunner
+from app.service.chat.chat_service import ChatService
+from app.service.profiling.profile_store import ProfileStore
+
+router = APIRouter()
+settings = get_settings()
+
+
+def _jsonl_items(body: bytes):
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Reported as an invalid item in the results.
+            yield None
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+@inject
+async def download_profile(
+    profile_id: str,
+    admin_id: str = Depends(get_admin_user_id),
+    profile_store: ProfileStore = Depends(Provide[Container.profile_store]),
+):
+    """Collapsed stacks of a profiled chat request (flamegraph.pl / speedscope)."""
+    profile = await profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found or expired")
+    return PlainTextResponse(
+        profile["collapsed"],
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"',
+            "X-Profile-Samples": str(profile.get("on_cpu_samples", 0)),
+            "X-Profile-Duration": str(profile.get("duration_s", 0)),
+        },
+    )
+
+
+@router.post("/chat/batch")
+@inject
+async def chat_batch(
+    request: Request,
+    concurrency: int = Query(8, ge=1),
+    admin_id: str = Depends(get_admin_user_id),
+    chat_service: ChatService = Depends(Provide[Container.chat_service]),
+    streams: StreamTracker = Depends(Provide[Container.stream_tracker]),
+    admission: AdmissionController = Depends(Provide[Container.admission_controller]),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+):
+    """
+    Run a JSONL body of ``{"conversation_id", "message"}`` items through the
+    live chat pipeline. Streams one JSON result per line as turns finish,
+    then a final ``{"summary": ...}`` line with throughput and stage timings.
+    """
+    if streams.draining:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is shutting down")
+    # Read in full first: while the response streams, Starlette listens on
+    # the same receive channel for disconnects.
+    items = _jsonl_items(await request.body())
+    runner = BatchRunner(
+        chat_service,
+        concurrency=min(concurrency, settings.BATCH_MAX_CONCURRENCY),
+        streams=streams,
+        user_id=admin_id,
+        rate_limiter=limiter,
+        admission=admission,
+    )
+
+    async def results():
+        async for result in runner.run(items):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({"summary": {"run_id": runner.run_id, **runner.stats.summary()}}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson", headers={"X-Batch-Run-ID": runner.run_id})
@@ -1,26 +1,123 @@
 """"API endpoints for chat interactions.
 """
+import json
+import sys
+from uuid import uuid4
+
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, WebSocket, status
 from fastapi.params import Depends
 from fastapi.responses import StreamingResponse
+from app.api.deps import (
+    check_rate_limit,
+    get_current_user_id,
+    get_rate_limiter,
+    get_websocket_user_id,
+    require_admin,
+)
+from app.api.v1.chat_socket import ChatSocket
 from app.container import Container
-from app.schema.chat_schema import ChatRequest
+from app.core.admission import AdmissionController
+from app.core.config import get_settings
+from app.core.lifecycle import StreamTracker
+from app.core.logging import request_id_var
+from app.core.rate_limit import RateLimiter
+from app.core.profiling import RequestProfiler
+from app.schema.chat_schema import ChatEvent, ChatRequest
 from app.service.chat.chat_service import ChatService
+from app.service.profiling.profile_store import ProfileStore
 
 router = APIRouter()
+settings = get_settings()
+
+PROFILE_HEADER = "x-profile"
+
+
+def profiling_requested(http_request: Request) -> bool:
+    return http_request.headers.get(PROFILE_HEADER, "") not in ("", "0") or \
+        http_request.query_params.get("profile", "") not in ("", "0")
+
+
+def to_sse(event: ChatEvent) -> str:
+    """Frame a ChatEvent as a Server-Sent Event.
+
+    Structured events carry JSON; token text is sent verbatim, split across
+    ``data:`` lines so embedded newlines survive the SSE framing.
+    """
+    if event.event == "token":
+        payload = event.data or ""
+    else:
+        payload = json.dumps(event.data, ensure_ascii=False, separators=(",", ":"))
+    lines = "".join(f"data: {line}\n" for line in payload.split("\n"))
+    return f"event: {event.event}\n{lines}\n"
 
 
 @router.post("/")
 @inject
-async def chat(request: ChatRequest,    chat_service: ChatService = Depends(Provide[Container.chat_service])
+async def chat(request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatService = Depends(Provide[Container.chat_service]),
+    user_id: str = Depends(get_current_user_id),
+    profile_store: ProfileStore = Depends(Provide[Container.profile_store]),
+    streams: StreamTracker = Depends(Provide[Container.stream_tracker]),
+    limiter: RateLimiter = Depends(get_rate_limiter),
 ):
-    
+    if streams.draining:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is shutting down",
+            headers={"Retry-After": "1"},
+        )
+    limited = await limiter.hit("chat", user_id, conversation=f"{user_id}:{request.conversation_id}")
+    check_rate_limit(limited)
+    profiler = None
+    headers = limited.headers() if limited is not None else {}
+    if profiling_requested(http_request):
+        require_admin(user_id)
+        profiler = RequestProfiler(interval=settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        profile_id = request_id_var.get() or uuid4().hex
+        # Download from /api/v1/admin/profiles/<id> once the stream has ended.
+        headers["X-Profile-ID"] = profile_id
+
     async def event_gen():
-        async for token in chat_service.handle_user_message(
-            request.conversation_id,
-            request.message
-        ):
-            yield f"data: {token}\n\n"
-    
-    return StreamingResponse(event_gen(), media_type="text/event-stream")
+        if profiler is not None:
+            profiler.start(sys._getframe())
+        try:
+            async for event in chat_service.handle_user_message(
+                request.conversation_id,
+                request.message,
+                user_id=user_id,
+            ):
+                yield to_sse(event)
+        finally:
+            if profiler is not None:
+                profile_store.save_later(profile_id, {
+                    **profiler.stop(),
+                    "user_id": user_id,
+                    "message_chars": len(request.message),
+                })
+
+    return StreamingResponse(streams.track(event_gen()), media_type="text/event-stream", headers=headers)
+
+
+@router.websocket("/ws")
+@inject
+async def chat_ws(
+    websocket: WebSocket,
+    user_id: str = Depends(get_websocket_user_id),
+    chat_service: ChatService = Depends(Provide[Container.chat_service]),
+    streams: StreamTracker = Depends(Provide[Container.stream_tracker]),
+    admission: AdmissionController = Depends(Provide[Container.admission_controller]),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+):
+    """One connection, many conversations; see app/api/v1/chat_socket.py for the protocol."""
+    await ChatSocket(
+        websocket,
+        chat_service,
+        user_id,
+        streams,
+        max_turns=settings.WS_MAX_TURNS_PER_CONNECTION,
+        send_queue_size=settings.WS_SEND_QUEUE_SIZE,
+        admission=admission,
+        rate_limiter=limiter,
+    ).run()
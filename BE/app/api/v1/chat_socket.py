@@ -0,0 +1,212 @@
+"""WebSocket chat transport: many conversations over one connection.
+
+Frames are JSON text in both directions. The client sends
+
+    {"type": "message", "id": "t1", "conversation_id": "c1", "message": "..."}
+    {"type": "cancel", "id": "t1"}
+    {"type": "ping"}
+
+and each turn, identified by the client's ``id``, is answered with the same
+``ChatEvent``\\s the SSE endpoint sends, followed by one terminal frame:
+
+    {"type": "token", "id": "t1", "data": "Your train "}
+    {"type": "data", "id": "t1", "data": {...}}
+    {"type": "end", "id": "t1"}            (or "cancelled" / "error")
+
+Turns run concurrently (up to a per-connection limit, one at a time per
+conversation) and their frames interleave; a single sender task writes them
+so a slow client applies back-pressure to the turns instead of growing memory.
+If that task fails, the connection is closed and its turns cancelled rather
+than left waiting on a queue nobody drains.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.core.admission import ADMIT, REJECT, AdmissionController
+from app.core.lifecycle import StreamTracker
+from app.core.metrics import Counter, Gauge
+from app.core.rate_limit import RateLimiter
+from app.schema.chat_schema import ChatRequest
+from app.service.chat.chat_service import ChatService
+
+logger = logging.getLogger(__name__)
+
+WS_CONNECTIONS = Gauge("chat_ws_connections", "Open chat WebSocket connections.")
+WS_TURNS = Counter(
+    "chat_ws_turns_total",
+    "Chat turns received over WebSocket, by outcome.",
+    labelnames=("result",),
+)
+
+
+def encode(frame: dict) -> str:
+    return json.dumps(frame, ensure_ascii=False, separators=(",", ":"))
+
+
+class ChatSocket:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        chat_service: ChatService,
+        user_id: str,
+        streams: StreamTracker,
+        max_turns: int = 8,
+        send_queue_size: int = 256,
+        admission: Optional[AdmissionController] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.websocket = websocket
+        self.chat_service = chat_service
+        self.user_id = user_id
+        self.streams = streams
+        self.max_turns = max_turns
+        self.admission = admission
+        self.rate_limiter = rate_limiter
+        self.turns: Dict[str, asyncio.Task] = {}
+        # conversation_id -> id of the turn running on it
+        self.busy: Dict[str, str] = {}
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=send_queue_size)
+
+    async def run(self):
+        await self.websocket.accept()
+        WS_CONNECTIONS.inc()
+        sender = asyncio.create_task(self._send_loop())
+        receiver = asyncio.create_task(self._receive_loop())
+        try:
+            done, _ = await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                logger.warning("WebSocket sender stopped, closing the connection: %r", sender.exception())
+                try:
+                    await self.websocket.close(code=1011)
+                except Exception:
+                    pass  # already gone
+            else:
+                receiver.result()
+        finally:
+            receiver.cancel()
+            turns = list(self.turns.values())
+            for task in turns:
+                task.cancel()
+            await asyncio.gather(receiver, *turns, return_exceptions=True)
+            sender.cancel()
+            WS_CONNECTIONS.dec()
+
+    async def _receive_loop(self):
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is None:
+                    await self.error("Expected text frames")
+                    continue
+                await self._dispatch(message["text"])
+        except WebSocketDisconnect:
+            pass
+
+    async def _send_loop(self):
+        while True:
+            frame = await self.outbox.get()
+            await self.websocket.send_text(frame)
+
+    async def send(self, frame: dict):
+        await self.outbox.put(encode(frame))
+
+    async def error(self, detail: str, turn_id: Optional[str] = None):
+        frame = {"type": "error", "detail": detail}
+        if turn_id is not None:
+            frame["id"] = turn_id
+        await self.send(frame)
+
+    async def _dispatch(self, raw: str):
+        try:
+            frame = json.loads(raw)
+        except json.JSONDecodeError:
+            return await self.error("Invalid JSON")
+        if not isinstance(frame, dict):
+            return await self.error("Expected a JSON object")
+
+        kind = frame.get("type")
+        turn_id = frame.get("id")
+        if kind == "message":
+            await self._start_turn(turn_id, frame)
+        elif kind == "cancel":
+            task = self.turns.get(turn_id) if isinstance(turn_id, str) else None
+            if task is not None:
+                task.cancel()
+        elif kind == "ping":
+            await self.send({"type": "pong"})
+        else:
+            await self.error(f"Unknown frame type {kind!r}", turn_id)
+
+    async def _start_turn(self, turn_id, frame: dict):
+        if not isinstance(turn_id, str) or not turn_id:
+            return await self.error("Missing turn id")
+        try:
+            request = ChatRequest.model_validate(frame)
+        except ValidationError:
+            WS_TURNS.labels("rejected").inc()
+            return await self.error("Expected conversation_id and message", turn_id)
+
+        reason = None
+        if self.streams.draining:
+            reason = "Server is shutting down"
+        elif turn_id in self.turns:
+            reason = "Turn id already in use"
+        elif len(self.turns) >= self.max_turns:
+            reason = "Too many turns in flight"
+        elif request.conversation_id in self.busy:
+            reason = "Conversation has a turn in flight"
+        if reason is None and self.rate_limiter is not None:
+            limited = await self.rate_limiter.hit(
+                "chat", self.user_id, conversation=f"{self.user_id}:{request.conversation_id}"
+            )
+            if limited is not None and not limited.allowed:
+                reason = f"Rate limit exceeded, retry in {max(1, round(limited.retry_after))} s"
+        action = ADMIT
+        if reason is None and self.admission is not None:
+            action, _ = self.admission.decide()
+            if action == REJECT:
+                reason = "Server is busy, please retry shortly"
+        if reason is not None:
+            WS_TURNS.labels("rejected").inc()
+            return await self.error(reason, turn_id)
+
+        self.busy[request.conversation_id] = turn_id
+        self.turns[turn_id] = asyncio.create_task(self._turn(turn_id, request, action))
+
+    async def _turn(self, turn_id: str, request: ChatRequest, action: str = ADMIT):
+        if self.admission is None:
+            return await self._run_turn(turn_id, request)
+        with self.admission.turn(action):
+            await self._run_turn(turn_id, request)
+
+    async def _run_turn(self, turn_id: str, request: ChatRequest):
+        result = "failed"
+        try:
+            events = self.chat_service.handle_user_message(
+                request.conversation_id, request.message, user_id=self.user_id
+            )
+            async for event in self.streams.track(events):
+                await self.send({"type": event.event, "id": turn_id, "data": event.data})
+            await self.send({"type": "end", "id": turn_id})
+            result = "completed"
+        except asyncio.CancelledError:
+            result = "cancelled"
+            try:
+                self.outbox.put_nowait(encode({"type": "cancelled", "id": turn_id}))
+            except asyncio.QueueFull:
+                pass
+            raise
+        except Exception as e:
+            logger.error("WebSocket chat turn failed: %s", e, exc_info=True, extra={"turn_id": turn_id})
+            await self.error("Internal error", turn_id)
+        finally:
+            self.turns.pop(turn_id, None)
+            self.busy.pop(request.conversation_id, None)
+            WS_TURNS.labels(result).inc()
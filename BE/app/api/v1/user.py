@@ -1,19 +1,19 @@
 from app.core.security.jwt import JWTManager
 from fastapi import APIRouter, Depends
 from dependency_injector.wiring import inject, Provide
+from app.api.deps import rate_limited
 from app.container import Container
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.dep import get_db
 from app.schema.user_schema import UserCreate, UserResponse
 from app.service.user.user_service import UserService
-from app.core.security.password import passwordManager
 
 from dependency_injector.wiring import inject, Provide
 from fastapi import Depends
 router = APIRouter()
 
 
-@router.post("/signup", response_model=UserResponse)
+@router.post("/signup", dependencies=[Depends(rate_limited("signup"))], response_model=UserResponse)
 @inject
 async def signup(
     payload: UserCreate,
@@ -25,7 +25,7 @@ async def signup(
 
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(rate_limited("login"))])
 @inject
 async def login(
     payload: UserCreate,
@@ -34,11 +34,20 @@ async def login(
 ):
     return await user_service.login(db, payload)
 
-@router.post("/refresh-token")
+@router.post("/refresh-token", dependencies=[Depends(rate_limited("refresh-token"))])
+@inject
 async def refresh_token(
     token: str,
-    db: AsyncSession = Depends(get_db),
     user_service: UserService = Depends(Provide[Container.user_service]),
 
 ):
-    return await user_service.refresh_token(db, token)
+    return await user_service.refresh_token(token)
+
+
+@router.post("/logout", status_code=204)
+@inject
+async def logout(
+    token: str,
+    user_service: UserService = Depends(Provide[Container.user_service]),
+):
+    await user_service.logout(token)
@@ -1,18 +1,71 @@
 # app/container.py
 from dependency_injector import containers, providers
+from redis.asyncio import Redis
 from app.core.security.jwt import JWTManager
-from app.core.security.password import passwordManager
+from app.core.security.password import AsyncPasswordManager
+from app.core.security.token_verifier import TokenVerifier
 from app.repository.auth_repository import AuthRepository
 from app.repository.user_repository import UserRepository
+from app.core.admission import AdmissionController
 from app.core.config import get_settings
+from app.core.rate_limit import RateLimiter
+from app.core.lifecycle import StreamTracker
+from app.db.session import get_session_factory
 from app.service.auth.auth_service import AuthService
+from app.service.auth.refresh_token_store import RefreshTokenStore
+from app.service.archive.transcript_archiver import TranscriptArchiver
 from app.service.user.user_service import UserService
 from app.service.chat.chat_service import ChatService
+from app.service.irctc.irctc_client import IRCTCClient
+from app.service.llm.classify_batcher import ClassifyBatcher
+from app.service.llm.llm_client import LLMClient
+from app.service.llm.llm_service import LLMService
+from app.service.profiling.profile_store import ProfileStore
+from app.service.redis.state_manager import StateManager
+from app.service.trace.recorder import TraceRecorder
+
+
+def load_knn_classifier(**kwargs):
+    # Imported here so numpy is only loaded when an index is configured.
+    from app.service.llm.knn_classifier import KNNIntentClassifier
+
+    return KNNIntentClassifier.load(**kwargs)
+
+
 class Container(containers.DeclarativeContainer):
 
     settings = get_settings()
+    # Infrastructure
+    redis_client = providers.Singleton(
+        Redis,
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        decode_responses=True,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+    )
+    session_factory = providers.Singleton(get_session_factory)
+    state_manager = providers.Singleton(
+        StateManager,
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        cache_entries=settings.STATE_CACHE_MAX_ENTRIES,
+        cache_bytes=settings.STATE_CACHE_MAX_BYTES,
+        cache_ttl=settings.STATE_CACHE_TTL_SECONDS,
+        invalidation_channel=settings.STATE_INVALIDATION_CHANNEL,
+        cluster_nodes=settings.STATE_REDIS_CLUSTER_NODES,
+        shards=settings.STATE_REDIS_SHARDS,
+    )
+    # In-flight chat streams, drained on shutdown.
+    stream_tracker = providers.Singleton(StreamTracker)
+
     # Repositories
-    user_repository = providers.Singleton(UserRepository)
+    user_repository = providers.Singleton(
+        UserRepository,
+        cache_ttl=settings.USER_CACHE_TTL_SECONDS,
+        cache_size=settings.USER_CACHE_MAX_ENTRIES,
+    )
     auth_repository = providers.Singleton(AuthRepository)
 
     # Security
@@ -24,23 +77,116 @@ class Container(containers.DeclarativeContainer):
         refresh_exp_days=settings.REFRESH_TOKEN_EXPIRE_DAYS,
     )
 
-    password_manager = providers.Singleton(passwordManager)
+    token_verifier = providers.Singleton(
+        TokenVerifier,
+        jwt_manager=jwt_manager,
+        max_entries=settings.AUTH_TOKEN_CACHE_SIZE,
+        redis=redis_client,
+    )
+
+    password_manager = providers.Singleton(
+        AsyncPasswordManager,
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+    # LLM
+    llm_client = providers.Singleton(
+        LLMClient,
+        api_url=settings.HF_API_URL,
+        api_key=settings.HF_API_KEY,
+        model_name=settings.HF_MODEL_NAME,
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+    )
+
+    # Sheds new chat turns when this worker or the LLM is overloaded.
+    admission_controller = providers.Singleton(
+        AdmissionController,
+        llm_client=llm_client,
+        max_turns=settings.ADMISSION_MAX_TURNS,
+        degrade_turns=settings.ADMISSION_DEGRADE_TURNS,
+        max_llm_in_flight=settings.ADMISSION_MAX_LLM_IN_FLIGHT,
+        max_llm_latency=settings.ADMISSION_MAX_LLM_LATENCY_SECONDS,
+        retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+    )
+
+    # IRCTC
+    irctc_client = providers.Singleton(
+        IRCTCClient,
+        api_key=settings.IRCTC_API_KEY,
+        host=settings.RAPIDAPI_HOST,
+        base_url=settings.RAPIDAPI_BASE_URL,
+        max_connections=settings.IRCTC_MAX_CONNECTIONS,
+    )
+
+    # One batcher per process so concurrent requests share batches.
+    classify_batcher = providers.Singleton(
+        ClassifyBatcher,
+        llm_client=llm_client,
+        window_ms=settings.LLM_CLASSIFY_BATCH_WINDOW_MS,
+        max_batch_size=settings.LLM_CLASSIFY_MAX_BATCH,
+    )
+
+    knn_classifier = providers.Singleton(
+        load_knn_classifier,
+        path=settings.INTENT_KNN_INDEX_PATH,
+        k=settings.INTENT_KNN_K,
+        threshold=settings.INTENT_KNN_THRESHOLD,
+        multi_ratio=settings.INTENT_KNN_MULTI_RATIO,
+    )
+
+    llm_service = providers.Singleton(
+        LLMService,
+        llm_client=llm_client,
+        batcher=classify_batcher if settings.LLM_CLASSIFY_BATCHING else None,
+        knn=knn_classifier if settings.INTENT_KNN_INDEX_PATH else None,
+    )
+
+    refresh_token_store = providers.Singleton(RefreshTokenStore, redis=redis_client)
+    rate_limiter = providers.Singleton(RateLimiter, redis=redis_client, limits=settings.RATE_LIMITS)
+    profile_store = providers.Singleton(ProfileStore, redis=redis_client, ttl_seconds=settings.PROFILE_TTL_SECONDS)
 
     # Services
+    auth_service = providers.Singleton(
+        AuthService,
+        refresh_repo=auth_repository,
+        jwt_manager=jwt_manager,
+        token_store=refresh_token_store,
+        session_factory=session_factory,
+        token_verifier=token_verifier,
+    )
+
     user_service = providers.Factory(
         UserService,
         repo=user_repository,
-        auth_repository=auth_repository,
-        jwt_manager=jwt_manager,
+        auth_service=auth_service,
         password_manager=password_manager,
     )
 
-    auth_service = providers.Factory(
-        AuthService,
-        auth_repository=auth_repository,
-        jwt_manager=jwt_manager,
+    transcript_archiver = providers.Singleton(
+        TranscriptArchiver,
+        session_factory=session_factory,
+        max_queue=settings.TRANSCRIPT_ARCHIVE_MAX_QUEUE,
+        batch_size=settings.TRANSCRIPT_ARCHIVE_BATCH_SIZE,
+        flush_interval=settings.TRANSCRIPT_ARCHIVE_FLUSH_SECONDS,
+    )
+
+    trace_recorder = providers.Singleton(
+        TraceRecorder,
+        directory=settings.TRACE_RECORD_DIR,
+        sample_rate=settings.TRACE_RECORD_SAMPLE_RATE,
+        salt=settings.TRACE_RECORD_SALT,
     )
 
-    chat_service = providers.Factory(
+    # Clients and pools live as long as the app; see app/core/lifecycle.py.
+    chat_service = providers.Singleton(
         ChatService,
+        state=state_manager,
+        irctc_client=irctc_client,
+        llm_service=llm_service,
+        archiver=transcript_archiver if settings.TRANSCRIPT_ARCHIVE_ENABLED else None,
+        recorder=trace_recorder if settings.TRACE_RECORD_ENABLED else None,
     )
\ No newline at end of file
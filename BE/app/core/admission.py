@@ -0,0 +1,91 @@
+"""Admission control for chat turns.
+
+Under overload, accepting every turn only moves the queue into the LLM and
+IRCTC calls, where all of them then time out together. ``AdmissionController``
+decides for each new turn, before any work is done, from three signals:
+
+- chat turns in flight in this worker,
+- LLM requests in flight (``LLMClient.in_flight``),
+- recent LLM latency (``LLMClient.latency_ewma``, time to first token).
+
+Too many turns in flight rejects the turn (503 with ``Retry-After``). A busy
+or slow LLM degrades it instead: the turn still runs, but the reply is a
+terse template built from the IRCTC result rather than an LLM-formatted
+answer. Turns already running are never touched. A limit of 0 disables it.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from app.core.metrics import Counter, Gauge
+
+if TYPE_CHECKING:
+    from app.service.llm.llm_client import LLMClient
+
+ADMIT = "admit"
+DEGRADE = "degrade"
+REJECT = "reject"
+
+# Set for the turn's task when it was admitted in degraded mode.
+degraded_var: ContextVar[bool] = ContextVar("degraded", default=False)
+
+ADMISSION_TURNS_IN_FLIGHT = Gauge(
+    "chat_admission_turns_in_flight",
+    "Chat turns in flight, as counted by admission control.",
+)
+ADMISSION_SHED = Counter(
+    "chat_admission_shed_total",
+    "Chat turns rejected or degraded by admission control, by action and reason.",
+    labelnames=("action", "reason"),
+)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        llm_client: Optional["LLMClient"] = None,
+        max_turns: int = 0,
+        degrade_turns: int = 0,
+        max_llm_in_flight: int = 0,
+        max_llm_latency: float = 0.0,
+        retry_after: int = 1,
+    ):
+        self.llm = llm_client
+        self.max_turns = max_turns
+        self.degrade_turns = degrade_turns
+        self.max_llm_in_flight = max_llm_in_flight
+        self.max_llm_latency = max_llm_latency
+        self.retry_after = retry_after
+        self.turns = 0
+
+    def decide(self) -> Tuple[str, Optional[str]]:
+        """``(action, reason)`` for a new turn; shed decisions are counted."""
+        action, reason = self._decide()
+        if action != ADMIT:
+            ADMISSION_SHED.labels(action, reason).inc()
+        return action, reason
+
+    def _decide(self) -> Tuple[str, Optional[str]]:
+        if self.max_turns and self.turns >= self.max_turns:
+            return REJECT, "turns"
+        if self.degrade_turns and self.turns >= self.degrade_turns:
+            return DEGRADE, "turns"
+        if self.llm is not None:
+            if self.max_llm_in_flight and self.llm.in_flight >= self.max_llm_in_flight:
+                return DEGRADE, "llm_queue"
+            if self.max_llm_latency and self.llm.latency_ewma >= self.max_llm_latency:
+                return DEGRADE, "llm_latency"
+        return ADMIT, None
+
+    @contextmanager
+    def turn(self, action: str = ADMIT):
+        """Count an admitted turn for as long as it runs (its whole stream)."""
+        self.turns += 1
+        ADMISSION_TURNS_IN_FLIGHT.inc()
+        token = degraded_var.set(action == DEGRADE)
+        try:
+            yield
+        finally:
+            degraded_var.reset(token)
+            self.turns -= 1
+            ADMISSION_TURNS_IN_FLIGHT.dec()
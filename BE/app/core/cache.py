@@ -0,0 +1,146 @@
+"""Small in-process caches."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU cache bounded by entry count where every entry also has an absolute
+    expiry (``time.time()`` seconds). Expired entries are dropped when read.
+    Not thread-safe; meant to be used from the event loop thread.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return default
+        value, expires_at = item
+        if expires_at <= time.time():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        if expires_at is None:
+            expires_at = time.time() + self.ttl if self.ttl is not None else float("inf")
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Snapshot of (key, value) pairs, including not-yet-purged expired ones."""
+        return iter([(key, value) for key, (value, _) in self._data.items()])
+
+    def clear(self):
+        self._data.clear()
+
+
+class NearCache:
+    """
+    LRU cache of values mirrored from a shared store, bounded by entry count
+    and by the total of the sizes given with each value (bytes, roughly).
+    Every entry also has an absolute expiry (``time.time()`` seconds).
+
+    Thread-safe, so a listener thread can ``invalidate`` keys as the store
+    reports writes. A value read from (or written to) the store while an
+    invalidation for its key comes in must not be cached: bracket the store
+    call with ``begin(key)`` and ``commit(...)``/``abort(key)``, and
+    ``commit`` drops the value if the key was invalidated in between.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        # Keys with a store call in progress -> invalidated since begin()
+        self._pending: Dict[Hashable, bool] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, size, expires_at = item
+            if expires_at <= time.time():
+                self._drop(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def begin(self, key: Hashable):
+        with self._lock:
+            self._pending[key] = False
+
+    def commit(self, key: Hashable, value: Any, size: int, expires_at: float) -> bool:
+        """Cache ``value`` unless ``key`` was invalidated since ``begin``; False if not cached."""
+        with self._lock:
+            if self._pending.pop(key, True):
+                self._drop(key)
+                return False
+            self._drop(key)
+            if size > self.max_bytes:
+                return False
+            self._data[key] = (value, size, expires_at)
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+            return True
+
+    def abort(self, key: Hashable):
+        """End a ``begin`` without caching anything; the current entry is dropped."""
+        with self._lock:
+            self._pending.pop(key, None)
+            self._drop(key)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop ``key``; True if an entry was cached."""
+        with self._lock:
+            if key in self._pending:
+                self._pending[key] = True
+            return self._drop(key)
+
+    def clear(self) -> int:
+        """Drop every entry and fail every store call in progress; returns entries dropped."""
+        with self._lock:
+            dropped = len(self._data)
+            self._data.clear()
+            self.bytes = 0
+            for key in self._pending:
+                self._pending[key] = True
+            return dropped
+
+    def _drop(self, key: Hashable) -> bool:
+        item = self._data.pop(key, _MISSING)
+        if item is _MISSING:
+            return False
+        self.bytes -= item[1]
+        return True
@@ -4,27 +4,143 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # App
     APP_ENV: str = "development"
+    # Open upstream/DB connections at startup instead of on the first requests
+    STARTUP_WARMUP: bool = True
+    WARMUP_CONNECTIONS: int = 2
+    WARMUP_TIMEOUT_SECONDS: float = 10.0
+    # How long shutdown waits for in-flight chat streams before closing clients
+    SHUTDOWN_DRAIN_SECONDS: float = 25.0
+
+    # Serving (python -m app.serve)
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    # Worker processes; 0 = one per available core
+    WEB_CONCURRENCY: int = 0
+    # Restart a worker after this many requests (0 = never), +/- up to the jitter
+    WORKER_MAX_REQUESTS: int = 0
+    WORKER_MAX_REQUESTS_JITTER: int = 0
+    # Directory where workers share metrics so /metrics reports all of them;
+    # app.serve sets it (to a temporary directory) when running several workers
+    METRICS_DIR: str = ""
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    # Per-module overrides, e.g. "app.service.llm=DEBUG,sqlalchemy.engine=WARNING"
+    LOG_LEVELS: str = ""
+    LOG_FORMAT: str = "json"  # json | text
+    LOG_QUEUE_SIZE: int = 10000
+    # Fraction of per-token debug events kept when debug logging is on
+    LOG_TOKEN_SAMPLE_RATE: float = 0.01
 
     # IRCTC RapidAPI
     IRCTC_API_KEY: str = ""
     RAPIDAPI_HOST: str = "irctc1.p.rapidapi.com"
+    RAPIDAPI_BASE_URL: str = "https://irctc1.p.rapidapi.com"
+    IRCTC_MAX_CONNECTIONS: int = 50
 
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+    # Async client connections per worker. Commands past it fail rather than
+    # wait (redis-py's default is 100), so it has to cover peak concurrency.
+    REDIS_MAX_CONNECTIONS: int = 1000
+    # Per-worker near cache of conversation state and history, kept coherent
+    # through invalidations published on STATE_INVALIDATION_CHANNEL. Every
+    # worker must agree on enabling it: only enabled workers publish. 0 = off.
+    STATE_CACHE_MAX_ENTRIES: int = 10000
+    STATE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    STATE_CACHE_TTL_SECONDS: float = 300.0
+    STATE_INVALIDATION_CHANNEL: str = "chat:invalidate"
+    # Conversation keyspace across several nodes, "host:port,..." (instead
+    # of REDIS_HOST/REDIS_PORT): seed nodes of a Redis Cluster, or
+    # independent servers that conversations are sharded over client-side.
+    STATE_REDIS_CLUSTER_NODES: str = ""
+    STATE_REDIS_SHARDS: str = ""
 
     # Postgres
     POSTGRES_URI: str = ""
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    # Read-through cache of user rows by email
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
+    # Write-behind transcript archive (conversation_turns)
+    TRANSCRIPT_ARCHIVE_ENABLED: bool = True
+    TRANSCRIPT_ARCHIVE_MAX_QUEUE: int = 10000
+    # Capped so one INSERT stays under asyncpg's 32767 bind parameters (3276 rows)
+    TRANSCRIPT_ARCHIVE_BATCH_SIZE: int = 500
+    TRANSCRIPT_ARCHIVE_FLUSH_SECONDS: float = 1.0
+
+    # Upstream call recording for offline replay (benchmarks/replay_traces.py).
+    # Traces keep user free text (names, addresses) as typed: not PII-free.
+    TRACE_RECORD_ENABLED: bool = False
+    TRACE_RECORD_DIR: str = "traces"
+    # Fraction of conversations recorded, all of their turns
+    TRACE_RECORD_SAMPLE_RATE: float = 0.05
+    # Key for pseudonymising PNRs etc.; random per process when empty
+    TRACE_RECORD_SALT: str = ""
     # HuggingFace LLM
     HF_API_KEY: str = ""
     HF_API_URL: str = "https://router.huggingface.co/v1/chat/completions"
     HF_MODEL_NAME: str = "meta-llama/Llama-3.1-8B-Instruct"
+    LLM_MAX_CONNECTIONS: int = 100
+
+    # Intent classification micro-batching (opt-in)
+    LLM_CLASSIFY_BATCHING: bool = False
+    LLM_CLASSIFY_BATCH_WINDOW_MS: float = 5.0
+    LLM_CLASSIFY_MAX_BATCH: int = 16
+
+    # Local kNN intent classifier (disabled when no index path is set)
+    INTENT_KNN_INDEX_PATH: str = ""
+    INTENT_KNN_K: int = 5
+    INTENT_KNN_THRESHOLD: float = 0.6
+    # Leave a message to the LLM when another domain intent's best matching
+    # example is this close to the winner's (it probably asks for both)
+    INTENT_KNN_MULTI_RATIO: float = 0.75
 
     SECRET_KEY:str =""
     ALGORITHM:str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES:int = 60
     REFRESH_TOKEN_EXPIRE_DAYS:int = 7
+    # Comma-separated user ids allowed to use admin features (profiling)
+    ADMIN_USER_IDS: str = ""
+    # WebSocket chat (/api/v1/chat/ws)
+    WS_MAX_TURNS_PER_CONNECTION: int = 8
+    WS_SEND_QUEUE_SIZE: int = 256
+    # Admission control of chat turns, per worker (0 disables a limit).
+    # Over MAX_TURNS new turns get 503; over the others they are answered
+    # with a template instead of an LLM-formatted reply.
+    ADMISSION_MAX_TURNS: int = 200
+    ADMISSION_DEGRADE_TURNS: int = 120
+    ADMISSION_MAX_LLM_IN_FLIGHT: int = 80
+    ADMISSION_MAX_LLM_LATENCY_SECONDS: float = 8.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+    # Rate limits shared by all workers through Redis, "<route>=<requests>/<seconds>".
+    # <route> is keyed by user id (client IP before login), <route>.conversation
+    # by conversation; routes without a rule are not limited.
+    # "batch" is turns of batch evaluation runs, per user starting them.
+    RATE_LIMITS: str = "chat=30/60,chat.conversation=12/60,login=10/60,signup=5/600,refresh-token=30/60,batch=300/60"
+    # Upper bound on concurrent turns of one batch evaluation run
+    BATCH_MAX_CONCURRENCY: int = 16
+    # Per-request profiling (X-Profile header on chat, admins only)
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILE_TTL_SECONDS: int = 3600
+    # Verified access tokens kept in memory per worker
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+
+    # Password hashing (argon2 in a process pool)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST: int = 102400
+    ARGON2_PARALLELISM: int = 8
     class Config:
         env_file = ".env"
         extra = "ignore"
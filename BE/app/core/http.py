@@ -0,0 +1,21 @@
+"""Helpers for the app-lifetime httpx clients."""
+import asyncio
+import httpx
+
+
+async def open_connections(client: httpx.AsyncClient, url: str, connections: int = 1) -> int:
+    """
+    Put ``connections`` established (TCP + TLS) connections to ``url``'s host
+    into ``client``'s pool by sending concurrent HEAD requests. Any HTTP
+    status counts, since the connection is what is being warmed; returns
+    how many requests got a response (the connections now pooled).
+    """
+    async def head():
+        try:
+            await client.head(url, timeout=10.0)
+            return True
+        except httpx.HTTPError:
+            return False
+
+    results = await asyncio.gather(*(head() for _ in range(max(1, connections))))
+    return sum(results)
@@ -0,0 +1,119 @@
+"""Startup warm-up and graceful shutdown of the app-lifetime services.
+
+The container's clients are singletons that own connection pools (httpx for
+the LLM and RapidAPI, redis, the SQLAlchemy engine). ``warm_up`` fills those
+pools at startup so the first requests after a deploy do not pay for DNS,
+TCP and TLS handshakes; ``close`` releases them once in-flight chat streams,
+tracked by ``StreamTracker``, have finished.
+"""
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict
+
+from app.core.metrics import Gauge
+from app.db.session import dispose_engine, warm_up_pool
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STREAMS = Gauge("chat_active_streams", "Chat SSE streams currently being sent.")
+
+
+class StreamTracker:
+    """Counts in-flight SSE streams so shutdown can wait for them to finish."""
+
+    def __init__(self):
+        self.active = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def track(self, stream: AsyncIterator[str]) -> AsyncIterator[str]:
+        self.active += 1
+        ACTIVE_STREAMS.inc()
+        self._idle.clear()
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+            self.active -= 1
+            ACTIVE_STREAMS.dec()
+            if self.active == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> int:
+        """Stop accepting streams and wait up to ``timeout``; returns how many are left."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.active
+
+
+async def _run_steps(steps: Dict[str, Callable[[], Awaitable]], timeout: float, action: str):
+    async def run(name: str, step: Callable[[], Awaitable]):
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(step(), timeout)
+        except Exception as e:
+            logger.warning("%s %s failed: %r", action, name, e,
+                           extra={"target": name, "duration_ms": round((time.perf_counter() - started) * 1000, 1)})
+            return
+        logger.info("%s %s%s", action, name, "" if result is None else f": {result}",
+                    extra={"target": name, "duration_ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    await asyncio.gather(*(run(name, step) for name, step in steps.items()))
+
+
+async def warm_up(container, connections: int, timeout: float):
+    """
+    Build the chat services and open ``connections`` connections to each
+    upstream. Failures are logged, not raised: a cold pool is slower, not broken.
+    """
+    try:
+        # Instantiates the whole chat graph (and loads the kNN index, if any).
+        container.chat_service()
+    except Exception as e:
+        logger.warning("Building chat services failed: %r", e)
+
+    async def redis_ping():
+        return await container.redis_client().ping()
+
+    async def state_ping():
+        return await asyncio.to_thread(container.state_manager().health_check)
+
+    async def postgres():
+        await warm_up_pool(connections)
+        return connections
+
+    await _run_steps({
+        "redis": redis_ping,
+        "state_redis": state_ping,
+        "postgres": postgres,
+        "llm": lambda: container.llm_client().warm_up(connections),
+        "irctc": lambda: container.irctc_client().warm_up(connections),
+        # Spawning argon2 workers takes a second or so; pay it before the first login.
+        "password_pool": lambda: container.password_manager().warm_up(),
+    }, timeout, "Warm-up")
+
+
+async def close(container, timeout: float = 5.0):
+    """Close the pools opened by ``warm_up`` and by requests."""
+    async def state_close():
+        await asyncio.to_thread(container.state_manager().close)
+
+    async def postgres_close():
+        # Refresh-token audit rows are written in the background; let them land first.
+        await container.auth_service().drain_audit()
+        await dispose_engine()
+
+    await _run_steps({
+        "llm": lambda: container.llm_client().aclose(),
+        "irctc": lambda: container.irctc_client().aclose(),
+        "redis": lambda: container.redis_client().aclose(),
+        "state_redis": state_close,
+        "postgres": postgres_close,
+        "password_pool": lambda: asyncio.to_thread(container.password_manager().shutdown),
+    }, timeout, "Close")
@@ -0,0 +1,161 @@
+"""Structured, non-blocking logging.
+
+Records are put on a bounded in-memory queue by a ``QueueHandler`` and
+formatted and written to stdout by a ``QueueListener`` thread, so a log call
+on the event loop never waits on a terminal or pipe. When the queue is full
+the record is dropped and counted instead of blocking.
+
+Every record carries the id of the HTTP request it was emitted under (see
+``RequestIdMiddleware``), and per-token debug events go through
+``SampledLogger`` so turning on debug output does not mean one write per token.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from app.core.metrics import Counter
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+)
+
+# Attributes every LogRecord has; anything else was passed via ``extra``.
+_RESERVED = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if record.request_id is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve everything that cannot cross to the writer thread, but leave
+        # the final formatting (JSON or text) to it.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class SampledLogger:
+    """
+    Debug logging for per-token events: lets one in every ``1 / rate`` calls
+    through. When debug is off for the logger a call costs one level check.
+    """
+
+    def __init__(self, logger: logging.Logger, rate: float):
+        self.logger = logger
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._calls = 0
+
+    def debug(self, msg: str, *args, **extra):
+        if not self.every or not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        self._calls += 1
+        if self._calls % self.every:
+            return
+        extra["sample_every"] = self.every
+        self.logger.debug(msg, *args, extra=extra)
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """``"app.service.llm=DEBUG,sqlalchemy.engine=WARNING"`` -> {logger: level}."""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(
+    level: str = "INFO",
+    module_levels: str = "",
+    fmt: str = "json",
+    queue_size: int = 10000,
+    stream=None,
+):
+    """Route the root logger through the queue. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(TextFormatter())
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+    for name, module_level in parse_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
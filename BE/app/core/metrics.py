@@ -0,0 +1,420 @@
+"""In-process metrics with Prometheus-compatible semantics.
+
+``render()`` produces the Prometheus text exposition format served on
+``/metrics``. Under ``app.serve`` with several workers each process has its own
+registry; ``MultiProcessCollector`` lets whichever worker is scraped report
+the sum over all of them.
+
+Kept dependency-free and cheap enough to stay on in production: each labelled
+child is created once and cached, and an observation is a bisect plus a few
+integer adds on the event loop thread.
+"""
+import asyncio
+import json
+import logging
+import os
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: workers are not archived concurrently there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+    1.0, 2.5, 5.0, 7.5, 10.0, 30.0,
+)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def collect(self):
+        return list(self._metrics.values())
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter:
+    """Monotonically increasing count, e.g. requests or cache hits."""
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], _CounterChild] = {}
+        if not self.labelnames:
+            # Unlabelled metrics are exported as zero before the first update.
+            self.labels()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values) -> _CounterChild:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._children[key] = _CounterChild()
+        return child
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def children(self):
+        return list(self._children.items())
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class Gauge:
+    """Value that can go up and down, e.g. queue depth or in-flight requests."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], _GaugeChild] = {}
+        if not self.labelnames:
+            # Unlabelled metrics are exported as zero before the first update.
+            self.labels()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values) -> _GaugeChild:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._children[key] = _GaugeChild()
+        return child
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def children(self):
+        return list(self._children.items())
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram:
+    """Histogram with optional labels: ``h.labels("pnr_status").observe(0.4)``."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[Tuple[str, ...], _HistogramChild] = {}
+        if not self.labelnames:
+            # Unlabelled metrics are exported as zero before the first update.
+            self.labels()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values) -> _HistogramChild:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._children[key] = _HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def children(self):
+        return list(self._children.items())
+
+
+# ---- exposition ------------------------------------------------------------
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(registry: MetricsRegistry = REGISTRY, collector: Optional["MultiProcessCollector"] = None) -> str:
+    merged = collector.collect() if collector is not None else None
+    lines = []
+    for metric in registry.collect():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        children = metric.children() if merged is None else sorted(merged.get(metric.name, {}).items())
+        for values, child in children:
+            if metric.type == "histogram":
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), child.counts):
+                    cumulative += count
+                    le = 'le="' + _number(bound) + '"'
+                    lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, values, le)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_labels(metric.labelnames, values)} {_number(child.sum)}")
+                lines.append(f"{metric.name}_count{_labels(metric.labelnames, values)} {child.count}")
+            else:
+                lines.append(f"{metric.name}{_labels(metric.labelnames, values)} {_number(child.value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ---- multi-process ---------------------------------------------------------
+
+def _entries(metric, children) -> list:
+    if metric.type == "histogram":
+        return [[list(v), list(c.counts), c.sum, c.count] for v, c in children]
+    return [[list(v), c.value] for v, c in children]
+
+
+def _snapshot(registry: MetricsRegistry) -> dict:
+    return {metric.name: _entries(metric, metric.children()) for metric in registry.collect()}
+
+
+def _merge(registry: MetricsRegistry, merged: dict, snapshot: dict, gauges: bool = True):
+    """Add ``snapshot`` into ``merged`` (name -> label values -> child)."""
+    for name, entries in snapshot.items():
+        metric = registry.get(name)
+        if metric is None or (metric.type == "gauge" and not gauges):
+            continue
+        children = merged.setdefault(name, {})
+        for entry in entries:
+            values = tuple(entry[0])
+            if metric.type == "histogram":
+                counts = entry[1]
+                if len(counts) != len(metric.buckets) + 1:
+                    continue  # written by a deploy with other buckets
+                child = children.get(values)
+                if child is None:
+                    child = children[values] = _HistogramChild(metric.buckets)
+                child.counts = [a + b for a, b in zip(child.counts, counts)]
+                child.sum += entry[2]
+                child.count += entry[3]
+            else:
+                child = children.get(values)
+                if child is None:
+                    child = children[values] = _GaugeChild()
+                child.value += entry[1]
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MultiProcessCollector:
+    """
+    Metrics of every worker sharing the directory ``path``.
+
+    Each worker writes a snapshot of its registry to ``worker-<pid>.json``
+    every ``flush_seconds`` and whenever it is scraped; ``collect()`` sums all
+    snapshots, so other workers' values are at most one flush old. Counters
+    and histograms keep the totals of workers that have exited (a clean exit
+    folds the last snapshot into ``archive.json``), so they do not go
+    backwards when a worker is recycled. Gauges are summed over the workers
+    still running.
+    """
+
+    ARCHIVE = "archive.json"
+
+    def __init__(self, path: str, registry: MetricsRegistry = REGISTRY, flush_seconds: float = 5.0):
+        self.path = path
+        self.registry = registry
+        self.flush_seconds = flush_seconds
+        self.pid = os.getpid()
+        self.file = os.path.join(path, f"worker-{self.pid}.json")
+        self._task: Optional[asyncio.Task] = None
+        # Set once this worker's totals are in the archive; its file must not come back.
+        self.closed = False
+
+    @contextmanager
+    def _lock(self, shared: bool):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, "archive.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read(self, name: str) -> dict:
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping unreadable metrics file %s: %s", name, e)
+            return {}
+
+    def _write(self, path: str, data: dict):
+        tmp = f"{path}.{self.pid}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def write(self):
+        if self.closed:
+            return
+        self._write(self.file, _snapshot(self.registry))
+
+    def _archive(self, snapshot: dict, file: str):
+        """Fold a worker's counters and histograms into the archive and drop its file."""
+        with self._lock(shared=False):
+            merged: dict = {}
+            _merge(self.registry, merged, self._read(self.ARCHIVE))
+            _merge(self.registry, merged, snapshot, gauges=False)
+            archive = {name: _entries(self.registry.get(name), children.items()) for name, children in merged.items()}
+            self._write(os.path.join(self.path, self.ARCHIVE), archive)
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+
+    def collect(self) -> dict:
+        """Merged children of every metric: ``{name: {label values: child}}``."""
+        self.write()
+        merged: dict = {}
+        with self._lock(shared=True):
+            for name in sorted(os.listdir(self.path)):
+                if name == self.ARCHIVE:
+                    _merge(self.registry, merged, self._read(name), gauges=False)
+                elif name.startswith("worker-") and name.endswith(".json"):
+                    pid = int(name[len("worker-"):-len(".json")])
+                    _merge(self.registry, merged, self._read(name), gauges=pid == self.pid or _alive(pid))
+        return merged
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await asyncio.to_thread(self.write)
+            except OSError as e:
+                logger.warning("Could not write metrics snapshot: %s", e)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        # A file left under this pid by a worker that crashed before it.
+        stale = self._read(os.path.basename(self.file))
+        if stale:
+            await asyncio.to_thread(self._archive, stale, self.file)
+        await asyncio.to_thread(self.write)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop flushing and fold this worker's totals into the archive."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.closed = True
+        await asyncio.to_thread(self._archive, _snapshot(self.registry), self.file)
@@ -0,0 +1,89 @@
+"""ASGI middleware."""
+import json
+from uuid import uuid4
+
+from app.core.admission import REJECT
+from app.core.logging import request_id_var
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+
+class RequestIdMiddleware:
+    """
+    Binds a request id to the logging context for the whole request, including
+    a streamed response body, and echoes it in the ``X-Request-ID`` header.
+    An id sent by the client (or a proxy) is reused.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware``, which would pipe the
+    streamed chat responses through an extra task and memory stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER, request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+class AdmissionMiddleware:
+    """
+    Applies ``AdmissionController`` to chat turns posted over HTTP: rejected
+    turns get an immediate 503 with ``Retry-After``; admitted ones are counted
+    until their streamed response has been sent.
+
+    ``controller`` is a zero-argument callable (the container provider),
+    resolved on the first guarded request so building the app stays cheap.
+    """
+
+    def __init__(self, app, controller, paths=("/api/v1/chat/",)):
+        self.app = app
+        self.provider = controller
+        self.paths = frozenset(paths)
+        self.controller = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        if self.controller is None:
+            self.controller = self.provider()
+        action, reason = self.controller.decide()
+        if action == REJECT:
+            return await self._reject(send, self.controller.retry_after)
+        with self.controller.turn(action):
+            await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(send, retry_after: int):
+        body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
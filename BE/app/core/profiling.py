@@ -0,0 +1,95 @@
+"""Sampling profiler scoped to a single request.
+
+A background thread periodically snapshots the event loop thread's stack with
+``sys._current_frames()`` and keeps only samples taken while the request's own
+frame (the SSE body generator) is on that stack, so other requests served by
+the same loop do not show up. Output is collapsed stacks
+(``outer;inner;leaf count``), which flamegraph.pl and speedscope read.
+
+Work the request hands to other tasks (e.g. ``asyncio.gather`` in multi-intent
+turns) runs outside its frame and is not attributed to it.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Dict, Optional
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _label(code: CodeType) -> str:
+    filename = code.co_filename
+    if filename.startswith(_APP_ROOT):
+        filename = "app" + filename[len(_APP_ROOT):]
+    else:
+        marker = "site-packages" + os.sep
+        index = filename.find(marker)
+        if index >= 0:
+            filename = filename[index + len(marker):]
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+class RequestProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.matched = 0
+        self._labels: Dict[CodeType, str] = {}
+        self._target: Optional[FrameType] = None
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self.duration = 0.0
+
+    def start(self, frame: FrameType):
+        """Profile while ``frame`` is executing on the calling thread."""
+        self._target = frame
+        self._thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="request-profiler")
+        self._thread.start()
+
+    def stop(self) -> dict:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        self._target = None
+        return {
+            "collapsed": self.collapsed(),
+            "samples": self.samples,
+            "on_cpu_samples": self.matched,
+            "interval_ms": self.interval * 1000,
+            "duration_s": round(self.duration, 4),
+        }
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            self.samples += 1
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _label(code)
+                stack.append(label)
+                if frame is self._target:
+                    break
+                frame = frame.f_back
+            else:
+                # Reached the bottom without meeting the request's frame:
+                # the loop was idle or serving someone else.
+                continue
+            self.matched += 1
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
@@ -0,0 +1,173 @@
+"""Rate limiting with GCRA in Redis, one atomic Lua call per request.
+
+Each rule allows ``requests`` per ``period`` seconds, including bursts of up
+to ``requests`` at once. GCRA keeps a single timestamp per key (the
+"theoretical arrival time"), so memory is one short string per active
+client regardless of the limit, and all workers share the same state.
+
+A request can be checked against several keys at once (the user and their
+conversation); it is only counted when every one of them allows it. Rules are
+configured per route as ``RATE_LIMITS``:
+
+    chat=30/60,chat.conversation=12/60,login=10/60
+
+where ``<route>`` is keyed by the caller (user id, or client IP before login)
+and ``<route>.conversation`` by conversation. A route without a rule is not
+limited. If Redis is unreachable requests are let through: a limiter outage
+must not take the chat down with it.
+"""
+import logging
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total",
+    "Requests refused by the rate limiter, by route.",
+    labelnames=("route",),
+)
+RATE_LIMIT_ERRORS = Counter(
+    "rate_limit_errors_total",
+    "Rate limit checks that failed (Redis unavailable) and let the request through.",
+)
+
+# KEYS: one per rule. ARGV: emission interval and period (microseconds) per
+# key. Returns {allowed, remaining_1, reset_us_1, retry_us_1, remaining_2, ...}.
+# Times are microseconds from Redis' clock, so all workers agree on "now".
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local allowed = 1
+local out = {0}
+local tats = {}
+for i = 1, #KEYS do
+    local interval = tonumber(ARGV[2 * i - 1])
+    local period = tonumber(ARGV[2 * i])
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if tat < now then tat = now end
+    local new_tat = tat + interval
+    local retry = new_tat - now - period
+    if retry > 0 then
+        allowed = 0
+        out[#out + 1] = 0
+        out[#out + 1] = tat - now
+        out[#out + 1] = retry
+    else
+        out[#out + 1] = math.floor((period - (new_tat - now)) / interval)
+        out[#out + 1] = new_tat - now
+        out[#out + 1] = 0
+    end
+    tats[i] = new_tat
+end
+if allowed == 1 then
+    for i = 1, #KEYS do
+        redis.call('SET', KEYS[i], string.format('%d', tats[i]), 'PX', math.ceil((tats[i] - now) / 1000))
+    end
+end
+out[1] = allowed
+return out
+"""
+
+
+class Limit(NamedTuple):
+    requests: int
+    period: float
+
+    @property
+    def interval_us(self) -> float:
+        return self.period * 1e6 / self.requests
+
+    @property
+    def period_us(self) -> float:
+        return self.period * 1e6
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the most restrictive key is fully replenished
+    reset: float
+    # Seconds until a refused request would be allowed (0 when allowed)
+    retry_after: float
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def parse_limits(spec: str) -> Dict[str, Limit]:
+    """``"chat=30/60,login=10/60"`` -> {rule: Limit(requests, period_seconds)}."""
+    limits = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        requests, _, period = value.partition("/")
+        try:
+            limit = Limit(int(requests), float(period or 1))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit {item.strip()!r}; expected <route>=<requests>/<seconds>")
+        if limit.requests <= 0 or limit.period <= 0:
+            raise ValueError(f"Invalid rate limit {item.strip()!r}; requests and seconds must be positive")
+        limits[name.strip()] = limit
+    return limits
+
+
+class RateLimiter:
+    PREFIX = "ratelimit:"
+
+    def __init__(self, redis: Redis, limits: str = ""):
+        self.redis = redis
+        self.limits = parse_limits(limits)
+        self.script = redis.register_script(GCRA_SCRIPT)
+
+    def _rules(self, route: str, subject: str, conversation: Optional[str]) -> List[Tuple[str, Limit]]:
+        rules = []
+        if route in self.limits:
+            rules.append((f"{self.PREFIX}{route}:{subject}", self.limits[route]))
+        scoped = f"{route}.conversation"
+        if conversation is not None and scoped in self.limits:
+            rules.append((f"{self.PREFIX}{scoped}:{conversation}", self.limits[scoped]))
+        return rules
+
+    async def hit(self, route: str, subject: str, conversation: Optional[str] = None) -> Optional[RateLimitResult]:
+        """
+        Count one request by ``subject`` (and in ``conversation``) on ``route``.
+        ``None`` when the route has no rules or the check could not be made.
+        """
+        rules = self._rules(route, subject, conversation)
+        if not rules:
+            return None
+        args = []
+        for _, limit in rules:
+            args += [repr(limit.interval_us), repr(limit.period_us)]
+        try:
+            reply = await self.script(keys=[key for key, _ in rules], args=args)
+        except (RedisError, OSError) as e:
+            RATE_LIMIT_ERRORS.inc()
+            logger.warning("Rate limit check failed, allowing request: %s", e, extra={"route": route})
+            return None
+
+        allowed = bool(reply[0])
+        # Report the key closest to its limit (or the one that refused).
+        results = []
+        for i, (_, limit) in enumerate(rules):
+            remaining, reset_us, retry_us = reply[1 + 3 * i: 4 + 3 * i]
+            results.append(RateLimitResult(allowed, limit.requests, int(remaining), reset_us / 1e6, retry_us / 1e6))
+        result = max(results, key=lambda r: (r.retry_after, -r.remaining))
+        if not allowed:
+            RATE_LIMITED.labels(route).inc()
+        return result
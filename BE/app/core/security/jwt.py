@@ -1,4 +1,6 @@
 from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import uuid4
 from jose import JWTError, ExpiredSignatureError, jwt
 from fastapi import HTTPException, status
 
@@ -18,29 +20,49 @@ class JWTManager:
     def _create_token(
         self,
         subject: str,
-        expires_delta: timedelta,
+        expires_at: datetime,
         token_type: str,
+        jti: Optional[str] = None,
+        session_id: Optional[str] = None,
     ) -> str:
-        expire = datetime.now(timezone.utc) + expires_delta
         payload = {
             "sub": subject,
             "type": token_type,
-            "exp": expire,
+            "exp": expires_at,
+            # Unique token id; refresh tokens are tracked and revoked by it.
+            "jti": jti or uuid4().hex,
         }
+        if session_id:
+            # Login session id, shared by a session's access and refresh
+            # tokens (across rotations) so logout can reject all of them.
+            payload["sid"] = session_id
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
 
-    def create_access_token(self, user_id: str) -> str:
+    @property
+    def refresh_ttl(self) -> timedelta:
+        return timedelta(days=self.refresh_exp)
+
+    def create_access_token(self, user_id: str, session_id: Optional[str] = None) -> str:
         return self._create_token(
             subject=user_id,
-            expires_delta=timedelta(minutes=self.access_exp),
+            expires_at=datetime.now(timezone.utc) + timedelta(minutes=self.access_exp),
             token_type="access",
+            session_id=session_id,
         )
 
-    def create_refresh_token(self, user_id: str) -> str:
+    def create_refresh_token(
+        self,
+        user_id: str,
+        jti: Optional[str] = None,
+        expires_at: Optional[datetime] = None,
+        session_id: Optional[str] = None,
+    ) -> str:
         return self._create_token(
             subject=user_id,
-            expires_delta=timedelta(days=self.refresh_exp),
+            expires_at=expires_at or datetime.now(timezone.utc) + self.refresh_ttl,
             token_type="refresh",
+            jti=jti,
+            session_id=session_id,
         )
 
     def decode(self, token: str) -> dict:
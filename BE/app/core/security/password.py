@@ -1,14 +1,156 @@
+import asyncio
+import hashlib
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+
+from app.core.metrics import Gauge, Histogram
+
+HASH_INFLIGHT = Gauge(
+    "password_hash_inflight",
+    "Password hash/verify operations submitted to the pool and not yet finished.",
+)
+HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Password operations waiting for a free pool worker.",
+)
+HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time from submitting a password operation to receiving its result.",
+    labelnames=("operation",),
+)
+
+
 class passwordManager:
 
     pwd_context = CryptContext(
         schemes=["argon2"],
         deprecated="auto"
     )
-    
+
     @staticmethod
     def hash_password( password: str) -> str:
         return passwordManager.pwd_context.hash(password)
     @staticmethod
     def verify_password(password: str, hashed: str) -> bool:
-        return passwordManager.pwd_context.verify(password, hashed)
\ No newline at end of file
+        return passwordManager.pwd_context.verify(password, hashed)
+
+
+def hash_token(token: str) -> str:
+    """Digest for high-entropy secrets such as refresh tokens.
+
+    Tokens are random and long, so a fast digest is enough; argon2 is only
+    needed for low-entropy user passwords.
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+# ---- worker process side ---------------------------------------------------
+
+_worker_context: Optional[CryptContext] = None
+
+
+def _init_worker(time_cost: int, memory_cost: int, parallelism: int):
+    global _worker_context
+    _worker_context = CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+def _hash(password: str) -> str:
+    return _worker_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return _worker_context.verify(password, hashed)
+
+
+def _noop() -> None:
+    return None
+
+
+# ---- event loop side -------------------------------------------------------
+
+class AsyncPasswordManager:
+    """
+    Argon2 hashing off the event loop.
+
+    Work runs in a bounded ProcessPoolExecutor so a burst of logins cannot
+    stall chat streams served by the same worker. When ``max_pending``
+    operations are already in flight new ones are rejected with 503 instead of
+    queueing without bound.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pending: int = 64,
+        time_cost: int = 2,
+        memory_cost: int = 102400,
+        parallelism: int = 8,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self._argon2_params: Tuple[int, int, int] = (time_cost, memory_cost, parallelism)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=self._argon2_params,
+            )
+        return self._executor
+
+    async def _submit(self, operation: str, fn, *args):
+        if self._inflight >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        self._inflight += 1
+        self._update_gauges()
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool(), fn, *args)
+        finally:
+            self._inflight -= 1
+            self._update_gauges()
+            HASH_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+    def _update_gauges(self):
+        HASH_INFLIGHT.set(self._inflight)
+        HASH_QUEUE_DEPTH.set(max(0, self._inflight - self.max_workers))
+
+    async def hash_password(self, password: str) -> str:
+        return await self._submit("hash", _hash, password)
+
+    async def verify_password(self, password: str, hashed: str) -> bool:
+        return await self._submit("verify", _verify, password, hashed)
+
+    async def warm_up(self) -> int:
+        """Start every worker process now rather than on the first login."""
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        await asyncio.gather(*(loop.run_in_executor(pool, _noop) for _ in range(self.max_workers)))
+        return self.max_workers
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Optional
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from app.core.cache import TTLCache
+from app.core.metrics import Counter
+from app.core.security.jwt import JWTManager
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_LOOKUPS = Counter(
+    "auth_token_cache_lookups_total",
+    "Access-token verifications answered from cache (hit) or by decoding (miss).",
+    labelnames=("result",),
+)
+
+
+class TokenVerifier:
+    """
+    Access-token verification with a bounded LRU of already verified tokens.
+
+    A cached entry expires at the token's own ``exp``, so the cache never
+    accepts a token the signature check would reject for age. Revoking a
+    session (logout) adds its ``sid`` to a deny list that is checked on every
+    call, cached or not.
+
+    With ``redis``, revocations are shared by every worker: the session is
+    also written to ``auth:revoked_sid:<sid>`` for as long as its access
+    tokens live, and announced on the ``auth:revoked_sid`` channel, which
+    each worker's ``start()`` subscribes to. A token is checked against the
+    stored deny list when it is first verified, and on every call while the
+    channel is down, when announcements may be missed.
+    """
+
+    PREFIX = "auth:revoked_sid:"
+    CHANNEL = "auth:revoked_sid"
+
+    def __init__(self, jwt_manager: JWTManager, max_entries: int = 10000, redis: Optional[Redis] = None):
+        self.jwt = jwt_manager
+        self.redis = redis
+        self._verified = TTLCache(max_entries)
+        self._revoked_sessions = TTLCache(max_entries)
+        self._subscribed = False
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    async def verify_access_token(self, token: str) -> dict:
+        claims = self._verified.get(token)
+        if claims is None:
+            self.misses += 1
+            TOKEN_CACHE_LOOKUPS.labels("miss").inc()
+            claims = self.jwt.decode(token)
+            if claims.get("type") != "access":
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid token",
+                )
+            await self._check_store(claims)
+            self._verified.set(token, claims, expires_at=claims["exp"])
+        else:
+            self.hits += 1
+            TOKEN_CACHE_LOOKUPS.labels("hit").inc()
+            if self.redis is not None and not self._subscribed:
+                await self._check_store(claims)
+
+        sid = claims.get("sid")
+        if sid and sid in self._revoked_sessions:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revoked",
+            )
+        return claims
+
+    async def _check_store(self, claims: dict):
+        sid = claims.get("sid")
+        if self.redis is None or not sid or sid in self._revoked_sessions:
+            return
+        try:
+            revoked = await self.redis.exists(f"{self.PREFIX}{sid}")
+        except (RedisError, OSError) as e:
+            # Same trade-off as the rate limiter: an unreachable Redis must not log everyone out.
+            logger.warning("Revocation check failed, accepting token: %r", e)
+            return
+        if revoked:
+            self._deny(sid)
+
+    # ============================================================
+    # INVALIDATION HOOKS
+    # ============================================================
+    async def revoke_session(self, session_id: str):
+        """Reject access tokens issued for ``session_id`` from now on, in every worker."""
+        self._deny(session_id)
+        if self.redis is None:
+            return
+        ttl = int(timedelta(minutes=self.jwt.access_exp).total_seconds())
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(f"{self.PREFIX}{session_id}", 1, ex=max(1, ttl))
+                pipe.publish(self.CHANNEL, session_id)
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            logger.error("Could not share session revocation, other workers accept its tokens until exp: %r", e)
+
+    def _deny(self, session_id: str):
+        # No access token outlives this window, so the entry can expire then.
+        ttl = timedelta(minutes=self.jwt.access_exp).total_seconds()
+        self._revoked_sessions.set(session_id, True, expires_at=time.time() + ttl)
+        # Linear scan; revocation is rare compared to verification.
+        for token, claims in self._verified.items():
+            if claims.get("sid") == session_id:
+                self._verified.pop(token)
+
+    # ============================================================
+    # REVOCATION CHANNEL
+    # ============================================================
+    async def start(self):
+        if self.redis is None or self._listener is not None:
+            return
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+        self._subscribed = False
+
+    async def _listen(self):
+        backoff = 0.1
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        self._subscribed = True
+                        backoff = 0.1
+                    elif message["type"] == "message":
+                        data = message["data"]
+                        self._deny(data.decode() if isinstance(data, bytes) else data)
+            except (RedisError, OSError) as e:
+                self._subscribed = False
+                logger.warning("Revocation channel lost, checking Redis on every request until resubscribed: %r", e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+            finally:
+                self._subscribed = False
+                await pubsub.aclose()
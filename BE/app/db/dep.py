@@ -1,10 +1,10 @@
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import SessionLocal
+from app.db.session import get_session_factory
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    db: AsyncSession = SessionLocal()
+    db: AsyncSession = get_session_factory()()
     try:
         yield db
     finally:
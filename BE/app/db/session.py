@@ -1,7 +1,110 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import asyncio
+import time
+from typing import Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import get_settings
+from app.core.metrics import Histogram
 
 settings = get_settings()
-# Use async engine for the `postgresql+asyncpg` dialect; remove sqlite-specific args
-engine = create_async_engine(settings.POSTGRES_URI, echo=False)
-SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Statement execution time, by statement type.",
+    labelnames=("statement",),
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waited."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+def _engine_url(uri: str):
+    url = make_url(uri)
+    if url.get_backend_name() == "postgresql" and url.get_driver_name() == "asyncpg":
+        # Cache of prepared statements per asyncpg connection.
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+    return url
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    QUERY_DURATION.labels(kind).observe(time.perf_counter() - started)
+
+
+def _on_error(context):
+    # Failed statements never reach after_cursor_execute.
+    stack = context.connection.info.get("query_started") if context.connection is not None else None
+    if stack:
+        stack.pop()
+
+
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_engine() -> AsyncEngine:
+    """
+    The process's engine, created on first use rather than at import: importing
+    the app stays cheap (no DB driver import) and each worker process builds
+    its own pool.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            _engine_url(settings.POSTGRES_URI),
+            echo=False,
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+        event.listen(_engine.sync_engine, "before_cursor_execute", _before_execute)
+        event.listen(_engine.sync_engine, "after_cursor_execute", _after_execute)
+        event.listen(_engine.sync_engine, "handle_error", _on_error)
+    return _engine
+
+
+def get_session_factory() -> async_sessionmaker:
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(bind=get_engine(), autoflush=False, expire_on_commit=False)
+    return _session_factory
+
+
+async def dispose_engine():
+    """Close the pool's connections, if the engine was ever created."""
+    if _engine is not None:
+        await _engine.dispose()
+
+
+async def warm_up_pool(connections: int = 1):
+    """Open ``connections`` pooled connections (concurrently, so they are distinct)."""
+    engine = get_engine()
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(max(1, min(connections, settings.DB_POOL_SIZE)))))
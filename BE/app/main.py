@@ -1,30 +1,104 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api.router import api_router
 from app.container import Container
-from rich.traceback import install
-install(show_locals=True)
+from app.core.config import get_settings
+from app.core import lifecycle
+from app.core.logging import setup_logging, shutdown_logging
+from app.core.metrics import CONTENT_TYPE, MultiProcessCollector, render
+from app.core.middleware import AdmissionMiddleware, RequestIdMiddleware
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    container = app.container
+    if settings.STARTUP_WARMUP:
+        await lifecycle.warm_up(container, settings.WARMUP_CONNECTIONS, settings.WARMUP_TIMEOUT_SECONDS)
+    archiver = container.transcript_archiver() if settings.TRANSCRIPT_ARCHIVE_ENABLED else None
+    if archiver is not None:
+        await archiver.start()
+    if app.metrics_collector is not None:
+        await app.metrics_collector.start()
+    # Logouts in other workers reach this one over Redis pub/sub.
+    token_verifier = container.token_verifier()
+    await token_verifier.start()
+    yield
+    # New chat requests get 503 from here on; let the open streams finish
+    # before the clients they are using are closed.
+    remaining = await container.stream_tracker().drain(settings.SHUTDOWN_DRAIN_SECONDS)
+    if remaining:
+        logger.warning("Shutting down with %d chat streams still open", remaining)
+    if archiver is not None:
+        await archiver.stop()
+    await token_verifier.stop()
+    await lifecycle.close(container)
+    if app.metrics_collector is not None:
+        await app.metrics_collector.stop()
+    shutdown_logging()
+
+
 def create_app():
-    app = FastAPI(title="Train-Info Chatbot", version="1.0.0")
+    settings = get_settings()
+    setup_logging(
+        level=settings.LOG_LEVEL,
+        module_levels=settings.LOG_LEVELS,
+        fmt=settings.LOG_FORMAT,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+    if settings.APP_ENV == "development":
+        # Rendering locals makes every traceback expensive (and rich costs
+        # ~100 ms to import), so production boots without it.
+        from rich.traceback import install
+        install(show_locals=True)
+
+    app = FastAPI(title="Train-Info Chatbot", version="1.0.0", lifespan=lifespan)
 
     container = Container()
     app.container = container
+    app.metrics_collector = (
+        MultiProcessCollector(settings.METRICS_DIR, flush_seconds=settings.METRICS_FLUSH_SECONDS)
+        if settings.METRICS_DIR else None
+    )
 
     container.wire(modules=[
+    "app.api.deps",
     "app.api.v1.user",
     "app.api.v1.chat",
+    "app.api.v1.admin",
     ])
 
+    # Innermost, so its 503s still carry CORS and request id headers.
+    app.add_middleware(AdmissionMiddleware, controller=container.admission_controller)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[
+            "X-Request-ID",
+            "X-Profile-ID",
+            "X-RateLimit-Limit",
+            "X-RateLimit-Remaining",
+            "X-RateLimit-Reset",
+            "Retry-After",
+        ],
     )
+    app.add_middleware(RequestIdMiddleware)
 
     app.include_router(api_router, prefix="/api/v1")
 
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(render(collector=app.metrics_collector), media_type=CONTENT_TYPE)
+
     return app
 
 app = create_app()
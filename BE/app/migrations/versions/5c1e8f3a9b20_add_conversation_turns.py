@@ -0,0 +1,65 @@
+"""add conversation_turns (partitioned by month)
+
+Revision ID: 5c1e8f3a9b20
+Revises: d0048b33c62f
+Create Date: 2026-10-19 10:12:44.512311
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8f3a9b20'
+down_revision: Union[str, Sequence[str], None] = 'd0048b33c62f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions created up front; later months are added at runtime by
+# TranscriptArchiver.ensure_partitions (daily, moving any rows the default
+# partition took for the month), anything else lands in the default one.
+INITIAL_MONTHS = 12
+
+
+def _month_start(year: int, month: int) -> date:
+    return date(year + (month - 1) // 12, (month - 1) % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('conversation_turns',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('conversation_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('role', sa.String(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('intent', sa.String(), nullable=True),
+    sa.Column('params', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('timings', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('cache_hits', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_index('ix_conversation_turns_conversation_id_created_at', 'conversation_turns', ['conversation_id', 'created_at'], unique=False)
+
+    today = date.today()
+    for offset in range(INITIAL_MONTHS):
+        start = _month_start(today.year, today.month + offset)
+        end = _month_start(today.year, today.month + offset + 1)
+        op.execute(
+            f"CREATE TABLE conversation_turns_y{start:%Y}m{start:%m} "
+            f"PARTITION OF conversation_turns FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+    op.execute("CREATE TABLE conversation_turns_default PARTITION OF conversation_turns DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_conversation_turns_conversation_id_created_at', table_name='conversation_turns')
+    # Dropping the parent drops every partition.
+    op.drop_table('conversation_turns')
@@ -5,11 +5,13 @@ from ..db.base import Base
 
 # Import all individual model files. 
 # The act of importing these classes registers them with Base.metadata.
-from .models import User
+from .models import User, RefreshToken, ConversationTurn
 
 
 # Optional: Define __all__ for clean imports elsewhere in your app.
 __all__ = [
     "Base",
-    "User"
+    "User",
+    "RefreshToken",
+    "ConversationTurn",
 ]
\ No newline at end of file
@@ -2,11 +2,14 @@
 from sqlalchemy import (
     Boolean,
     Column,
+    Index,
     Integer,
     String,
+    Text,
     ForeignKey,
     DateTime,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.db.base import Base
 
@@ -36,3 +39,28 @@ class RefreshToken(Base):
         server_default=func.now(),  # ✅ FIXED
         nullable=False,
     )
+
+
+class ConversationTurn(Base):
+    """Archived chat message with its per-turn metadata (write-behind from Redis)."""
+    __tablename__ = "conversation_turns"
+    __table_args__ = (
+        Index("ix_conversation_turns_conversation_id_created_at", "conversation_id", "created_at"),
+        # Monthly range partitions; see migration 5c1e8f3a9b20.
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # The partition key has to be part of the primary key.
+    id = Column(String, primary_key=True)
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False)
+
+    conversation_id = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    role = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+
+    intent = Column(String, nullable=True)
+    params = Column(JSONB, nullable=True)
+    # stage name -> seconds, e.g. {"classify": 0.41, "dispatch": 0.88}
+    timings = Column(JSONB, nullable=True)
+    cache_hits = Column(JSONB, nullable=True)
@@ -1,15 +1,31 @@
-import app.model.models
+from datetime import datetime
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timedelta, timezone
+from app.model.models import RefreshToken
 
-class AuthRepository:
 
-    async def store_refresh_token(self, db: AsyncSession, user_id: int, refresh_token: str):
+class AuthRepository:
+    """Audit trail of issued refresh tokens. Live token state is kept in Redis."""
 
-        RefreshToken = app.model.models.RefreshToken(
+    async def store_refresh_token(
+        self,
+        db: AsyncSession,
+        jti: str,
+        user_id: int,
+        token_hash: str,
+        expires_at: datetime,
+    ):
+        db.add(RefreshToken(
+            id=jti,
             user_id=user_id,
-            token_hash=refresh_token,
-            expires_at=datetime.now(timezone.utc) + timedelta(days=30),
+            token_hash=token_hash,
+            expires_at=expires_at,
             revoked=False,
-            created_at=datetime.now(timezone.utc)
-        )
\ No newline at end of file
+        ))
+        await db.commit()
+
+    async def revoke_refresh_token(self, db: AsyncSession, jti: str):
+        await db.execute(
+            update(RefreshToken).where(RefreshToken.id == jti).values(revoked=True)
+        )
+        await db.commit()
@@ -1,19 +1,43 @@
 from typing import Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.metrics import Counter
 from app.model.models import User
 
+USER_CACHE_LOOKUPS = Counter(
+    "user_cache_lookups_total",
+    "User-by-email lookups served from the in-process cache or the database.",
+    labelnames=("result",),
+)
+
 
 class UserRepository:
 
+    def __init__(self, cache_ttl: float = 30.0, cache_size: int = 10000):
+        # email -> detached User. Sessions are created with expire_on_commit=False,
+        # so cached rows stay readable after close. Misses are not cached: the
+        # user may be created meanwhile by another worker.
+        self._by_email = TTLCache(cache_size, ttl=cache_ttl)
+
     async def get_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
+        cached = self._by_email.get(email)
+        if cached is not None:
+            USER_CACHE_LOOKUPS.labels("hit").inc()
+            return cached
+
+        USER_CACHE_LOOKUPS.labels("miss").inc()
         stmt = select(User).where(User.email == email)
         result = await db.execute(stmt)
-        return result.scalar_one_or_none()
+        user = result.scalar_one_or_none()
+        if user is not None:
+            self._by_email.set(email, user)
+        return user
 
     async def create(self, db: AsyncSession, email: str, hashed_password: str) -> User:
         user = User(email=email, hashed_password=hashed_password)
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        self._by_email.pop(email)
         return user
@@ -1,6 +1,18 @@
+from typing import Any, Literal
 from pydantic import BaseModel
 
 
 class ChatRequest(BaseModel):
     conversation_id: str
-    message: str
\ No newline at end of file
+    message: str
+
+
+class ChatEvent(BaseModel):
+    """
+    One typed event of a chat reply stream.
+
+    - ``token``: a piece of natural-language text (``data`` is a str)
+    - ``data``:  a structured summary of the IRCTC result (``data`` is a dict)
+    """
+    event: Literal["token", "data"]
+    data: Any
@@ -0,0 +1,106 @@
+"""Production entry point: ``python -m app.serve``.
+
+Runs ``WEB_CONCURRENCY`` uvicorn workers (default: one per core this process
+may use) on one listening socket, so CPU-bound work -- SSE framing and JSON
+parsing of LLM streams, JWT checks -- spreads over the machine's cores.
+
+Workers are spawned, not forked: each imports the app itself and creates its
+clients and pools (Redis, Postgres, httpx) in its own lifespan, so nothing is
+shared between processes. Sizing follows from that: Postgres sees up to
+``workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)`` connections. Metrics are the
+exception: workers share snapshots through ``METRICS_DIR`` (a temporary
+directory unless set), so ``/metrics`` on any worker reports the sum over all
+of them, including the totals of workers that have been recycled.
+
+With ``WORKER_MAX_REQUESTS`` set, a worker exits after that many requests
+(spread by ``WORKER_MAX_REQUESTS_JITTER`` so they do not all restart at once)
+and the supervisor starts a fresh one, which caps slow memory growth. With a
+single worker there is no supervisor; the process manager has to restart it.
+
+    python -m app.serve
+    python -m app.serve --workers 4 --max-requests 20000 --max-requests-jitter 2000
+"""
+import argparse
+import inspect
+import logging
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        # Honours CPU pinning (taskset, container cpusets).
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def main():
+    settings = get_settings()
+    setup_logging(
+        level=settings.LOG_LEVEL,
+        module_levels=settings.LOG_LEVELS,
+        fmt=settings.LOG_FORMAT,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY, help="0 = one per core")
+    parser.add_argument("--max-requests", type=int, default=settings.WORKER_MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.WORKER_MAX_REQUESTS_JITTER)
+    args = parser.parse_args()
+
+    workers = args.workers or available_cores()
+    options = {}
+    if args.max_requests:
+        options["limit_max_requests"] = args.max_requests
+        if args.max_requests_jitter:
+            if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+                options["limit_max_requests_jitter"] = args.max_requests_jitter
+            else:
+                logger.warning("This uvicorn has no max-requests jitter; workers recycle after exactly %d requests",
+                               args.max_requests)
+
+    metrics_dir = None
+    if workers > 1:
+        metrics_dir = settings.METRICS_DIR or tempfile.mkdtemp(prefix="chatbot-metrics-")
+        os.makedirs(metrics_dir, exist_ok=True)
+        # Totals of a previous run would otherwise be added to this one's.
+        for name in os.listdir(metrics_dir):
+            if name.startswith("worker-") or name.startswith("archive."):
+                os.remove(os.path.join(metrics_dir, name))
+        # Spawned workers read their settings from the environment.
+        os.environ["METRICS_DIR"] = metrics_dir
+
+    logger.info(
+        "Starting %d workers on %s:%d", workers, args.host, args.port,
+        extra={"db_connections_max": workers * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)},
+    )
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            # uvicorn's loggers go through app.core.logging, here and in each worker.
+            log_config=None,
+            proxy_headers=True,
+            # Matches the lifespan's drain of in-flight chat streams.
+            timeout_graceful_shutdown=int(settings.SHUTDOWN_DRAIN_SECONDS),
+            **options,
+        )
+    finally:
+        if metrics_dir is not None and not settings.METRICS_DIR:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Write-behind archive of chat turns into Postgres."""
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.metrics import Counter, Gauge
+from app.model.models import ConversationTurn
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_TURNS = Counter(
+    "transcript_archive_turns_total",
+    "Chat turns handed to the transcript archive, by outcome.",
+    labelnames=("result",),
+)
+ARCHIVE_QUEUE_DEPTH = Gauge(
+    "transcript_archive_queue_depth",
+    "Chat turns waiting to be written to Postgres.",
+)
+
+# asyncpg refuses statements with more bind parameters than this.
+MAX_BIND_PARAMS = 32767
+# Partitions are created a month ahead; checking daily leaves plenty of slack.
+PARTITION_CHECK_SECONDS = 24 * 3600
+PARTITION_RETRY_SECONDS = 3600
+
+
+def _month_start(year: int, month: int) -> date:
+    return date(year + (month - 1) // 12, (month - 1) % 12 + 1, 1)
+
+
+class TranscriptArchiver:
+    """
+    Buffers chat turns in a bounded in-memory queue and bulk-inserts them
+    from a background task. ``enqueue`` never waits: when the queue is full
+    the turn is dropped and counted, so the chat path is never slowed down
+    by Postgres. The writer also re-checks the monthly partitions once a day.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.session_factory = session_factory
+        self.max_queue = max_queue
+        # Every row of a multi-row INSERT binds one parameter per column.
+        max_batch = MAX_BIND_PARAMS // len(ConversationTurn.__table__.columns)
+        if batch_size > max_batch:
+            logger.warning("Transcript archive batch size %d exceeds %d rows per INSERT; using %d",
+                           batch_size, max_batch, max_batch)
+        self.batch_size = max(1, min(batch_size, max_batch))
+        self.flush_interval = flush_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._next_partition_check = 0.0
+        self.dropped = 0
+
+    def enqueue(self, turn: dict) -> bool:
+        if self._queue is None:
+            # Not started (e.g. archive disabled at runtime); nothing to do.
+            return False
+        turn.setdefault("created_at", datetime.now(timezone.utc))
+        try:
+            self._queue.put_nowait(turn)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            ARCHIVE_TURNS.labels("dropped").inc()
+            return False
+        ARCHIVE_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        await self.ensure_partitions()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush what is already queued (up to ``timeout``), then stop the writer."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            ARCHIVE_TURNS.labels("failed").inc(self._queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def ensure_partitions(self, months_ahead: int = 1):
+        """
+        Create monthly partitions for the current and next month if missing.
+
+        Postgres refuses a partition for a range the default partition holds
+        rows of, so rows that landed there meanwhile are moved into the new
+        partition before it is attached.
+        """
+        today = date.today()
+        self._next_partition_check = time.monotonic() + PARTITION_RETRY_SECONDS
+        try:
+            async with self.session_factory() as db:
+                # Every worker checks at about the same time; one at a time.
+                await db.execute(text("SELECT pg_advisory_xact_lock(hashtext('conversation_turns_partitions'))"))
+                for offset in range(months_ahead + 1):
+                    start = _month_start(today.year, today.month + offset)
+                    end = _month_start(today.year, today.month + offset + 1)
+                    name = f"conversation_turns_y{start:%Y}m{start:%m}"
+                    if (await db.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar() is not None:
+                        continue
+                    await db.execute(text(f"CREATE TABLE {name} (LIKE conversation_turns INCLUDING DEFAULTS)"))
+                    moved = (await db.execute(text(
+                        f"WITH moved AS (DELETE FROM conversation_turns_default "
+                        f"WHERE created_at >= '{start}' AND created_at < '{end}' RETURNING *) "
+                        f"INSERT INTO {name} SELECT * FROM moved"
+                    ))).rowcount
+                    await db.execute(text(
+                        f"ALTER TABLE conversation_turns ATTACH PARTITION {name} "
+                        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                    ))
+                    if moved:
+                        logger.info("Moved %d archived turns from the default partition to %s", moved, name)
+                await db.commit()
+        except Exception as e:
+            # Rows still land in the default partition.
+            logger.warning("Transcript archive partition check failed: %s", e)
+            return
+        self._next_partition_check = time.monotonic() + PARTITION_CHECK_SECONDS
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            ARCHIVE_QUEUE_DEPTH.set(self._queue.qsize())
+            # A long-lived worker crosses month boundaries.
+            if time.monotonic() >= self._next_partition_check:
+                await self.ensure_partitions()
+            await self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _write(self, batch: List[dict]):
+        try:
+            async with self.session_factory() as db:
+                # One multi-row INSERT per batch.
+                await db.execute(insert(ConversationTurn).values(batch))
+                await db.commit()
+            ARCHIVE_TURNS.labels("written").inc(len(batch))
+        except Exception as e:
+            ARCHIVE_TURNS.labels("failed").inc(len(batch))
+            logger.error("Transcript archive write failed: %s", e, extra={"turns": len(batch)})
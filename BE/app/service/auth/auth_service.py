@@ -1,7 +1,16 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
 from uuid import uuid4
 from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from app.repository.auth_repository import AuthRepository
 from app.core.security.jwt import JWTManager
+from app.core.security.password import hash_token
+from app.core.security.token_verifier import TokenVerifier
+from app.service.auth.refresh_token_store import RefreshTokenStore
+
+logger = logging.getLogger(__name__)
 
 
 class AuthService:
@@ -9,43 +18,76 @@ class AuthService:
         self,
         refresh_repo: AuthRepository,
         jwt_manager: JWTManager,
+        token_store: RefreshTokenStore,
+        session_factory: async_sessionmaker,
+        token_verifier: TokenVerifier,
     ):
         self.refresh_repo = refresh_repo
         self.jwt = jwt_manager
+        self.token_store = token_store
+        self.session_factory = session_factory
+        self.token_verifier = token_verifier
+        self._audit_tasks: set = set()
 
+    async def issue_tokens(self, user_id: str, expires_at: datetime = None, session_id: str = None) -> dict:
+        """Create an access/refresh pair and register the refresh token."""
+        jti = uuid4().hex
+        session_id = session_id or uuid4().hex
+        expires_at = expires_at or datetime.now(timezone.utc) + self.jwt.refresh_ttl
+        refresh_token = self.jwt.create_refresh_token(user_id, jti=jti, expires_at=expires_at, session_id=session_id)
 
-    async def refresh_token(self, db, refresh_token: str):
-        payload = self.jwt.decode(refresh_token)
-        if payload.get("type") != "refresh":
-            raise HTTPException(status_code=401, detail="Invalid token")
+        ttl = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+        await self.token_store.save(jti, user_id, ttl)
+        self._audit(self.refresh_repo.store_refresh_token, jti, int(user_id), hash_token(refresh_token), expires_at)
+
+        return {
+            "access_token": self.jwt.create_access_token(user_id, session_id=session_id),
+            "refresh_token": refresh_token,
+            "token_type": "bearer",
+        }
 
-        token_record = await self.refresh_repo.get_valid_by_user(
-            db, user_id=payload["sub"]
-        )
+    async def refresh_token(self, refresh_token: str):
+        payload = self._decode_refresh(refresh_token)
 
-        if not token_record or not self.jwt.verify_refresh_token(
-            refresh_token, token_record.token_hash
-        ):
+        # Single-use: the old token is consumed by the same op that validates it.
+        owner = await self.token_store.consume(payload["jti"])
+        if owner is None or owner != payload["sub"]:
             raise HTTPException(status_code=401, detail="Invalid refresh token")
+        self._audit(self.refresh_repo.revoke_refresh_token, payload["jti"])
 
-        # rotation
-        
+        # rotation keeps the original expiry, so a session cannot be extended forever
+        expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+        return await self.issue_tokens(payload["sub"], expires_at=expires_at, session_id=payload.get("sid"))
 
-        new_access = self.jwt.create_access_token(payload["sub"])
-        new_refresh = self.jwt.create_refresh_token(payload["sub"])
-        async with db.begin():
-            await self.refresh_repo.delete(db, token_record.id)
-            await self.refresh_repo.create(
-                db,
-                id=str(uuid4()),
-                user_id=payload["sub"],
-                token_hash=self.jwt.hash_refresh_token(new_refresh),
-                expires_at=token_record.expires_at,
-            )
+    async def revoke(self, refresh_token: str):
+        payload = self._decode_refresh(refresh_token)
+        await self.token_store.revoke(payload["jti"])
+        if payload.get("sid"):
+            await self.token_verifier.revoke_session(payload["sid"])
+        self._audit(self.refresh_repo.revoke_refresh_token, payload["jti"])
 
+    def _decode_refresh(self, refresh_token: str) -> dict:
+        payload = self.jwt.decode(refresh_token)
+        if payload.get("type") != "refresh" or not payload.get("jti"):
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return payload
 
-        return {
-            "access_token": new_access,
-            "refresh_token": new_refresh,
-            "token_type": "bearer",
-        }
+    # ============================================================
+    # AUDIT (Postgres, off the request path)
+    # ============================================================
+    def _audit(self, operation, *args):
+        task = asyncio.create_task(self._run_audit(operation, *args))
+        self._audit_tasks.add(task)
+        task.add_done_callback(self._audit_tasks.discard)
+
+    async def _run_audit(self, operation, *args):
+        try:
+            async with self.session_factory() as db:
+                await operation(db, *args)
+        except Exception as e:
+            logger.error("Refresh token audit write failed: %s", e, extra={"operation": operation.__name__})
+
+    async def drain_audit(self):
+        """Wait for pending audit writes, e.g. on shutdown."""
+        while self._audit_tasks:
+            await asyncio.gather(*self._audit_tasks, return_exceptions=True)
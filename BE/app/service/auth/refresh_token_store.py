@@ -0,0 +1,33 @@
+"""Refresh tokens tracked in Redis by their ``jti`` claim."""
+from typing import Optional
+from redis.asyncio import Redis
+
+
+class RefreshTokenStore:
+    """
+    One key per live refresh token: ``refresh:<jti>`` -> user id, expiring
+    together with the token. Every operation is a single Redis command, so
+    validation, rotation and revocation need no hashing and no database.
+    """
+
+    PREFIX = "refresh:"
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    def _key(self, jti: str) -> str:
+        return f"{self.PREFIX}{jti}"
+
+    async def save(self, jti: str, user_id: str, ttl_seconds: int):
+        await self.redis.set(self._key(jti), user_id, ex=max(1, ttl_seconds))
+
+    async def consume(self, jti: str) -> Optional[str]:
+        """Atomically fetch and delete a token, returning its user id.
+
+        A token can therefore be redeemed once; replaying a rotated token
+        finds nothing.
+        """
+        return await self.redis.getdel(self._key(jti))
+
+    async def revoke(self, jti: str) -> bool:
+        return bool(await self.redis.delete(self._key(jti)))
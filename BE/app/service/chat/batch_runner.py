@@ -0,0 +1,235 @@
+"""Runs many logged chat messages through ``ChatService`` for offline evaluation.
+
+Items are ``{"conversation_id", "message"}`` dicts, read lazily so inputs of
+any size stream through. Up to ``concurrency`` turns run at once; turns of
+the same conversation run one after another in input order, so multi-turn
+parameter collection is replayed faithfully. Results are yielded as turns
+finish, each carrying its input ``index``; ``runner.stats`` has the totals.
+
+Because it drives the live ``ChatService`` singleton, evaluation shares its
+caches, batcher and upstream pools with user traffic. Conversations are
+namespaced under a per-run user id so runs never touch real conversations or
+each other.
+
+It also shares the live limits. Every turn counts against the ``batch`` rule
+of ``RATE_LIMITS`` for the user running it, and goes through admission
+control like a chat turn. A batch turn that is refused, or would only be
+admitted degraded, waits and asks again instead of failing: a run should
+slow down under load rather than take capacity from users or record terse
+fallback replies as results.
+"""
+import asyncio
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Union
+
+from app.core.admission import ADMIT, AdmissionController
+from app.core.lifecycle import StreamTracker
+from app.core.metrics import Counter as MetricCounter
+from app.core.rate_limit import RateLimiter
+from app.service.chat.chat_service import ChatService
+
+BATCH_TURNS = MetricCounter(
+    "chat_batch_turns_total",
+    "Turns run by the batch evaluation runner, by outcome.",
+    labelnames=("result",),
+)
+BATCH_THROTTLED = MetricCounter(
+    "chat_batch_throttled_total",
+    "Times a batch turn waited for the rate limiter or admission control, by cause.",
+    labelnames=("cause",),
+)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def _aiter(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class BatchStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.turns = 0
+        self.errors = 0
+        self.intents: Counter = Counter()
+        self.durations: List[float] = []
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        # Seconds turns spent waiting for the rate limiter / admission control
+        self.throttled_s = 0.0
+
+    def add(self, result: dict):
+        self.turns += 1
+        if "error" in result:
+            self.errors += 1
+            return
+        self.intents[result.get("intent") or "unknown"] += 1
+        self.durations.append(result["duration_ms"])
+        for stage, ms in result.get("timings_ms", {}).items():
+            self.stages[stage].append(ms)
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "turns": self.turns,
+            "errors": self.errors,
+            "elapsed_s": round(elapsed, 3),
+            "turns_per_s": round(self.turns / elapsed, 2) if elapsed else None,
+            "throttled_s": round(self.throttled_s, 3),
+            "turn_ms": {f"p{q}": _percentile(self.durations, q) for q in (50, 95, 99)},
+            "stage_ms": {
+                stage: {
+                    "count": len(values),
+                    "total": round(sum(values), 1),
+                    "p50": _percentile(values, 50),
+                    "p95": _percentile(values, 95),
+                }
+                for stage, values in sorted(self.stages.items())
+            },
+            "intents": dict(self.intents.most_common()),
+        }
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        chat_service: ChatService,
+        concurrency: int = 8,
+        streams: Optional[StreamTracker] = None,
+        run_id: Optional[str] = None,
+        user_id: str = "local",
+        rate_limiter: Optional[RateLimiter] = None,
+        admission: Optional[AdmissionController] = None,
+    ):
+        self.chat_service = chat_service
+        self.concurrency = concurrency
+        self.streams = streams
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        # Who the run counts against in the "batch" rate limit rule
+        self.user_id = user_id
+        self.rate_limiter = rate_limiter
+        self.admission = admission
+        self.stats = BatchStats()
+
+    async def run(self, items: Union[Iterable[dict], AsyncIterable[dict]]) -> AsyncIterator[dict]:
+        results: asyncio.Queue = asyncio.Queue()
+        running = asyncio.Semaphore(self.concurrency)
+        # Bounds how far reading runs ahead of execution.
+        admitted = asyncio.Semaphore(self.concurrency * 4)
+        previous: Dict[str, asyncio.Task] = {}
+        tasks = set()
+        DONE = object()
+
+        async def turn(index: int, item: dict, conversation_id: Optional[str], after: Optional[asyncio.Task]):
+            try:
+                if after is not None:
+                    await asyncio.wait([after])
+                async with running:
+                    result = await self._run_one(index, item)
+                self.stats.add(result)
+                await results.put(result)
+            finally:
+                admitted.release()
+                if previous.get(conversation_id) is asyncio.current_task():
+                    del previous[conversation_id]
+
+        async def feed():
+            index = 0
+            try:
+                async for item in _aiter(items):
+                    await admitted.acquire()
+                    conversation_id = item.get("conversation_id") if isinstance(item, dict) else None
+                    task = asyncio.create_task(turn(index, item, conversation_id, previous.get(conversation_id)))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    if conversation_id is not None:
+                        previous[conversation_id] = task
+                    index += 1
+                if tasks:
+                    await asyncio.wait(set(tasks))
+            finally:
+                await results.put(DONE)
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while (result := await results.get()) is not DONE:
+                yield result
+            await feeder
+        finally:
+            feeder.cancel()
+            for task in list(tasks):
+                task.cancel()
+
+    async def _admit(self) -> str:
+        """Wait until admission control and the rate limiter let a turn in; returns the action."""
+        while True:
+            if self.admission is not None:
+                action, _ = self.admission.decide()
+                if action != ADMIT:
+                    await self._wait("admission", self.admission.retry_after)
+                    continue
+            if self.rate_limiter is not None:
+                limit = await self.rate_limiter.hit("batch", self.user_id)
+                if limit is not None and not limit.allowed:
+                    await self._wait("rate_limit", limit.retry_after)
+                    continue
+            return ADMIT
+
+    async def _wait(self, cause: str, seconds: float):
+        BATCH_THROTTLED.labels(cause).inc()
+        seconds = max(seconds, 0.05)
+        self.stats.throttled_s += seconds
+        await asyncio.sleep(seconds)
+
+    async def _run_one(self, index: int, item: dict) -> dict:
+        if not isinstance(item, dict) or not isinstance(item.get("message"), str) \
+                or not isinstance(item.get("conversation_id"), str):
+            BATCH_TURNS.labels("invalid").inc()
+            return {"index": index, "error": "expected conversation_id and message strings"}
+
+        conversation_id, message = item["conversation_id"], item["message"]
+        result = {"index": index, "conversation_id": conversation_id, "message": message}
+        turn: dict = {}
+        tokens, data = [], []
+        action = await self._admit()
+        started = time.perf_counter()
+        events = self.chat_service.handle_user_message(
+            conversation_id, message, user_id=f"batch-{self.run_id}", turn_out=turn
+        )
+        if self.streams is not None:
+            events = self.streams.track(events)
+        try:
+            with self.admission.turn(action) if self.admission is not None else nullcontext():
+                async for event in events:
+                    if event.event == "token":
+                        tokens.append(event.data)
+                    else:
+                        data.append(event.data)
+        except Exception as e:
+            BATCH_TURNS.labels("failed").inc()
+            result["error"] = f"{type(e).__name__}: {e}"
+            return result
+
+        BATCH_TURNS.labels("completed").inc()
+        result.update({
+            "intent": turn.get("intent"),
+            "params": turn.get("params"),
+            "reply": "".join(tokens),
+            "data": data,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "timings_ms": {stage: round(s * 1000, 1) for stage, s in (turn.get("timings") or {}).items()},
+            "cache_hits": turn.get("cache_hits") or {},
+        })
+        return result
@@ -1,43 +1,135 @@
 import asyncio
-from typing import AsyncIterator, Dict, Any, List
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Any, List, Optional
 from fastapi.params import Depends
+from app.core.admission import degraded_var
+from app.core.metrics import Counter, Histogram
+from app.schema.chat_schema import ChatEvent
+from app.service.archive.transcript_archiver import TranscriptArchiver
+from app.service.chat.summaries import summarize, terse_reply
 from app.service.llm.llm_service import LLMService
 from app.service.redis.state_manager import StateManager
 from app.service.irctc.irctc_client import IRCTCClient, IRCTCClientError
+from app.service.trace.recorder import TraceRecorder
+
+logger = logging.getLogger(__name__)
+
+TIME_TO_FIRST_MEANINGFUL_BYTE = Histogram(
+    "chat_time_to_first_meaningful_byte_seconds",
+    "Time from receiving a chat message to the first non-empty event sent back.",
+    labelnames=("intent",),
+)
+CHAT_TURN_DURATION = Histogram(
+    "chat_turn_duration_seconds",
+    "Wall time of a whole chat turn, including streaming the reply.",
+    labelnames=("intent",),
+)
+CHAT_STAGE_DURATION = Histogram(
+    "chat_stage_duration_seconds",
+    "Time spent in each stage of a chat turn (classify, extract, dispatch, format).",
+    labelnames=("stage",),
+)
+CHAT_CACHE_LOOKUPS = Counter(
+    "chat_cache_lookups_total",
+    "Cache lookups made while handling chat turns, by cache and result.",
+    labelnames=("cache", "result"),
+)
 
 class ChatService:
     HISTORY_LIMIT = 15
+    # Multi-intent messages: tasks taken from one message, and how many
+    # IRCTC calls they may run concurrently.
+    MAX_TASKS = 4
+    MAX_PARALLEL_TASKS = 3
 
     def __init__(
         self,
         state: StateManager,
         irctc_client: IRCTCClient,
         llm_service: LLMService,
+        archiver: Optional[TranscriptArchiver] = None,
+        recorder: Optional[TraceRecorder] = None,
     ):
         self.state = state
         self.irctc = irctc_client
         self.llm_service = llm_service
+        self.archiver = archiver
+        # Optional: samples whole conversations to disk for offline replay.
+        self.recorder = recorder
+
+
+    async def handle_user_message(
+        self,
+        conversation_id: str,
+        message: str,
+        user_id: Optional[str] = None,
+        turn_out: Optional[dict] = None,
+    ) -> AsyncIterator[ChatEvent]:
+        """
+        Stream the reply to one user message. ``turn_out``, when given, is
+        filled with the turn's record (intent, params, stage timings, cache
+        hits) once the turn ends.
+        """
+        started = time.perf_counter()
+        turn = {
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "intent": "unknown",
+            "params": None,
+            "timings": {},
+            "cache_hits": {},
+        }
+        # Conversations are namespaced by their owner, so a client can only
+        # ever read or continue its own conversation state.
+        if user_id is not None:
+            conversation_id = f"{user_id}:{conversation_id}"
+        waiting_for_first = True
+        trace = self.recorder.begin(conversation_id, message) if self.recorder is not None else None
 
+        try:
+            async for event in self._handle_turn(conversation_id, message, turn):
+                if waiting_for_first and event.data:
+                    TIME_TO_FIRST_MEANINGFUL_BYTE.labels(turn["intent"]).observe(time.perf_counter() - started)
+                    waiting_for_first = False
+                yield event
+        finally:
+            # Recorded even when the client disconnects mid-stream.
+            CHAT_TURN_DURATION.labels(turn["intent"]).observe(time.perf_counter() - started)
+            for stage, seconds in turn["timings"].items():
+                CHAT_STAGE_DURATION.labels(stage).observe(seconds)
+            for cache, hit in turn["cache_hits"].items():
+                CHAT_CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+            if trace is not None:
+                self.recorder.finish(trace, turn)
+            if turn_out is not None:
+                turn_out.update(turn)
 
-    async def handle_user_message(self, conversation_id: str, message: str) -> AsyncIterator[str]:
-        self._store_message(conversation_id, "user", message)
+    async def _handle_turn(self, conversation_id: str, message: str, turn: dict) -> AsyncIterator[ChatEvent]:
+        self._store_message(conversation_id, "user", message, turn)
 
         conv_state = self.state.get_state(conversation_id)
 
         # =========================
         # STEP 1 → Detect category
         # =========================
-        classification = await self.llm_service.classify_intent(message)
+        trace = {}
+        with self._stage(turn, "classify"):
+            classification = await self.llm_service.classify_intent(message, trace=trace)
+        turn["cache_hits"]["intent_knn"] = trace.get("classifier") == "knn"
         category = classification["category"]
         intent = classification["intent"]
+        turn["intent"] = intent or category
 
         # =========================
         # CATEGORY: SMALL TALK
         # =========================
         if category == "small_talk":
             reply = self._handle_small_talk(intent)
-            self._store_message(conversation_id, "assistant", reply)
-            yield reply
+            self._store_message(conversation_id, "assistant", reply, turn)
+            yield ChatEvent(event="token", data=reply)
             return
 
         # =========================
@@ -45,17 +137,30 @@ class ChatService:
         # =========================
         if category == "out_of_scope":
             reply = " I can help you with IRCTC train service. Please ask me if you have any questions related to trains, bookings, or PNR status."
-            self._store_message(conversation_id, "assistant", reply)
-            yield reply
+            self._store_message(conversation_id, "assistant", reply, turn)
+            yield ChatEvent(event="token", data=reply)
             return
 
         # =========================
         # CATEGORY: DOMAIN (IRCTC)
         # =========================
 
+        # Several requests in one message
+        intents = [i for i in classification.get("intents") or [] if i]
+        if len(dict.fromkeys(intents)) > 1:
+            turn["intent"] = "multi"
+            reply = []
+            async for event in self._handle_multi_intent(list(dict.fromkeys(intents)), message, turn):
+                if event.event == "token":
+                    reply.append(event.data)
+                yield event
+            self._store_message(conversation_id, "assistant", "".join(reply), turn)
+            return
+
         # Fresh conversation
         if not conv_state:
-            params = await self.llm_service.extract_params(intent, message)
+            with self._stage(turn, "extract"):
+                params = await self.llm_service.extract_params(intent, message)
             missing = self._find_missing_params(intent, params)
 
             conv_state = {
@@ -67,31 +172,111 @@ class ChatService:
 
             if missing:
                 reply = self._ask_for_missing_params(missing)
-                self._store_message(conversation_id, "assistant", reply)
-                yield reply
+                self._store_message(conversation_id, "assistant", reply, turn)
+                yield ChatEvent(event="token", data=reply)
                 return
 
         # Continue collecting parameters
         elif conv_state["stage"] == "awaiting_params":
-            new_params = await self.llm_service.extract_params(conv_state["intent"], message)
-            conv_state["params"].update(new_params)
+            with self._stage(turn, "extract"):
+                new_params = await self.llm_service.extract_params(conv_state["intent"], message)
+            # Only the parameters this message changed are written back.
+            changed = {k: v for k, v in new_params.items() if conv_state["params"].get(k, ...) != v}
+            conv_state["params"].update(changed)
 
             missing = self._find_missing_params(conv_state["intent"], conv_state["params"])
             if missing:
-                self.state.set_state(conversation_id, conv_state)
+                self.state.update_state(conversation_id, params=changed)
                 reply = self._ask_for_missing_params(missing)
-                self._store_message(conversation_id, "assistant", reply)
-                yield reply
+                self._store_message(conversation_id, "assistant", reply, turn)
+                yield ChatEvent(event="token", data=reply)
                 return
 
             conv_state["stage"] = "ready"
-            self.state.set_state(conversation_id, conv_state)
+            self.state.update_state(conversation_id, stage="ready", params=changed)
+
+        turn["intent"] = conv_state["intent"]
+        turn["params"] = conv_state["params"]
 
         # Execute IRCTC API
-        response_text = (await self._dispatch(conv_state["intent"], conv_state["params"]))
-        async for token in self.llm_service.to_natural_language(conv_state["intent"], response_text):
+        with self._stage(turn, "dispatch"):
+            response_text = (await self._dispatch(conv_state["intent"], conv_state["params"]))
+
+        # Show the raw result right away; the LLM answer follows.
+        card = summarize(conv_state["intent"], response_text)
+        if card:
+            yield ChatEvent(event="data", data=card)
+
+        reply = []
+        with self._stage(turn, "format"):
+            async for token in self._format(
+                turn, conv_state["intent"], response_text, [(conv_state["intent"], response_text, card)]
+            ):
+                reply.append(token)
+                yield ChatEvent(event="token", data=token)
+        self._store_message(conversation_id, "assistant", "".join(reply), turn)
+
+
+    # ============================================================
+    # MULTI-INTENT HANDLER
+    # ============================================================
+    async def _handle_multi_intent(self, intents: List[str], message: str, turn: dict) -> AsyncIterator[ChatEvent]:
+        with self._stage(turn, "extract"):
+            tasks = await self.llm_service.extract_tasks(intents[:self.MAX_TASKS], message)
+        if not tasks:
+            yield ChatEvent(event="token", data="Unknown intent. Please rephrase.")
+            return
+        turn["params"] = tasks
+
+        with self._stage(turn, "dispatch"):
+            results = await self._run_tasks(tasks)
+
+        parts = []
+        for task, result in zip(tasks, results):
+            if not result["ok"]:
+                parts.append((task["intent"], result["error"], None))
+                yield ChatEvent(event="data", data={"type": "task_error", "intent": task["intent"], "error": result["error"]})
+                continue
+            card = summarize(task["intent"], result["result"])
+            parts.append((task["intent"], result["result"], card))
+            if card:
+                yield ChatEvent(event="data", data=card)
+
+        intent_label = ", ".join(task["intent"] for task in tasks)
+        with self._stage(turn, "format"):
+            async for token in self._format(turn, intent_label, results, parts):
+                yield ChatEvent(event="token", data=token)
+
+    async def _format(self, turn: dict, intent: str, response: Any, parts: list) -> AsyncIterator[str]:
+        """
+        The LLM's answer for ``response``; a template one built from ``parts``
+        (intent, result, card) when admission control degraded the turn.
+        """
+        if degraded_var.get():
+            turn["degraded"] = True
+            yield "\n".join(terse_reply(*part) for part in parts)
+            return
+        async for token in self.llm_service.to_natural_language(intent, response):
             yield token
 
+    async def _run_tasks(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Dispatch tasks concurrently; each result reports its own success or failure."""
+        limit = asyncio.Semaphore(self.MAX_PARALLEL_TASKS)
+
+        async def run(task):
+            intent, params = task["intent"], task["params"]
+            missing = self._find_missing_params(intent, params)
+            if missing:
+                return {"intent": intent, "ok": False, "error": self._ask_for_missing_params(missing)}
+            async with limit:
+                try:
+                    return {"intent": intent, "ok": True, "result": await self._call_irctc(intent, params)}
+                except IRCTCClientError as e:
+                    return {"intent": intent, "ok": False, "error": f"IRCTC API Error: {e}"}
+                except Exception as e:
+                    return {"intent": intent, "ok": False, "error": f"Unexpected error: {e}"}
+
+        return await asyncio.gather(*(run(task) for task in tasks))
 
     # ============================================================
     # SMALL TALK HANDLER
@@ -108,38 +293,66 @@ class ChatService:
     # ============================================================
     # UTILS (unchanged)
     # ============================================================
-    def _store_message(self, conversation_id: str, role: str, content: str):
+    @staticmethod
+    @contextmanager
+    def _stage(turn: dict, name: str):
+        """Add the wall time of the enclosed block to ``turn["timings"][name]``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings = turn["timings"]
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+    def _store_message(self, conversation_id: str, role: str, content: str, turn: Optional[dict] = None):
+        if self.archiver is not None and turn is not None:
+            self._archive(role, content, turn)
         self.state.add_message(conversation_id, role, content)
         messages = self.state.get_messages(conversation_id)
         if len(messages) > self.HISTORY_LIMIT:
-            trimmed = messages[-self.HISTORY_LIMIT:]
-            self.state.redis.delete(self.state._key(conversation_id, "messages"))
-            for m in trimmed:
-                self.state.add_message(conversation_id, m["role"], m["content"])
+            self.state.trim_messages(conversation_id, self.HISTORY_LIMIT)
+
+    async def _call_irctc(self, intent: str, params: Dict[str, Any]):
+        """Call the IRCTC endpoint for ``intent``. Errors propagate to the caller."""
+        if intent == "live_status":
+            return await self.irctc.get_train_live_status(params["train_no"])
+        if intent == "train_between_stations":
+            return await self.irctc.trains_between_stations_v3(params["source"], params["destination"], params["date"])
+        if intent == "pnr_status":
+            return await self.irctc.get_pnr_status_v3(params["pnr"])
+        if intent == "seat_availability":
+            return await self.irctc.check_seat_availability_v2(
+                params["train_no"], params["source"], params["destination"], params["date"], params["class_type"], params["quota"]
+            )
+        if intent == "train_schedule":
+            return await self.irctc.get_train_schedule(params["train_no"])
+        if intent == "search_train":
+            return await self.irctc.search_train(params["query"])
+        if intent == "search_station":
+            return await self.irctc.search_station(params["query"])
+        if intent == "get_fare":
+            return await self.irctc.get_fare(
+                params["trainNo"], params["source"], params["destination"])
+
+        return "Unknown intent. Please rephrase."
+
+    def _archive(self, role: str, content: str, turn: dict):
+        user_id = turn["user_id"]
+        self.archiver.enqueue({
+            "id": uuid.uuid4().hex,
+            "conversation_id": turn["conversation_id"],
+            "user_id": int(user_id) if user_id and user_id.isdigit() else None,
+            "role": role,
+            "content": content or "",
+            "intent": turn["intent"],
+            "params": turn["params"],
+            "timings": dict(turn["timings"]),
+            "cache_hits": dict(turn["cache_hits"]),
+        })
 
     async def _dispatch(self, intent: str, params: Dict[str, Any]) -> str:
         try:
-            if intent == "live_status":
-                return await self.irctc.get_train_live_status(params["train_no"], params["date"])
-            if intent == "train_between_stations":
-                return await self.irctc.trains_between_stations_v3(params["source"], params["destination"], params["date"])
-            if intent == "pnr_status":
-                return await self.irctc.get_pnr_status_v3(params["pnr"])
-            if intent == "seat_availability":
-                return await self.irctc.check_seat_availability_v2(
-                    params["train_no"], params["source"], params["destination"], params["date"], params["class_type"], params["quota"]
-                )
-            if intent == "train_schedule":
-                return await self.irctc.get_train_schedule(params["train_no"])
-            if intent == "search_train":
-                return await self.irctc.search_train(params["query"])
-            if intent == "search_station":
-                return await self.irctc.search_station(params["query"])
-            if intent == "get_fare":
-                return await self.irctc.get_fare(
-                    params["trainNo"], params["source"], params["destination"])
-
-            return "Unknown intent. Please rephrase."
+            return await self._call_irctc(intent, params)
         except IRCTCClientError as e:
             return f"IRCTC API Error: {e}"
         except Exception as e:
@@ -149,7 +362,7 @@ class ChatService:
         required = {
             "train_between_stations": ["source", "destination", "date"],
             "pnr_status": ["pnr"],
-            "live_status": ["train_no", "date"],
+            "live_status": ["train_no"],
             "train_schedule": ["train_no"],
             "seat_availability": ["train_no", "source", "destination", "date", "class_type", "quota"],
             "search_train": ["query"],
@@ -185,7 +398,7 @@ class ChatService:
 
     async def stream_reply(self, conversation_id: str, message: str):
         """Stream reply for user message"""
-        print(f"DEBUG [chat_service]: Processing message: '{message}'")
+        logger.debug("Streaming reply", extra={"conversation_id": conversation_id})
         
         # Your existing logic here (intent detection, params, etc.)
         # ...
@@ -0,0 +1,169 @@
+"""Compact, render-ready summaries of IRCTC API responses.
+
+These are streamed to the client as a ``data`` event as soon as the IRCTC call
+returns, before the LLM has produced its first token. Every builder is
+defensive: an unexpected payload shape yields ``None`` and the client simply
+waits for the natural-language answer.
+"""
+from typing import Any, Callable, Dict, Optional
+
+MAX_ROWS = 10
+
+
+def _payload(response: Any) -> Any:
+    # RapidAPI wraps results as {"status": true, "message": ..., "data": ...}
+    if isinstance(response, dict) and "data" in response:
+        return response["data"]
+    return response
+
+
+def _pnr_status(data: Any) -> Optional[dict]:
+    if not isinstance(data, dict) or not data.get("Pnr"):
+        return None
+    passengers = [
+        {
+            "number": p.get("Number"),
+            "booking": p.get("BookingStatusNew") or p.get("BookingStatus"),
+            "current": p.get("CurrentStatusNew") or p.get("CurrentStatus"),
+        }
+        for p in data.get("PassengerStatus") or []
+        if isinstance(p, dict)
+    ]
+    return {
+        "type": "pnr_status",
+        "pnr": data.get("Pnr"),
+        "train": f"{data.get('TrainNo', '')} {data.get('TrainName', '')}".strip(),
+        "date": data.get("Doj"),
+        "from": data.get("BoardingPoint") or data.get("From"),
+        "to": data.get("ReservationUpto") or data.get("To"),
+        "class": data.get("Class"),
+        "chart_prepared": data.get("ChartPrepared"),
+        "passengers": passengers,
+    }
+
+
+def _train_list(data: Any) -> Optional[dict]:
+    if not isinstance(data, list):
+        return None
+    trains = [
+        {
+            "number": t.get("train_number"),
+            "name": t.get("train_name"),
+            "departs": t.get("from_std"),
+            "arrives": t.get("to_sta") or t.get("to_std"),
+            "duration": t.get("duration"),
+        }
+        for t in data[:MAX_ROWS]
+        if isinstance(t, dict)
+    ]
+    return {"type": "train_list", "total": len(data), "trains": trains}
+
+
+def _live_status(data: Any) -> Optional[dict]:
+    if not isinstance(data, dict) or not data.get("train_number"):
+        return None
+    return {
+        "type": "live_status",
+        "train": f"{data.get('train_number', '')} {data.get('train_name', '')}".strip(),
+        "current_station": data.get("current_station_name"),
+        "delay_minutes": data.get("delay"),
+        "as_of": data.get("status_as_of"),
+    }
+
+
+def _train_schedule(data: Any) -> Optional[dict]:
+    route = data.get("route") if isinstance(data, dict) else None
+    if not isinstance(route, list):
+        return None
+    stops = [
+        {
+            "code": s.get("station_code"),
+            "name": s.get("station_name"),
+            "arrives": s.get("sta"),
+            "departs": s.get("std"),
+            "day": s.get("day"),
+        }
+        for s in route
+        if isinstance(s, dict) and s.get("stop", True)
+    ]
+    return {"type": "train_schedule", "stops": stops}
+
+
+def _seat_availability(data: Any) -> Optional[dict]:
+    if not isinstance(data, list):
+        return None
+    days = [
+        {
+            "date": d.get("date"),
+            "status": d.get("current_status"),
+            "fare": d.get("total_fare"),
+        }
+        for d in data[:MAX_ROWS]
+        if isinstance(d, dict)
+    ]
+    return {"type": "seat_availability", "days": days}
+
+
+SUMMARIZERS: Dict[str, Callable[[Any], Optional[dict]]] = {
+    "pnr_status": _pnr_status,
+    "train_between_stations": _train_list,
+    "live_status": _live_status,
+    "train_schedule": _train_schedule,
+    "seat_availability": _seat_availability,
+}
+
+
+def summarize(intent: str, response: Any) -> Optional[dict]:
+    """Return a compact card for ``response`` or ``None`` if there is nothing to show."""
+    builder = SUMMARIZERS.get(intent)
+    if builder is None:
+        return None
+    try:
+        return builder(_payload(response))
+    except (AttributeError, TypeError):
+        return None
+
+
+def _join(items, limit: int = 5) -> str:
+    items = [i for i in items if i]
+    text = ", ".join(items[:limit])
+    return text + (f" and {len(items) - limit} more" if len(items) > limit else "")
+
+
+def _terse_card(card: dict) -> Optional[str]:
+    kind = card.get("type")
+    if kind == "pnr_status":
+        passengers = _join(f"passenger {p['number']}: {p['current'] or p['booking']}" for p in card["passengers"])
+        return f"PNR {card['pnr']}, {card['train']} on {card['date']}. {passengers}.".replace(" .", ".")
+    if kind == "train_list":
+        trains = _join(f"{t['number']} {t['name']} ({t['departs']}-{t['arrives']})" for t in card["trains"])
+        return f"{card['total']} trains found: {trains}."
+    if kind == "live_status":
+        return (f"{card['train']} is at {card['current_station']}, "
+                f"{card['delay_minutes'] or 0} min late (as of {card['as_of']}).")
+    if kind == "train_schedule":
+        stops = card["stops"]
+        if not stops:
+            return None
+        return f"{len(stops)} stops, from {stops[0]['name']} to {stops[-1]['name']}."
+    if kind == "seat_availability":
+        return _join((f"{d['date']}: {d['status']}" for d in card["days"]), limit=MAX_ROWS) + "."
+    return None
+
+
+def terse_reply(intent: str, response: Any, card: Optional[dict]) -> str:
+    """
+    A short template answer for when the LLM is not asked to phrase one
+    (admission control under load). Built from the card when there is one.
+    """
+    text = None
+    if card:
+        try:
+            text = _terse_card(card)
+        except (KeyError, TypeError, IndexError):
+            text = None
+    if text:
+        return text
+    if isinstance(response, str) and response:
+        return response[:300]
+    return f"The service is busy right now; please ask again for the {intent.replace('_', ' ')} details."
@@ -1,11 +1,26 @@
 # app/services/irctc_client.py
+import time
 from typing import Any, Dict, Optional
 import httpx
 
 from app.core.config import get_settings
+from app.core.http import open_connections
+from app.core.metrics import Counter, Histogram
+from app.service.trace.recorder import active_trace
 
 settings = get_settings()
 
+IRCTC_REQUEST_DURATION = Histogram(
+    "irctc_request_duration_seconds",
+    "Duration of IRCTC RapidAPI calls.",
+    labelnames=("endpoint",),
+)
+IRCTC_RESPONSES = Counter(
+    "irctc_responses_total",
+    "IRCTC RapidAPI responses by HTTP status ('error' for network failures).",
+    labelnames=("endpoint", "status"),
+)
+
 
 class IRCTCClientError(Exception):
     """Raised when IRCTC RapidAPI returns non-2xx or network error occurs."""
@@ -16,34 +31,74 @@ class IRCTCClient:
     Async wrapper for the IRCTC RapidAPI endpoints.
     No retries are performed here by design (per user instruction).
     """
-    def __init__(self, api_key: str, host: str, timeout: float = 20.0):
-        self.base_url = "https://irctc1.p.rapidapi.com"
+    def __init__(
+        self,
+        api_key: str,
+        host: str,
+        timeout: float = 20.0,
+        base_url: str = settings.RAPIDAPI_BASE_URL,
+        max_connections: int = 50,
+    ):
+        self.base_url = base_url.rstrip("/")
         self.headers = {
             "x-rapidapi-key": api_key,
             "x-rapidapi-host": host,
         }
         self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # One pool for the app's lifetime; closed by aclose() on shutdown.
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def warm_up(self, connections: int = 1) -> int:
+        """Open ``connections`` pooled connections to the RapidAPI host."""
+        return await open_connections(self.client, self.base_url, connections)
+
 
+    @staticmethod
+    def _trace(started: float, path: str, params: Optional[Dict[str, Any]], **call):
+        trace = active_trace()
+        if trace is not None:
+            trace.add("irctc", started, time.perf_counter() - started, path=path, params=params, **call)
 
     async def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         
         url = f"{self.base_url}{path}"
+        started = time.perf_counter()
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        try:
             try:
-                resp = await client.get(url, headers=self.headers, params=params)
-                resp.raise_for_status()
-                return resp.json()
+                resp = await self.client.get(url, headers=self.headers, params=params)
+            finally:
+                IRCTC_REQUEST_DURATION.labels(path).observe(time.perf_counter() - started)
+            IRCTC_RESPONSES.labels(path, resp.status_code).inc()
+            resp.raise_for_status()
+            data = resp.json()
+            self._trace(started, path, params, status=resp.status_code, response=data)
+            return data
+        
+        except httpx.HTTPStatusError as exc:
+            self._trace(started, path, params, status=exc.response.status_code, error=exc.response.text[:500])
+            msg = f"IRCTC API error [{exc.response.status_code}] {exc.request.url}: {exc.response.text}"
+            raise IRCTCClientError(msg)
             
-            except httpx.HTTPStatusError as exc:
-                msg = f"IRCTC API error [{exc.response.status_code}] {exc.request.url}: {exc.response.text}"
-                raise IRCTCClientError(msg)
-                
-            except httpx.RequestError as exc:
-                raise IRCTCClientError(f"Network error while calling IRCTC API: {exc}") from exc
-
-    
-    
+        except httpx.RequestError as exc:
+            IRCTC_RESPONSES.labels(path, "error").inc()
+            self._trace(started, path, params, error=str(exc))
+            raise IRCTCClientError(f"Network error while calling IRCTC API: {exc}") from exc
+
+
+
     async def search_station(self, query: str) -> Dict[str, Any]:
        
         """GET /api/v1/SearchStation or /searchStation"""
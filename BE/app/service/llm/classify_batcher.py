@@ -0,0 +1,148 @@
+"""Micro-batching of intent classification requests.
+
+Concurrent ``classify_intent`` calls are collected for a short window and sent
+to the LLM as one prompt, so the long classifier system prompt is paid once per
+batch instead of once per user message.
+"""
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+from app.core.metrics import Histogram
+from app.service.llm.llm_client import LLMClient
+from app.service.llm.prompts import CLASSIFY_SYSTEM_PROMPT, CLASSIFY_FALLBACK, parse_llm_json
+
+BATCH_INSTRUCTIONS = """
+            ====================
+            BATCH MODE:
+            The user content is a JSON array of {"id": <int>, "message": <text>}.
+            Classify every message independently and return ONLY a JSON array
+            with one object per input, in any order:
+            [{"id": <int>, "category": "...", "intent": "<intent_name or null>", "intents": [...]}]
+            """
+
+# Rough upper bound of completion tokens needed per classified item.
+TOKENS_PER_ITEM = 48
+
+CLASSIFY_BATCH_SIZE = Histogram(
+    "llm_classify_batch_size",
+    "Messages per batched classification request.",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+
+class ClassifyBatcher:
+    """
+    Collects classification requests for up to ``window_ms`` (or until
+    ``max_batch_size`` are pending) and resolves each caller's future from a
+    single batched LLM completion.
+    """
+
+    def __init__(self, llm_client: LLMClient, window_ms: float = 5.0, max_batch_size: int = 16):
+        self.llm = llm_client
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+        # Counters, read by the benchmark and by metrics.
+        self.batches_sent = 0
+        self.items_sent = 0
+        self.fallbacks = 0
+
+    async def classify(self, message: str) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        # Keep a strong reference until the batch resolves.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        self.batches_sent += 1
+        self.items_sent += len(batch)
+        CLASSIFY_BATCH_SIZE.observe(len(batch))
+
+        if len(batch) == 1:
+            message, future = batch[0]
+            self._resolve(future, await self._classify_one(message))
+            return
+
+        try:
+            results = await self._classify_many([message for message, _ in batch])
+        except Exception:
+            results = {}
+
+        retry = []
+        for idx, (message, future) in enumerate(batch):
+            result = results.get(idx)
+            if result is None:
+                retry.append((message, future))
+            else:
+                self._resolve(future, result)
+
+        # Items the model dropped or mangled are classified on their own.
+        if retry:
+            self.fallbacks += len(retry)
+            answers = await asyncio.gather(*(self._classify_one(m) for m, _ in retry))
+            for (_, future), answer in zip(retry, answers):
+                self._resolve(future, answer)
+
+    async def _classify_one(self, message: str) -> dict:
+        prompt = [
+            {"role": "system", "content": CLASSIFY_SYSTEM_PROMPT},
+            {"role": "user", "content": message},
+        ]
+        try:
+            return parse_llm_json(await self.llm.generate(prompt))
+        except Exception:
+            return dict(CLASSIFY_FALLBACK)
+
+    async def _classify_many(self, messages: List[str]) -> dict:
+        items = [{"id": idx, "message": message} for idx, message in enumerate(messages)]
+        prompt = [
+            {"role": "system", "content": CLASSIFY_SYSTEM_PROMPT + BATCH_INSTRUCTIONS},
+            {"role": "user", "content": json.dumps(items, ensure_ascii=False)},
+        ]
+        response = await self.llm.generate(prompt, max_tokens=TOKENS_PER_ITEM * len(messages) + 32)
+
+        parsed = parse_llm_json(response)
+        if not isinstance(parsed, list):
+            return {}
+
+        results = {}
+        for entry in parsed:
+            if not isinstance(entry, dict) or "category" not in entry:
+                continue
+            try:
+                idx = int(entry["id"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= idx < len(messages):
+                entry.pop("id")
+                results[idx] = entry
+        return results
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: dict):
+        if not future.done():
+            future.set_result(result)
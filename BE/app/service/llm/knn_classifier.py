@@ -0,0 +1,201 @@
+"""CPU-only nearest-neighbour intent classifier.
+
+Messages are embedded as signed, hashed character n-gram vectors and compared
+by cosine similarity against a matrix of labelled examples. Confident matches
+are answered locally; everything else falls through to the LLM classifier.
+So do messages that match more than one domain intent about equally well:
+they usually ask for several things, which only the LLM can split.
+
+On-disk index (a directory):
+    meta.json    -> {"version", "dim", "ngram_min", "ngram_max", "labels"}
+    vectors.npy  -> float32 (n_examples, dim), rows L2-normalised
+    labels.npy   -> int32 (n_examples,), index into meta["labels"]
+
+``vectors.npy`` is memory-mapped at startup so workers share the page cache
+instead of each holding a private copy.
+"""
+import json
+import os
+import re
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_VERSION = 1
+
+_WS = re.compile(r"\s+")
+_DIGIT = re.compile(r"\d")
+
+
+class NgramHasher:
+    """Hashes character n-grams of a message into a fixed-size dense vector."""
+
+    def __init__(self, dim: int = 2048, ngram_min: int = 3, ngram_max: int = 5):
+        self.dim = dim
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # PNRs, train numbers and dates differ between otherwise identical
+        # questions, so all digits collapse to one symbol.
+        text = _DIGIT.sub("0", text.lower())
+        return f" {_WS.sub(' ', text).strip()} "
+
+    def _features(self, text: str) -> Tuple[List[int], List[float]]:
+        text = self.normalize(text)
+        indices, signs = [], []
+        for n in range(self.ngram_min, self.ngram_max + 1):
+            for i in range(len(text) - n + 1):
+                # crc32 is stable across processes, unlike hash().
+                h = zlib.crc32(text[i:i + n].encode("utf-8"))
+                indices.append(h % self.dim)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        return indices, signs
+
+    def transform_one(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        indices, signs = self._features(text)
+        if indices:
+            np.add.at(vec, indices, signs)
+            norm = np.linalg.norm(vec)
+            if norm:
+                vec /= norm
+        return vec
+
+    def transform(self, texts: Iterable[str]) -> np.ndarray:
+        return np.vstack([self.transform_one(t) for t in texts])
+
+
+class KNNIntentClassifier:
+    """
+    Cosine kNN over labelled examples.
+
+    ``predict`` returns ``({"category", "intent", "intents"}, confidence)``
+    where the confidence is the similarity-weighted vote share of the winning
+    label, scaled by its best similarity, and ``intents`` lists the domain
+    intents whose best matching example is within ``multi_ratio`` of the
+    winner's. ``classify``
+    returns the result only when the confidence reaches ``threshold`` and a
+    single domain intent is in the running.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        label_ids: np.ndarray,
+        labels: List[Tuple[str, Optional[str]]],
+        hasher: NgramHasher,
+        k: int = 5,
+        threshold: float = 0.6,
+        multi_ratio: float = 0.75,
+    ):
+        self.vectors = vectors
+        self.label_ids = label_ids
+        self.labels = labels
+        self.hasher = hasher
+        self.k = max(1, min(k, len(label_ids)))
+        self.threshold = threshold
+        self.multi_ratio = multi_ratio
+        # Example rows grouped by label, for per-label maxima in one reduceat
+        self._by_label = np.argsort(label_ids, kind="stable")
+        grouped = label_ids[self._by_label]
+        self._label_starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        self._label_of_group = grouped[self._label_starts]
+
+        self.hits = 0
+        self.misses = 0
+        # Confident, but possibly several requests in one message
+        self.ambiguous = 0
+
+    @classmethod
+    def load(cls, path: str, k: int = 5, threshold: float = 0.6, multi_ratio: float = 0.75) -> "KNNIntentClassifier":
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported intent index version: {meta.get('version')}")
+
+        hasher = NgramHasher(meta["dim"], meta["ngram_min"], meta["ngram_max"])
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        label_ids = np.load(os.path.join(path, "labels.npy"))
+        labels = [tuple(label) for label in meta["labels"]]
+        return cls(vectors, label_ids, labels, hasher, k=k, threshold=threshold, multi_ratio=multi_ratio)
+
+    @staticmethod
+    def build(
+        examples: Iterable[dict],
+        path: str,
+        dim: int = 2048,
+        ngram_min: int = 3,
+        ngram_max: int = 5,
+    ) -> int:
+        """Write an index for ``{"text", "category", "intent"}`` examples. Returns its size."""
+        hasher = NgramHasher(dim, ngram_min, ngram_max)
+        labels: List[Tuple[str, Optional[str]]] = []
+        label_index = {}
+        texts, label_ids = [], []
+
+        for example in examples:
+            label = (example["category"], example.get("intent") or None)
+            if label not in label_index:
+                label_index[label] = len(labels)
+                labels.append(label)
+            texts.append(example["text"])
+            label_ids.append(label_index[label])
+
+        if not texts:
+            raise ValueError("Cannot build an intent index without examples")
+
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), hasher.transform(texts))
+        np.save(os.path.join(path, "labels.npy"), np.asarray(label_ids, dtype=np.int32))
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "dim": dim,
+                    "ngram_min": ngram_min,
+                    "ngram_max": ngram_max,
+                    "labels": labels,
+                },
+                fh,
+            )
+        return len(texts)
+
+    def predict(self, message: str) -> Tuple[dict, float]:
+        query = self.hasher.transform_one(message)
+        sims = self.vectors @ query
+
+        top = np.argpartition(-sims, self.k - 1)[: self.k]
+        top_sims = np.clip(sims[top], 0.0, None)
+        total = float(top_sims.sum())
+        if total <= 0.0:
+            return {"category": "out_of_scope", "intent": None, "intents": []}, 0.0
+
+        votes = np.bincount(self.label_ids[top], weights=top_sims, minlength=len(self.labels))
+        winner = int(votes.argmax())
+        best_sim = float(top_sims[self.label_ids[top] == winner].max())
+        confidence = float(votes[winner]) / total * best_sim
+
+        category, intent = self.labels[winner]
+        # Best similarity of each label over the whole index
+        best = np.maximum.reduceat(sims[self._by_label], self._label_starts)
+        contenders = self._label_of_group[best >= best_sim * self.multi_ratio]
+        intents = [
+            self.labels[i][1]
+            for i in sorted(contenders, key=lambda i: -votes[i])
+            if self.labels[i][0] == "domain" and self.labels[i][1]
+        ]
+        return {"category": category, "intent": intent, "intents": intents}, confidence
+
+    def classify(self, message: str) -> Optional[dict]:
+        result, confidence = self.predict(message)
+        if confidence < self.threshold:
+            self.misses += 1
+            return None
+        if len(result["intents"]) > 1:
+            self.ambiguous += 1
+            return None
+        self.hits += 1
+        return result
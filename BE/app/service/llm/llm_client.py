@@ -1,39 +1,125 @@
 # app/llm/llm_client.py
 
-import json
+import logging
+import time
+from typing import Optional
 import httpx
 from app.core.config import get_settings
+from app.core.http import open_connections
+from app.core.logging import SampledLogger
+from app.core.metrics import Counter, Histogram
+from app.service.llm.sse import JSONDecodeError, aiter_sse, loads, select_adapter
+from app.service.trace.recorder import active_trace, prompt_digest
 
 settings = get_settings()
 
+logger = logging.getLogger(__name__)
+# Per-chunk events are sampled so debug logging stays usable under load.
+chunk_logger = SampledLogger(logger, settings.LOG_TOKEN_SAMPLE_RATE)
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "Duration of LLM API calls (whole stream for streaming calls).",
+    labelnames=("mode",),
+)
+LLM_RESPONSES = Counter(
+    "llm_responses_total",
+    "LLM API responses by HTTP status ('error' for network failures).",
+    labelnames=("mode", "status"),
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from sending a streaming request to receiving its first token.",
+)
+LLM_STREAM_TOKENS_PER_SECOND = Histogram(
+    "llm_stream_tokens_per_second",
+    "Generation speed of a stream, measured after its first token.",
+    buckets=(1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 400),
+)
+LLM_STREAM_TOKENS = Counter(
+    "llm_stream_tokens_total",
+    "Tokens (content chunks) received from streaming calls.",
+)
+# Weight of the newest call in LLMClient.latency_ewma.
+LATENCY_EWMA_ALPHA = 0.2
+
 
 
 class LLMClient:
-    def __init__(self, api_url: str, api_key: str, model_name: str):
+    def __init__(self, api_url: str, api_key: str, model_name: str, max_connections: int = 100):
         self.api_url = api_url
         self.api_key = api_key
         self.model_name = model_name
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client: Optional[httpx.AsyncClient] = None
+        # Load signals for admission control: requests waiting on the LLM and
+        # a moving average of how long it takes to start answering.
+        self.in_flight = 0
+        self.latency_ewma = 0.0
 
         if not self.api_key:
                     raise ValueError("HF_API_KEY is missing! Please set it in the environment.")
-    async def generate(self, messages: list):
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Shared for the life of the app so TLS connections are reused
+        # across requests; closed by aclose() on shutdown.
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=40.0, limits=self.limits)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def warm_up(self, connections: int = 1) -> int:
+        """Open ``connections`` pooled connections to the LLM host."""
+        return await open_connections(self.client, self.api_url, connections)
+
+    def _observe_latency(self, seconds: float):
+        self.latency_ewma += LATENCY_EWMA_ALPHA * (seconds - self.latency_ewma)
+
+    async def generate(self, messages: list, max_tokens: int = 256):
         payload = {
             "model": settings.HF_MODEL_NAME,  # Example: "meta-llama/Meta-Llama-3-8B-Instruct"
             "messages": messages,
-            "max_tokens": 256,
+            "max_tokens": max_tokens,
             "temperature": 0.3
         }
         headers = {"Authorization": f"Bearer {self.api_key}"}
     
 
-        async with httpx.AsyncClient(timeout=40.0) as client:
-            response = await client.post(self.api_url, json=payload, headers=headers)
+        started = time.perf_counter()
+        trace = active_trace()
+        self.in_flight += 1
+        try:
+            response = await self.client.post(self.api_url, json=payload, headers=headers)
+        except httpx.RequestError as e:
+            LLM_RESPONSES.labels("generate", "error").inc()
+            if trace is not None:
+                trace.add("llm", started, time.perf_counter() - started, mode="generate",
+                          request=prompt_digest(messages), error=str(e))
+            raise
+        finally:
+            self.in_flight -= 1
+            self._observe_latency(time.perf_counter() - started)
+            LLM_REQUEST_DURATION.labels("generate").observe(time.perf_counter() - started)
+        LLM_RESPONSES.labels("generate", response.status_code).inc()
+
+        if trace is not None and response.is_error:
+            trace.add("llm", started, time.perf_counter() - started, mode="generate",
+                      request=prompt_digest(messages), status=response.status_code, error=response.text[:500])
 
         response.raise_for_status()
         data = response.json()
 
         # HF API responds like OpenAI: { choices: [ { message: { content: "..." } } ] }
-        return data["choices"][0]["message"]["content"]
+        content = data["choices"][0]["message"]["content"]
+        if trace is not None:
+            trace.add("llm", started, time.perf_counter() - started, mode="generate",
+                      request=prompt_digest(messages), status=response.status_code, response=content)
+        return content
     
 
 
@@ -58,59 +144,83 @@ class LLMClient:
         headers = {"Authorization": f"Bearer {self.api_key}"}
         
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                async with client.stream("POST", self.api_url, json=payload, headers=headers) as r:
-                    print(f"DEBUG [llm_client]: Response status: {r.status_code}")
-                    
-                    if r.status_code != 200:
-                        # Read error response
-                        error_data = await r.aread()
-                        error_text = error_data.decode('utf-8', errors='ignore')
-                        print(f"DEBUG [llm_client]: API error: {error_text}")
-                        yield f"Error {r.status_code}: {error_text[:100]}"
+        started = time.perf_counter()
+        first_token_at = None
+        tokens = 0
+        trace = active_trace()
+        recorded = [] if trace is not None else None
+        self.in_flight += 1
+        try:
+            async for token in self._stream(payload, headers):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    LLM_TIME_TO_FIRST_TOKEN.observe(first_token_at - started)
+                    self._observe_latency(first_token_at - started)
+                tokens += 1
+                if recorded is not None:
+                    recorded.append((token, round(time.perf_counter() - started, 4)))
+                yield token
+        finally:
+            finished = time.perf_counter()
+            self.in_flight -= 1
+            if first_token_at is None:
+                self._observe_latency(finished - started)
+            if trace is not None:
+                trace.add("llm", started, finished - started, mode="stream", request=prompt_digest(messages),
+                          tokens=[t for t, _ in recorded], token_offsets=[o for _, o in recorded])
+            LLM_REQUEST_DURATION.labels("stream").observe(finished - started)
+            LLM_STREAM_TOKENS.inc(tokens)
+            if first_token_at is not None and tokens > 1 and finished > first_token_at:
+                LLM_STREAM_TOKENS_PER_SECOND.observe((tokens - 1) / (finished - first_token_at))
+
+    async def _stream(self, payload: dict, headers: dict):
+        try:
+            async with self.client.stream("POST", self.api_url, json=payload, headers=headers, timeout=30.0) as r:
+                logger.debug("LLM stream opened", extra={"status": r.status_code})
+                LLM_RESPONSES.labels("stream", r.status_code).inc()
+                
+                if r.status_code != 200:
+                    # Read error response
+                    error_data = await r.aread()
+                    error_text = error_data.decode('utf-8', errors='ignore')
+                    logger.warning(
+                        "LLM stream rejected",
+                        extra={"status": r.status_code, "body": error_text[:500]},
+                    )
+                    yield f"Error {r.status_code}: {error_text[:100]}"
+                    return
+                
+                adapter = None
+                async for _, data in aiter_sse(r.aiter_bytes()):
+                    chunk_logger.debug("LLM stream event", data=data)
+                    if data == "[DONE]":
+                        logger.debug("LLM stream complete")
                         return
-                    
-                    async for line in r.aiter_lines():
-                        line = line.strip()
-                        if not line:
+
+                    try:
+                        chunk = loads(data)
+                    except JSONDecodeError as e:
+                        chunk_logger.debug("LLM stream chunk is not JSON: %s", e, data=data)
+                        # If not JSON, pass it on as plain text
+                        if data:
+                            yield data
+                        continue
+                    if not isinstance(chunk, dict):
+                        continue
+
+                    # The response format is fixed for a stream, so the
+                    # extractor is chosen once, from the first chunk.
+                    if adapter is None:
+                        adapter = select_adapter(chunk)
+                        if adapter is None:
+                            chunk_logger.debug("LLM stream chunk in unknown format", chunk=chunk)
                             continue
-                        
-                        print(f"DEBUG [llm_client]: Raw line: {repr(line)}")
-                        
-                        if line.startswith("data: "):
-                            data = line[6:]  # Remove "data: "
-                            
-                            if data == "[DONE]":
-                                print("DEBUG [llm_client]: Stream complete")
-                                break
-                            
-                            try:
-                                chunk = json.loads(data)
-                                print(f"DEBUG [llm_client]: Parsed chunk: {chunk}")
-                                
-                                # OpenAI stream format
-                                if "choices" in chunk and chunk["choices"]:
-                                    delta = chunk["choices"][0].get("delta", {})
-                                    token = delta.get("content", "")
-                                    if token:
-                                        yield token
-                                # Alternative format
-                                elif "content" in chunk:
-                                    yield chunk["content"]
-                                elif "text" in chunk:
-                                    yield chunk["text"]
-                                elif "token" in chunk and "text" in chunk["token"]:
-                                    yield chunk["token"]["text"]
-                                else:
-                                    print(f"DEBUG [llm_client]: Unexpected format: {chunk}")
-                                    
-                            except json.JSONDecodeError as e:
-                                print(f"DEBUG [llm_client]: JSON error: {e}, data: {data}")
-                                # If not JSON, try as plain text
-                                if data and data != "[DONE]":
-                                    yield data
-                    
-            except Exception as e:
-                print(f"DEBUG [llm_client]: Exception: {e}")
-                yield f"Connection error: {str(e)}"
\ No newline at end of file
+                    token = adapter(chunk)
+                    if token:
+                        yield token
+
+        except Exception as e:
+            if isinstance(e, httpx.RequestError):
+                LLM_RESPONSES.labels("stream", "error").inc()
+            logger.warning("LLM stream failed: %s", e, exc_info=not isinstance(e, httpx.RequestError))
+            yield f"Connection error: {str(e)}"
\ No newline at end of file
@@ -1,77 +1,94 @@
 # app/intents/classifier.py
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 import json
+import logging
+import time
+from app.core.metrics import Counter, Histogram
 from app.service.llm.llm_client import LLMClient
+from app.service.llm.classify_batcher import ClassifyBatcher
+from app.service.llm.prompts import (
+    CLASSIFY_SYSTEM_PROMPT,
+    CLASSIFY_FALLBACK,
+    EXTRACT_TASKS_SYSTEM_PROMPT,
+    parse_llm_json,
+)
+
+if TYPE_CHECKING:
+    # numpy-backed; only imported at runtime when an index is configured.
+    from app.service.llm.knn_classifier import KNNIntentClassifier
+
+logger = logging.getLogger(__name__)
+
+LLM_OPERATION_DURATION = Histogram(
+    "llm_operation_duration_seconds",
+    "Duration of LLM-backed operations (classify, extract_params, extract_tasks).",
+    labelnames=("operation",),
+)
+INTENT_CLASSIFICATIONS = Counter(
+    "intent_classifications_total",
+    "Intent classifications by the component that answered (knn, batch, llm).",
+    labelnames=("classifier",),
+)
+
 
 class LLMService:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        batcher: Optional[ClassifyBatcher] = None,
+        knn: Optional["KNNIntentClassifier"] = None,
+    ):
         self.llm = llm_client
+        # Opt-in: when set, classify_intent calls from concurrent users are
+        # coalesced into a single LLM request.
+        self.batcher = batcher
+        # Optional local classifier; the LLM is only asked below its threshold.
+        self.knn = knn
 
 
 
-    async def classify_intent(self, message: str) -> dict:
+    async def classify_intent(self, message: str, trace: Optional[dict] = None) -> dict:
         """
         Returns:
         {
             "category": "domain" | "small_talk" | "out_of_scope",
-            "intent": "pnr_status" | "greeting" | null
+            "intent": "pnr_status" | "greeting" | null,
+            "intents": ["pnr_status", "live_status"]
         }
+        If given, ``trace["classifier"]`` records who answered: knn, batch or llm.
         """
-        prompt = [
-            {
-                "role": "system",
-                "content": """
-            You are an intent classifier for an IRCTC chatbot.
+        trace = trace if trace is not None else {}
+        started = time.perf_counter()
+        try:
+            return await self._classify_intent(message, trace)
+        finally:
+            LLM_OPERATION_DURATION.labels("classify").observe(time.perf_counter() - started)
+            INTENT_CLASSIFICATIONS.labels(trace.get("classifier", "llm")).inc()
 
-            Return a JSON with:
-            {
-            "category": "domain" | "small_talk" | "out_of_scope",
-            "intent": "<intent_name or null>"
-            }
+    async def _classify_intent(self, message: str, trace: dict) -> dict:
+        if self.knn is not None:
+            result = self.knn.classify(message)
+            if result is not None:
+                trace["classifier"] = "knn"
+                return result
 
-            ====================
-            SMALL TALK INTENTS:
-            - greeting (hi, hello, good morning, hey)
-            - farewell (bye, good night)
-            - thanks (thanks, thank you)
-            - how_are_you (how are you?)
-
-            ====================
-            DOMAIN INTENTS:
-            - train_between_stations
-            - live_status
-            - train_schedule
-            - seat_availability
-            - pnr_status
-            - search_train
-            - search_station
-            - get_fare
-
-            ====================
-            OUT OF SCOPE:
-            Anything unrelated to trains or IRCTC.
-
-            STRICT RULES:
-            - Return ONLY JSON.
-            - No markdown. No explanation.
-            """
-            },
+        if self.batcher is not None:
+            trace["classifier"] = "batch"
+            return await self.batcher.classify(message)
+
+        trace["classifier"] = "llm"
+
+        prompt = [
+            {"role": "system", "content": CLASSIFY_SYSTEM_PROMPT},
             {"role": "user", "content": message}
         ]
 
         response = await self.llm.generate(prompt)
 
-        cleaned = response.strip()
         try:
-            if cleaned.startswith("```"):
-                cleaned = cleaned.split("```")[1]
-                if cleaned.startswith("json"):
-                    cleaned = cleaned[4:]
-            cleaned = cleaned.strip()
-
-            return json.loads(cleaned)
+            return parse_llm_json(response)
         except Exception:
-            return {"category": "out_of_scope", "intent": None}
+            return dict(CLASSIFY_FALLBACK)
 
 
     async def extract_params(self, intent: str, message: str) -> Dict[str, Any]:
@@ -117,27 +134,70 @@ class LLMService:
             {"role": "user", "content": message},
         ]
 
-        result = await self.llm.generate(prompt)
+        started = time.perf_counter()
+        try:
+            result = await self.llm.generate(prompt)
+        finally:
+            LLM_OPERATION_DURATION.labels("extract_params").observe(time.perf_counter() - started)
 
         # Parse LLM response
         try:
-            # Clean up markdown code blocks if LLM wrapped response
-            cleaned = result.strip()
-            if cleaned.startswith("```"):
-                cleaned = cleaned.split("```")[1]
-                if cleaned.startswith("json"):
-                    cleaned = cleaned[4:]
-            cleaned = cleaned.strip()
-
-            extracted = json.loads(cleaned)
+            extracted = parse_llm_json(result)
 
             # Filter out null/empty values
             return {k: v for k, v in extracted.items() if v and v != "null"}
 
         except (json.JSONDecodeError, IndexError) as e:
-            print(f"Failed to parse LLM response: {e}")
+            logger.warning("Failed to parse LLM response: %s", e, extra={"operation": "extract_params"})
             return {}
 
+    async def extract_tasks(self, intents: List[str], message: str) -> List[Dict[str, Any]]:
+        """
+        Extract parameters for several intents asked in one message, with a
+        single LLM call. Returns [{"intent": ..., "params": {...}}] for the
+        known intents, in the order asked.
+        """
+        schemas = {intent: self._get_param_schema(intent) for intent in intents}
+        schemas = {intent: schema for intent, schema in schemas.items() if schema}
+        if not schemas:
+            return []
+
+        prompt = [
+            {
+                "role": "system",
+                "content": EXTRACT_TASKS_SYSTEM_PROMPT.format(schemas=json.dumps(schemas, indent=2)),
+            },
+            {"role": "user", "content": message},
+        ]
+
+        started = time.perf_counter()
+        try:
+            result = await self.llm.generate(prompt, max_tokens=96 * len(schemas))
+        finally:
+            LLM_OPERATION_DURATION.labels("extract_tasks").observe(time.perf_counter() - started)
+
+        try:
+            extracted = parse_llm_json(result)
+        except (json.JSONDecodeError, IndexError) as e:
+            logger.warning("Failed to parse LLM response: %s", e, extra={"operation": "extract_tasks"})
+            extracted = []
+
+        tasks = []
+        for entry in extracted if isinstance(extracted, list) else []:
+            if not isinstance(entry, dict) or entry.get("intent") not in schemas:
+                continue
+            params = entry.get("params") or {}
+            tasks.append({
+                "intent": entry["intent"],
+                "params": {k: v for k, v in params.items() if v and v != "null"},
+            })
+
+        # Intents the model skipped still become tasks, so they are reported
+        # as missing parameters instead of silently dropped.
+        seen = {task["intent"] for task in tasks}
+        tasks.extend({"intent": intent, "params": {}} for intent in schemas if intent not in seen)
+        return tasks
+
     def _get_param_schema(self, intent: str) -> Dict[str, str]:
         """Return parameter schema (name -> description) for each intent."""
         schemas = {
@@ -147,9 +207,7 @@ class LLMService:
                     "date": "Journey date (YYYY-MM-DD)",
                 },
                 "pnr_status": {"pnr": "10-digit PNR number"},
-                "live_status": {
-                    "trainNo": "Train number",
-                },
+                "live_status": {"train_no": "Train number"},
                 "train_schedule": {"train_no": "Train number"},
                 "seat_availability": {
                 "train_no": "Train number (e.g., 19038)",
@@ -196,14 +254,11 @@ class LLMService:
             yield token
 
     async def generate_stream(self, message: str):
-        print(f"DEBUG [llm_service]: Received message: '{message}'")
-        
         # Convert string to OpenAI messages format
         messages = [
             {"role": "user", "content": message}
         ]
-        
-        print(f"DEBUG [llm_service]: Sending to LLM client: {messages}")
-        
+        logger.debug("Streaming free-form reply", extra={"chars": len(message)})
+
         async for token in self.llm.generate_stream(messages):
             yield token
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""Prompts and response parsing shared by the LLM services."""
+import json
+
+CLASSIFY_SYSTEM_PROMPT = """
+            You are an intent classifier for an IRCTC chatbot.
+
+            Return a JSON with:
+            {
+            "category": "domain" | "small_talk" | "out_of_scope",
+            "intent": "<intent_name or null>",
+            "intents": ["<intent_name>", ...]
+            }
+            "intents" lists every DOMAIN intent the message asks for, in the
+            order asked; "intent" is the first of them.
+
+            ====================
+            SMALL TALK INTENTS:
+            - greeting (hi, hello, good morning, hey)
+            - farewell (bye, good night)
+            - thanks (thanks, thank you)
+            - how_are_you (how are you?)
+
+            ====================
+            DOMAIN INTENTS:
+            - train_between_stations
+            - live_status
+            - train_schedule
+            - seat_availability
+            - pnr_status
+            - search_train
+            - search_station
+            - get_fare
+
+            ====================
+            OUT OF SCOPE:
+            Anything unrelated to trains or IRCTC.
+
+            STRICT RULES:
+            - Return ONLY JSON.
+            - No markdown. No explanation.
+            """
+
+CLASSIFY_FALLBACK = {"category": "out_of_scope", "intent": None}
+
+EXTRACT_TASKS_SYSTEM_PROMPT = """
+        You are a parameter extraction assistant for an Indian Railways chatbot.
+
+        The user's message asks for several things at once. For each of these
+        intents, extract its parameters from the message:
+        {schemas}
+
+        Return ONLY a JSON array, one object per request, in the order asked:
+        [{{"intent": "<intent_name>", "params": {{"<name>": "<value or null>"}}}}]
+        Use null for parameters not found in the message.
+        Important:
+        - Station names should be station codes (e.g., "NDLS" for New Delhi)
+        - Always convert extracted dates to YYYY-MM-DD format.
+        - Train numbers without spaces
+        - PNR as a 10-digit string
+        """
+
+
+def parse_llm_json(text: str):
+    """Parse a JSON answer from the LLM, tolerating a markdown code fence."""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("```")[1]
+        if cleaned.startswith("json"):
+            cleaned = cleaned[4:]
+    return json.loads(cleaned.strip())
@@ -0,0 +1,136 @@
+"""Incremental Server-Sent Events decoding for LLM streams.
+
+``SSEDecoder`` works on raw bytes as they arrive, so a line or a multi-byte
+character split across network chunks is reassembled without decoding the
+whole body as text first. The text of each chunk is pulled out by an adapter
+chosen from the first JSON chunk of the stream, rather than probing every
+chunk for every known response shape.
+"""
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+
+    loads = orjson.loads
+    JSONDecodeError = orjson.JSONDecodeError
+except ImportError:  # optional speedup
+    import json
+
+    loads = json.loads
+    JSONDecodeError = json.JSONDecodeError
+
+
+class SSEDecoder:
+    """
+    Feeds bytes, yields ``(event, data)`` pairs per the SSE spec: ``data:``
+    lines of one event are joined with ``\\n``, ``:`` comment lines and
+    unknown fields are ignored, and CRLF, CR and LF all end a line.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._event = ""
+        self._data: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[str, str]]:
+        buffer = self._buffer + chunk if self._buffer else chunk
+        if b"\r" in buffer:
+            # A trailing CR may be the first half of a CRLF; wait for more.
+            keep_cr = buffer.endswith(b"\r")
+            if keep_cr:
+                buffer = buffer[:-1]
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            if keep_cr:
+                buffer += b"\r"
+
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            event = self._line(buffer[start:end])
+            if event is not None:
+                yield event
+            start = end + 1
+        self._buffer = buffer[start:]
+
+    def close(self) -> Iterator[Tuple[str, str]]:
+        """End of stream: dispatch a final event that lacks its blank line."""
+        buffer, self._buffer = self._buffer.rstrip(b"\r"), b""
+        if buffer:
+            event = self._line(buffer)
+            if event is not None:
+                yield event
+        event = self._line(b"")
+        if event is not None:
+            yield event
+
+    def _line(self, line: bytes) -> Optional[Tuple[str, str]]:
+        if not line:
+            if not self._data:
+                self._event = ""
+                return None
+            event = (self._event or "message", b"\n".join(self._data).decode("utf-8", errors="replace"))
+            self._event, self._data = "", []
+            return event
+        if line[0] == 0x3A:  # ":" comment / keep-alive
+            return None
+
+        field, sep, value = line.partition(b":")
+        if sep and value[:1] == b" ":
+            value = value[1:]
+        if field == b"data":
+            self._data.append(value)
+        elif field == b"event":
+            self._event = value.decode("utf-8", errors="replace")
+        return None
+
+
+async def aiter_sse(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[str, str]]:
+    """``(event, data)`` pairs from a byte stream such as ``response.aiter_bytes()``."""
+    decoder = SSEDecoder()
+    async for chunk in chunks:
+        for event in decoder.feed(chunk):
+            yield event
+    for event in decoder.close():
+        yield event
+
+
+# ---- chunk formats ----------------------------------------------------------
+
+def _openai(chunk: dict) -> Optional[str]:
+    # {"choices": [{"delta": {"content": "..."}}]}; role-only and usage-only
+    # chunks carry no text.
+    choices = chunk.get("choices")
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content")
+
+
+def _content(chunk: dict) -> Optional[str]:
+    return chunk.get("content")
+
+
+def _text(chunk: dict) -> Optional[str]:
+    return chunk.get("text")
+
+
+def _tgi_token(chunk: dict) -> Optional[str]:
+    # text-generation-inference: {"token": {"text": "..."}}
+    return (chunk.get("token") or {}).get("text")
+
+
+ChunkAdapter = Callable[[dict], Optional[str]]
+
+
+def select_adapter(chunk: dict) -> Optional[ChunkAdapter]:
+    """Pick the text extractor for a stream from one of its JSON chunks."""
+    if "choices" in chunk:
+        return _openai
+    if "content" in chunk:
+        return _content
+    if "text" in chunk:
+        return _text
+    if isinstance(chunk.get("token"), dict):
+        return _tgi_token
+    return None
@@ -0,0 +1,51 @@
+"""Request profiles kept in Redis for later download."""
+import asyncio
+import json
+import logging
+from typing import Optional
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileStore:
+    """
+    ``profile:<id>`` is a hash with the collapsed stacks and a JSON ``meta``
+    field, expiring after ``ttl_seconds``.
+    """
+
+    PREFIX = "profile:"
+
+    def __init__(self, redis: Redis, ttl_seconds: int = 3600):
+        self.redis = redis
+        self.ttl = ttl_seconds
+        self._tasks: set = set()
+
+    def _key(self, profile_id: str) -> str:
+        return f"{self.PREFIX}{profile_id}"
+
+    async def save(self, profile_id: str, profile: dict):
+        collapsed = profile.pop("collapsed", "")
+        key = self._key(profile_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={"collapsed": collapsed, "meta": json.dumps(profile)})
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    def save_later(self, profile_id: str, profile: dict):
+        """Save from a context that may be cancelled, e.g. a closing stream."""
+        task = asyncio.create_task(self._save_logged(profile_id, profile))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _save_logged(self, profile_id: str, profile: dict):
+        try:
+            await self.save(profile_id, profile)
+        except Exception as e:
+            logger.error("Saving request profile failed: %s", e, extra={"profile_id": profile_id})
+
+    async def get(self, profile_id: str) -> Optional[dict]:
+        data = await self.redis.hgetall(self._key(profile_id))
+        if not data:
+            return None
+        return {**json.loads(data.get("meta", "{}")), "collapsed": data.get("collapsed", "")}
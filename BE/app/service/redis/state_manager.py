@@ -1,72 +1,535 @@
-"""Manages the state and message history of conversations using Redis."""
+"""Manages the state and message history of conversations using Redis.
+
+State is a hash per conversation: ``intent``, ``stage`` and one ``p:<name>``
+field per parameter, so collecting parameters over several turns writes only
+the fields that changed. Field values and history entries are msgpack;
+history entries over ``COMPRESS_THRESHOLD`` bytes are also zlib-compressed.
+
+Conversations written by earlier versions, under ``chat:<id>:state`` /
+``:messages`` (no hash tag) with the state as one JSON string or a hash and
+history entries as JSON objects or msgpack, are still found: on a state miss
+the old keys are read and moved to the current ones (``_migrate_legacy``).
+That only applies to a single Redis, where old keys can exist, and only for
+one state TTL after start, after which any old key has expired.
+
+With ``cache_entries`` set, states and histories are also kept in an
+in-process near cache (``NearCache``), so the reads of a turn that this
+worker already has are not round trips. Every write publishes its keys on
+``invalidation_channel``; each worker drops the keys other workers wrote.
+The cache is only used while the worker is subscribed, and is emptied
+whenever it (re)subscribes, as invalidations may have been missed.
+
+Keys are ``chat:{<conversation_id>}:state`` and ``:messages``: the hash tag
+puts both keys of a conversation in the same slot, so the keyspace can be a
+Redis Cluster (``cluster_nodes``) with every per-conversation pipeline and
+transaction still going to a single node. Without a cluster, ``shards``
+spreads conversations over independent Redis servers by the same slot;
+slots are assigned to shards by rendezvous hashing, so adding a shard only
+moves the conversations that land on it.
+"""
+import hashlib
 import json
-from typing import Optional
+import logging
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import msgpack
 from redis import Redis
+from redis.cluster import ClusterNode, RedisCluster
+from redis.crc import REDIS_CLUSTER_HASH_SLOTS, key_slot
+from redis.exceptions import RedisError
+from app.core.cache import NearCache
 from app.core.config import get_settings
+from app.core.metrics import Counter, Gauge, Histogram
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+STATE_OPERATION_DURATION = Histogram(
+    "state_operation_duration_seconds",
+    "Redis round-trip time of conversation state operations.",
+    labelnames=("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+STATE_LOOKUPS = Counter(
+    "state_lookups_total",
+    "Conversation state reads, by whether a state was found.",
+    labelnames=("result",),
+)
+STATE_MIGRATIONS = Counter(
+    "state_legacy_migrations_total",
+    "Conversations found under the old key names and moved to the current keys.",
+)
+STATE_CACHE_LOOKUPS = Counter(
+    "state_near_cache_lookups_total",
+    "Near cache lookups of conversation state and history, by kind and result.",
+    labelnames=("kind", "result"),
+)
+STATE_CACHE_INVALIDATIONS = Counter(
+    "state_near_cache_invalidations_total",
+    "Near cache entries dropped: written by another worker (remote), emptied "
+    "on (re)subscribing (reset) or evicted for space (evicted).",
+    labelnames=("reason",),
+)
+STATE_CACHE_BYTES = Gauge(
+    "state_near_cache_bytes",
+    "Approximate size of the conversation state near cache.",
+)
+
+# First byte of an encoded history entry; JSON entries start with "{".
+MSGPACK = b"\x01"
+MSGPACK_ZLIB = b"\x02"
+COMPRESS_THRESHOLD = 1024
+PARAM_PREFIX = b"p:"
+_UNSET = object()
+# Reused: a Packer per call costs as much as the packing. Like the rest of
+# StateManager, only used from the event loop thread.
+_pack = msgpack.Packer().pack
+
+
+def encode_message(role: str, content: str) -> bytes:
+    packed = _pack([role, content])
+    if len(packed) > COMPRESS_THRESHOLD:
+        return MSGPACK_ZLIB + zlib.compress(packed, 1)
+    return MSGPACK + packed
+
+
+def decode_message(raw: bytes) -> dict:
+    marker = raw[:1]
+    if marker == MSGPACK:
+        role, content = msgpack.unpackb(raw[1:])
+    elif marker == MSGPACK_ZLIB:
+        role, content = msgpack.unpackb(zlib.decompress(raw[1:]))
+    else:
+        return json.loads(raw)
+    return {"role": role, "content": content}
+
+
+def encode_fields(intent: Any = _UNSET, stage: Any = _UNSET, params: Optional[dict] = None) -> Dict[bytes, bytes]:
+    """Hash fields for the given parts of a state; parts not given are left out."""
+    fields = {}
+    if intent is not _UNSET:
+        fields[b"intent"] = _pack(intent)
+    if stage is not _UNSET:
+        fields[b"stage"] = _pack(stage)
+    for name, value in (params or {}).items():
+        fields[PARAM_PREFIX + name.encode()] = _pack(value)
+    return fields
+
+
+def decode_fields(fields: Dict[bytes, bytes]) -> Optional[dict]:
+    state = {"params": {}}
+    for field, value in fields.items():
+        if field.startswith(PARAM_PREFIX):
+            state["params"][field[len(PARAM_PREFIX):].decode()] = msgpack.unpackb(value)
+        else:
+            state[field.decode()] = msgpack.unpackb(value)
+    # A hash without an intent is the tail of an expired state.
+    return state if "intent" in state else None
+
+
+def _copy_state(state: dict) -> dict:
+    # Callers update params in place; the cached copy must not see that.
+    return {**state, "params": dict(state["params"])}
+
+
+def _state_size(state: dict) -> int:
+    params = sum(len(name) + len(str(value)) + 16 for name, value in state["params"].items())
+    return len(str(state.get("intent"))) + len(str(state.get("stage"))) + params + 64
+
+
+def _history_size(history: Tuple[Tuple[str, str], ...]) -> int:
+    return sum(len(role) + len(content) + 64 for role, content in history)
+
+
+def parse_nodes(spec: str) -> List[Tuple[str, int]]:
+    """``"10.0.0.1:6379,10.0.0.2:6379"`` -> [(host, port), ...]."""
+    nodes = []
+    for item in spec.split(","):
+        host, _, port = item.strip().rpartition(":")
+        if item.strip():
+            nodes.append((host or item.strip(), int(port) if host else 6379))
+    return nodes
+
+
+def shard_slots(names: List[str]) -> List[int]:
+    """Shard index of every hash slot: the shard scoring highest for it (rendezvous)."""
+    return [
+        max(range(len(names)), key=lambda i: hashlib.blake2b(f"{names[i]}/{slot}".encode(), digest_size=8).digest())
+        for slot in range(REDIS_CLUSTER_HASH_SLOTS)
+    ]
 
 
 # Add connection pooling for better performance
 class StateManager:
-    def __init__(self, host: str, port: int, db: int):
-        self.redis = Redis(
-            host=host,
-            port=port,
-            db=db,
-            decode_responses=True,
-            max_connections=10  
-        )
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        db: int,
+        cache_entries: int = 0,
+        cache_bytes: int = 64 * 1024 * 1024,
+        cache_ttl: float = 300.0,
+        invalidation_channel: str = "chat:invalidate",
+        cluster_nodes: str = "",
+        shards: str = "",
+    ):
+        # One client per shard when sharding client-side, else just self.redis.
+        self.shards: List[Redis] = []
+        self.cluster = bool(cluster_nodes)
+        if cluster_nodes:
+            self.redis = RedisCluster(
+                startup_nodes=[ClusterNode(h, p) for h, p in parse_nodes(cluster_nodes)],
+                max_connections=10,
+            )
+        elif shards:
+            nodes = parse_nodes(shards)
+            self.shards = [Redis(host=h, port=p, db=db, max_connections=10) for h, p in nodes]
+            self._slot_shard = shard_slots([f"{h}:{p}" for h, p in nodes])
+            self.redis = self.shards[0]
+        else:
+            self.redis = Redis(
+                host=host,
+                port=port,
+                db=db,
+                max_connections=10
+            )
         self.ttl = 3600
         self.max_history = 20
+        # Old (untagged) keys were only ever written to a single Redis.
+        self._legacy_until = 0.0 if cluster_nodes or shards else time.time() + self.ttl
+
+        self.cache = NearCache(cache_entries, cache_bytes) if cache_entries > 0 else None
+        # Upper bound on how long an entry is served without being re-read
+        self.cache_ttl = cache_ttl
+        self.channel = invalidation_channel
+        self._origin = uuid.uuid4().hex.encode()
+        self._listeners: List[threading.Thread] = []
+        # Indexes (in self.nodes) of the nodes whose channel is subscribed
+        self._subscribed = set()
+        self._stopped = threading.Event()
 
+    @property
+    def nodes(self) -> List[Redis]:
+        """Clients that each hold part of the keyspace (a cluster client counts as one)."""
+        return self.shards or [self.redis]
+
+    @property
+    def _listening(self) -> bool:
+        return len(self._subscribed) == len(self.nodes)
 
     def health_check(self) -> bool:
         """Check if Redis is accessible"""
         try:
-            return self.redis.ping()
+            return all(node.ping() for node in self.nodes)
         except Exception:
             return False
 
     def _key(self, conversation_id: str, suffix: str) -> str:
-        return f"chat:{conversation_id}:{suffix}"
+        return f"chat:{{{conversation_id}}}:{suffix}"
+
+    def _client(self, key: str) -> Redis:
+        if not self.shards:
+            return self.redis
+        return self.shards[self._slot_shard[key_slot(key.encode())]]
+
 
-    
     def add_message(self, conversation_id: str, role: str, content: str):
         """Add a message to the conversation history."""
         key = self._key(conversation_id, "messages")
-        entry = json.dumps({"role": role, "content": content})
+        started = time.perf_counter()
+        with self._cached_write(key) as cached:
+            pipe = self._client(key).pipeline(transaction=False)
+            pipe.rpush(key, encode_message(role, content))
+            # Limit to last 20 messages
+            pipe.ltrim(key, -self.max_history, -1)
+            # Reset TTL
+            pipe.expire(key, self.ttl)
+            length = self._execute(pipe, key)[0]
+            if cached.value is not None or length == 1:
+                # A new list holds just this message, nothing to read.
+                history = ((cached.value or ()) + ((role, content),))[-self.max_history:]
+                cached.commit(history, _history_size(history), self.ttl)
+        STATE_OPERATION_DURATION.labels("add_message").observe(time.perf_counter() - started)
 
-        self.redis.rpush(key, entry)
-
-        # Limit to last 20 messages
-        self.redis.ltrim(key, -self.max_history, -1)
-
-        # Reset TTL
-        self.redis.expire(key, self.ttl)
+    def trim_messages(self, conversation_id: str, keep: int):
+        """Keep only the last ``keep`` messages of the conversation history."""
+        key = self._key(conversation_id, "messages")
+        with self._cached_write(key) as cached:
+            pipe = self._client(key).pipeline(transaction=False)
+            pipe.ltrim(key, -keep, -1)
+            self._execute(pipe, key)
+            if cached.value is not None:
+                history = cached.value[-keep:]
+                # add_message reset the TTL just before, in the chat flow
+                cached.commit(history, _history_size(history), self.ttl)
 
-    def get_messages(self, conversation_id: str):
+    def get_messages(self, conversation_id: str) -> List[dict]:
         """Retrieve the conversation history."""
         key = self._key(conversation_id, "messages")
-        raw = self.redis.lrange(key, 0, -1)
-        return [json.loads(m) for m in raw]
+        history = self._cached("messages", key)
+        if history is None:
+            started = time.perf_counter()
+            with self._cached_read(key) as cached:
+                pipe = self._client(key).pipeline(transaction=False)
+                pipe.lrange(key, 0, -1)
+                pipe.pttl(key)
+                raw, ttl_ms = pipe.execute()
+                history = tuple((m["role"], m["content"]) for m in map(decode_message, raw))
+                if history:
+                    cached.commit(history, _history_size(history), ttl_ms / 1000)
+            STATE_OPERATION_DURATION.labels("get_messages").observe(time.perf_counter() - started)
+        return [{"role": role, "content": content} for role, content in history]
+
 
-    
     def set_state(self, conversation_id: str, state_data: dict):
-        """Set the conversation state."""
+        """Replace the conversation state."""
         key = self._key(conversation_id, "state")
-        self.redis.set(key, json.dumps(state_data))
-        self.redis.expire(key, self.ttl)
+        started = time.perf_counter()
+        self._write_state(key, state_data)
+        STATE_OPERATION_DURATION.labels("set_state").observe(time.perf_counter() - started)
+
+    def update_state(self, conversation_id: str, stage: Optional[str] = None, params: Optional[dict] = None):
+        """Write only the given stage and parameters of an existing state."""
+        fields = encode_fields(stage=_UNSET if stage is None else stage, params=params)
+        if not fields:
+            return
+        key = self._key(conversation_id, "state")
+        started = time.perf_counter()
+        with self._cached_write(key) as cached:
+            pipe = self._client(key).pipeline(transaction=False)
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, self.ttl)
+            self._execute(pipe, key)
+            if cached.value is not None:
+                state = _copy_state(cached.value)
+                state["params"].update(params or {})
+                if stage is not None:
+                    state["stage"] = stage
+                cached.commit(state, _state_size(state), self.ttl)
+        STATE_OPERATION_DURATION.labels("update_state").observe(time.perf_counter() - started)
 
     def get_state(self, conversation_id: str) -> Optional[dict]:
         """Retrieve the conversation state."""
         key = self._key(conversation_id, "state")
-        raw = self.redis.get(key)
-        if not raw:
+        cached_state = self._cached("state", key)
+        if cached_state is not None:
+            STATE_LOOKUPS.labels("hit").inc()
+            return _copy_state(cached_state)
+        started = time.perf_counter()
+        with self._cached_read(key) as cached:
+            pipe = self._client(key).pipeline(transaction=False)
+            pipe.hgetall(key)
+            pipe.pttl(key)
+            fields, ttl_ms = pipe.execute()
+            state = decode_fields(fields)
+            if state:
+                cached.commit(_copy_state(state), _state_size(state), ttl_ms / 1000)
+        if state is None and time.time() < self._legacy_until:
+            state = self._migrate_legacy(conversation_id)
+        STATE_OPERATION_DURATION.labels("get_state").observe(time.perf_counter() - started)
+        if not state:
+            STATE_LOOKUPS.labels("miss").inc()
             return None
-        return json.loads(raw)
+        STATE_LOOKUPS.labels("hit").inc()
+        return state
+
+    def _write_state(self, key: str, state_data: dict):
+        fields = encode_fields(state_data.get("intent"), state_data.get("stage"), state_data.get("params"))
+        with self._cached_write(key) as cached:
+            pipe = self._client(key).pipeline(transaction=True)
+            pipe.delete(key)
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, self.ttl)
+            self._execute(pipe, key)
+            state = {
+                "intent": state_data.get("intent"),
+                "stage": state_data.get("stage"),
+                "params": dict(state_data.get("params") or {}),
+            }
+            cached.commit(state, _state_size(state), self.ttl)
+
+    def _migrate_legacy(self, conversation_id: str) -> Optional[dict]:
+        """Move a conversation stored under the old key names; its state, if any."""
+        old_state, old_messages = f"chat:{conversation_id}:state", f"chat:{conversation_id}:messages"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.type(old_state)
+        pipe.lrange(old_messages, 0, -1)
+        kind, history = pipe.execute()
+        if kind == b"string":
+            raw = self.redis.get(old_state)
+            state = json.loads(raw) if raw else None
+        elif kind == b"hash":
+            state = decode_fields(self.redis.hgetall(old_state))
+        else:
+            state = None
+        if state is None and not history:
+            return None
+
+        if state is not None:
+            self._write_state(self._key(conversation_id, "state"), state)
+        key = self._key(conversation_id, "messages")
+        pipe = self.redis.pipeline(transaction=True)
+        if history:
+            # Older than anything this turn already added. Entries keep their
+            # encoding; decode_message reads JSON and msgpack alike.
+            pipe.lpush(key, *reversed(history))
+            pipe.ltrim(key, -self.max_history, -1)
+            pipe.expire(key, self.ttl)
+        pipe.delete(old_state)
+        pipe.delete(old_messages)
+        self._execute(pipe, key)
+        if self.cache is not None:
+            self.cache.invalidate(key)
+        STATE_MIGRATIONS.inc()
+        logger.debug("Migrated conversation from the old key names", extra={"conversation_id": conversation_id})
+        return state
 
     def clear(self, conversation_id: str):
         """Clear the conversation state and message history."""
-        self.redis.delete(self._key(conversation_id, "messages"))
-        self.redis.delete(self._key(conversation_id, "state"))
+        keys = [self._key(conversation_id, "messages"), self._key(conversation_id, "state")]
+        pipe = self._client(keys[0]).pipeline(transaction=False)
+        for key in keys:
+            # One key per DEL: cluster pipelines refuse multi-key DEL.
+            pipe.delete(key)
+        self._execute(pipe, *keys)
+        if self.cache is not None:
+            for key in keys:
+                self.cache.invalidate(key)
+
+    def close(self):
+        """Stop the invalidation listener and close the connection pool."""
+        self._stopped.set()
+        for listener in self._listeners:
+            listener.join(timeout=2)
+        for node in self.nodes:
+            node.close()
+
+    # ---------------------------------------------------------------- near cache
+
+    def cache_stats(self) -> dict:
+        """Near cache hit ratio, size and invalidation counts (this worker)."""
+        lookups = {(kind, result): child.value for (kind, result), child in STATE_CACHE_LOOKUPS.children()}
+        hits = sum(v for (_, result), v in lookups.items() if result == "hit")
+        total = sum(lookups.values())
+        return {
+            "enabled": self.cache is not None,
+            "listening": self._listening,
+            "entries": len(self.cache) if self.cache is not None else 0,
+            "bytes": self.cache.bytes if self.cache is not None else 0,
+            "hit_ratio": hits / total if total else 0.0,
+            "lookups": {f"{kind}_{result}": v for (kind, result), v in lookups.items()},
+            "invalidations": {reason: child.value for (reason,), child in STATE_CACHE_INVALIDATIONS.children()},
+        }
+
+    def _active(self) -> bool:
+        if self.cache is None:
+            return False
+        if not self._listeners:
+            for index, node in enumerate(self.nodes):
+                listener = threading.Thread(
+                    target=self._listen, args=(index, node), name=f"state-invalidation-{index}", daemon=True
+                )
+                listener.start()
+                self._listeners.append(listener)
+        return self._listening
+
+    def _cached(self, kind: str, key: str) -> Any:
+        if not self._active():
+            return None
+        value = self.cache.get(key)
+        STATE_CACHE_LOOKUPS.labels(kind, "miss" if value is None else "hit").inc()
+        return value
+
+    def _cached_read(self, key: str) -> "_CacheSlot":
+        return _CacheSlot(self, key, read=True)
+
+    def _cached_write(self, key: str) -> "_CacheSlot":
+        return _CacheSlot(self, key, read=False)
+
+    def _execute(self, pipe, *keys: str) -> list:
+        """Run a write pipeline and publish the invalidation of ``keys``."""
+        if self.cache is None:
+            return pipe.execute()
+        messages = [self._origin + b" " + key.encode() for key in keys]
+        if not self.cluster:
+            # Same round trip, and the same node as the keys.
+            for message in messages:
+                pipe.publish(self.channel, message)
+            return pipe.execute()
+        # redis-py refuses PUBLISH in cluster pipelines (and the channel is in
+        # another slot than the keys, so it could not join their MULTI).
+        results = pipe.execute()
+        for message in messages:
+            self.redis.publish(self.channel, message)
+        return results
+
+    def _listen(self, index: int, node: Redis):
+        # Writes publish on the node (shard) holding the key; in a cluster
+        # PUBLISH reaches every node, so one subscription covers it.
+        backoff = 0.1
+        while not self._stopped.is_set():
+            pubsub = node.pubsub()
+            try:
+                pubsub.subscribe(self.channel)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message["type"] == "subscribe":
+                        # Anything cached before now may have missed an invalidation.
+                        STATE_CACHE_INVALIDATIONS.labels("reset").inc(self.cache.clear())
+                        self._subscribed.add(index)
+                        backoff = 0.1
+                    elif message["type"] == "message":
+                        origin, _, key = message["data"].partition(b" ")
+                        if origin != self._origin and self.cache.invalidate(key.decode()):
+                            STATE_CACHE_INVALIDATIONS.labels("remote").inc()
+            except (RedisError, OSError) as e:
+                self._subscribed.discard(index)
+                logger.warning("State invalidation channel lost, near cache off until resubscribed: %r", e)
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 5.0)
+            finally:
+                pubsub.close()
+        self._subscribed.discard(index)
+
+
+class _CacheSlot:
+    """
+    ``with`` block around a Redis read or write of ``key``: holds the cached
+    value (for writes that update it in place) and caches what ``commit`` is
+    given, unless the key was invalidated meanwhile or the block raised.
+    """
+
+    def __init__(self, manager: StateManager, key: str, read: bool):
+        self.manager = manager
+        self.key = key
+        self.cache = manager.cache if manager._active() else None
+        self.value = None
+        self._committed = False
+        if self.cache is not None:
+            self.cache.begin(key)
+            if not read:
+                self.value = self.cache.get(key)
+
+    def __enter__(self) -> "_CacheSlot":
+        return self
+
+    def commit(self, value: Any, size: int, ttl: float):
+        if self.cache is None or ttl <= 0:
+            return
+        evictions = self.cache.evictions
+        expires_at = time.time() + min(ttl, self.manager.cache_ttl)
+        self._committed = self.cache.commit(self.key, value, size, expires_at)
+        if self.cache.evictions > evictions:
+            STATE_CACHE_INVALIDATIONS.labels("evicted").inc(self.cache.evictions - evictions)
+        STATE_CACHE_BYTES.set(self.cache.bytes)
+
+    def __exit__(self, *exc):
+        if self.cache is not None and not self._committed:
+            self.cache.abort(self.key)
+        return False
@@ -0,0 +1,248 @@
+"""Recording of real chat turns at the upstream boundaries, for replay.
+
+While a turn is being recorded, ``LLMClient`` and ``IRCTCClient`` report each
+call (request, response, timing) to the ``TurnTrace`` bound to the current
+context. Traces are sanitized, then appended by a writer thread to gzip'd JSON
+lines files that ``benchmarks/replay_traces.py`` serves back with the original
+timing.
+
+Recording is decided per conversation, so multi-turn parameter collection is
+captured whole. When no trace is active the hooks cost one contextvar lookup.
+
+Traces are NOT free of personal data. Sanitizing replaces PNRs, phone numbers
+and emails wherever they appear, and redacts ``SENSITIVE_KEYS`` in IRCTC
+payloads and in LLM replies that are JSON. Free text is kept as typed or
+generated, though: a name or address in a user message, or repeated by the
+LLM in a streamed answer, is written verbatim. The directory and files are
+therefore created readable by the service user only (0700 / 0600); treat them
+like the production database.
+"""
+import atexit
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, List, Optional
+
+from app.core.metrics import Counter
+from app.service.llm.prompts import parse_llm_json
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+
+TRACE_TURNS = Counter(
+    "trace_recorder_turns_total",
+    "Chat turns handed to the trace recorder, by outcome.",
+    labelnames=("result",),
+)
+
+_current: ContextVar[Optional["TurnTrace"]] = ContextVar("trace_turn", default=None)
+
+# Ten digits: PNRs and mobile numbers.
+_LONG_NUMBER = re.compile(r"(?<!\d)\d{10}(?!\d)")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+SENSITIVE_KEYS = {"name", "passengername", "passenger_name", "mobile", "phone", "email", "address"}
+
+
+def active_trace() -> Optional["TurnTrace"]:
+    return _current.get()
+
+
+class TurnTrace:
+    """Upstream calls made while handling one chat turn."""
+
+    __slots__ = ("conversation", "message", "started_at", "_t0", "calls")
+
+    def __init__(self, conversation: str, message: str):
+        self.conversation = conversation
+        self.message = message
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.calls: List[dict] = []
+
+    def offset(self, perf_time: float) -> float:
+        return round(perf_time - self._t0, 4)
+
+    def add(self, kind: str, started: float, duration: float, **call):
+        call["kind"] = kind
+        call["offset"] = self.offset(started)
+        call["duration"] = round(duration, 4)
+        self.calls.append(call)
+
+
+def prompt_digest(messages: list) -> dict:
+    """Compact stand-in for an LLM prompt: system prompt hash plus the user text."""
+    system = "".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    return {"system_sha": hashlib.sha1(system.encode()).hexdigest()[:12], "user": user}
+
+
+class Sanitizer:
+    """
+    Replaces personal data with stable pseudonyms: the same PNR becomes the
+    same fake PNR everywhere in a file, so replayed requests still match the
+    recorded responses.
+    """
+
+    def __init__(self, salt: bytes):
+        self.salt = salt
+
+    def _pseudo_digits(self, match: re.Match) -> str:
+        digest = hmac.new(self.salt, match.group(0).encode(), hashlib.sha256).hexdigest()
+        return str(int(digest[:15], 16) % 10**10).zfill(10)
+
+    def text(self, value: str) -> str:
+        value = _EMAIL.sub("user@example.com", value)
+        return _LONG_NUMBER.sub(self._pseudo_digits, value)
+
+    def llm_response(self, value: str) -> str:
+        """An LLM reply: JSON ones (classification, extracted params) are sanitized by key, too."""
+        try:
+            parsed = parse_llm_json(value)
+        except (ValueError, IndexError):
+            return self.text(value)
+        if not isinstance(parsed, (dict, list)):
+            return self.text(value)
+        return json.dumps(self(parsed), ensure_ascii=False)
+
+    def __call__(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self.text(value)
+        if isinstance(value, dict):
+            return {
+                k: "<redacted>" if str(k).lower() in SENSITIVE_KEYS
+                else self.llm_response(v) if k == "response" and value.get("kind") == "llm" and isinstance(v, str)
+                else self(v)
+                for k, v in value.items()
+            }
+        if isinstance(value, list):
+            return [self(v) for v in value]
+        if isinstance(value, int) and not isinstance(value, bool) and 10**9 <= value < 10**10:
+            return int(self.text(str(value)))
+        return value
+
+    def conversation(self, conversation_id: str) -> str:
+        return hmac.new(self.salt, conversation_id.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+class TraceRecorder:
+    """
+    Samples conversations and writes their turns to ``directory``. Writes
+    happen on a background thread; if it falls behind, turns are dropped.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.05,
+        salt: str = "",
+        max_file_bytes: int = 64 * 1024 * 1024,
+        max_queue: int = 1000,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_file_bytes = max_file_bytes
+        self.sanitize = Sanitizer(salt.encode() if salt else secrets.token_bytes(16))
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._path: Optional[str] = None
+
+    # ---- event loop side ----------------------------------------------------
+
+    def sampled(self, conversation_id: str) -> bool:
+        if self.sample_rate >= 1:
+            return True
+        digest = hashlib.sha1(conversation_id.encode()).digest()
+        return int.from_bytes(digest[:4], "big") < self.sample_rate * 2**32
+
+    def begin(self, conversation_id: str, message: str) -> Optional[TurnTrace]:
+        """Start recording the current turn if its conversation is sampled."""
+        if not self.sampled(conversation_id):
+            return None
+        trace = TurnTrace(conversation_id, message)
+        _current.set(trace)
+        return trace
+
+    def finish(self, trace: TurnTrace, turn: dict):
+        _current.set(None)
+        record = {
+            "v": TRACE_VERSION,
+            "conversation": self.sanitize.conversation(trace.conversation),
+            "ts": round(trace.started_at, 3),
+            "message": self.sanitize.text(trace.message),
+            "intent": turn.get("intent"),
+            "duration": trace.offset(time.perf_counter()),
+            "timings": {k: round(v, 4) for k, v in (turn.get("timings") or {}).items()},
+            "calls": self.sanitize(trace.calls),
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            TRACE_TURNS.labels("dropped").inc()
+            return
+        self._ensure_writer()
+
+    # ---- writer thread ------------------------------------------------------
+
+    def _ensure_writer(self):
+        if self._thread is None:
+            # Traces hold user free text; keep them to the service user.
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, daemon=True, name="trace-recorder")
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def flush(self, timeout: float = 5.0):
+        """Wait (up to ``timeout``) until queued turns are on disk."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                TRACE_TURNS.labels("written").inc(len(batch))
+            except OSError as e:
+                TRACE_TURNS.labels("failed").inc(len(batch))
+                logger.error("Trace write failed: %s", e, extra={"turns": len(batch)})
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch: List[dict]):
+        if self._path is None or os.path.getsize(self._path) >= self.max_file_bytes:
+            name = time.strftime("turns-%Y%m%d-%H%M%S") + f"-{os.getpid()}.jsonl.gz"
+            self._path = os.path.join(self.directory, name)
+            os.close(os.open(self._path, os.O_CREAT | os.O_WRONLY, 0o600))
+        lines = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in batch)
+        # Each batch is its own gzip member; readers see one continuous stream.
+        with gzip.open(self._path, "at", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def read_traces(path: str):
+    """Yield turn records from a trace file or every ``*.jsonl.gz`` in a directory."""
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, p) for p in os.listdir(path) if p.endswith(".jsonl.gz"))
+    for file_path in paths:
+        with gzip.open(file_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
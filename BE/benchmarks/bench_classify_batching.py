@@ -0,0 +1,88 @@
+"""
+Throughput/latency of micro-batched intent classification.
+
+Drives ``LLMService.classify_intent`` with an open-loop (Poisson) arrival
+process against ``StubLLMClient`` and compares batching off vs. several
+batch windows.
+
+    python -m benchmarks.bench_classify_batching --rate 60 --requests 600
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.service.llm.classify_batcher import ClassifyBatcher
+from app.service.llm.llm_service import LLMService
+from benchmarks.stubs import StubLLMClient
+
+MESSAGES = [
+    "what is the pnr status of 1234567890",
+    "live status of 12951",
+    "trains between NDLS and BCT tomorrow",
+    "hello there",
+    "seat availability in 12951 for 3A",
+    "who won the cricket match",
+    "thanks a lot",
+    "schedule of rajdhani express",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(window_ms, args):
+    client = StubLLMClient(args.base_latency, args.per_item_latency, args.slots)
+    batcher = None
+    if window_ms is not None:
+        batcher = ClassifyBatcher(client, window_ms=window_ms, max_batch_size=args.max_batch)
+    service = LLMService(client, batcher=batcher)
+
+    latencies = []
+
+    async def one(message):
+        started = time.perf_counter()
+        await service.classify_intent(message)
+        latencies.append(time.perf_counter() - started)
+
+    rng = random.Random(42)
+    tasks = []
+    started = time.perf_counter()
+    for i in range(args.requests):
+        tasks.append(asyncio.create_task(one(MESSAGES[i % len(MESSAGES)])))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    label = "off" if window_ms is None else f"{window_ms:g} ms"
+    print(
+        f"{label:>8} | {args.requests / elapsed:7.1f} req/s | "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms | "
+        f"p95 {percentile(latencies, 95) * 1000:7.1f} ms | "
+        f"p99 {percentile(latencies, 99) * 1000:7.1f} ms | "
+        f"upstream calls {client.calls}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=60.0, help="arrivals per second")
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--windows", default="2,5,10,20", help="comma separated batch windows in ms")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--base-latency", type=float, default=0.25, help="stub seconds per upstream call")
+    parser.add_argument("--per-item-latency", type=float, default=0.01, help="stub seconds per classified item")
+    parser.add_argument("--slots", type=int, default=8, help="stub concurrent upstream calls")
+    args = parser.parse_args()
+
+    print(f"rate={args.rate}/s requests={args.requests} max_batch={args.max_batch} slots={args.slots}")
+    await run(None, args)
+    for window in args.windows.split(","):
+        await run(float(window), args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
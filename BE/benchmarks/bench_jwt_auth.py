@@ -0,0 +1,94 @@
+"""
+Per-request cost of authenticating a chat request.
+
+Compares a full ``JWTManager.decode`` on every request with the cached
+``TokenVerifier``, first as a bare call and then through a FastAPI route
+with a bearer-token dependency (in-process ASGI, no network).
+
+    python -m benchmarks.bench_jwt_auth --tokens 100 --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from app.core.security.jwt import JWTManager
+from app.core.security.token_verifier import TokenVerifier
+
+
+def per_call(fn, tokens, requests):
+    started = time.perf_counter()
+    for i in range(requests):
+        fn(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / requests
+
+
+async def per_call_async(fn, tokens, requests):
+    started = time.perf_counter()
+    for i in range(requests):
+        await fn(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / requests
+
+
+async def per_request(app, tokens, requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for i in range(requests):
+            response = await client.get("/", headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"})
+            response.raise_for_status()
+        return (time.perf_counter() - started) / requests
+
+
+def build_app(dependency):
+    app = FastAPI()
+
+    @app.get("/")
+    async def route(claims: dict = Depends(dependency)):
+        return {"sub": claims["sub"]}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=100, help="distinct users/tokens in rotation")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--algorithm", default="HS256")
+    args = parser.parse_args()
+
+    jwt_manager = JWTManager("bench-secret", args.algorithm, 60, 7)
+    tokens = [jwt_manager.create_access_token(str(i), session_id=f"s{i}") for i in range(args.tokens)]
+
+    uncached = per_call(jwt_manager.decode, tokens, args.requests)
+    verifier = TokenVerifier(jwt_manager)
+    cached = asyncio.run(per_call_async(verifier.verify_access_token, tokens, args.requests))
+    print(f"verify only:  decode {uncached * 1e6:8.1f} us | cached {cached * 1e6:8.1f} us "
+          f"(hit ratio {verifier.hits / (verifier.hits + verifier.misses):.1%})")
+
+    from fastapi.security import HTTPBearer
+    bearer = HTTPBearer()
+
+    def decode_dep(credentials=Depends(bearer)):
+        return jwt_manager.decode(credentials.credentials)
+
+    cached_verifier = TokenVerifier(jwt_manager)
+
+    async def cached_dep(credentials=Depends(bearer)):
+        return await cached_verifier.verify_access_token(credentials.credentials)
+
+    def no_auth():
+        return {"sub": "anonymous"}
+
+    requests = max(1, args.requests // 4)
+    baseline = asyncio.run(per_request(build_app(no_auth), tokens, requests))
+    full = asyncio.run(per_request(build_app(decode_dep), tokens, requests))
+    fast = asyncio.run(per_request(build_app(cached_dep), tokens, requests))
+    print(f"per request:  no auth {baseline * 1e6:8.1f} us | decode +{(full - baseline) * 1e6:7.1f} us | "
+          f"cached +{(fast - baseline) * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Accuracy and latency of the local kNN intent classifier.
+
+Splits a labelled JSONL file (``{"text", "category", "intent"}`` per line)
+into train/test, builds an index in a temporary directory and reports
+coverage/precision per threshold plus per-message latency. Without
+``--examples`` a synthetic paraphrase set is generated.
+
+    python -m benchmarks.bench_knn_classifier --examples data/intents.jsonl
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+
+from app.service.llm.knn_classifier import KNNIntentClassifier
+
+TEMPLATES = {
+    ("domain", "pnr_status"): [
+        "what is the status of pnr {pnr}", "check pnr {pnr}", "pnr {pnr} confirmed?",
+        "is my ticket {pnr} confirmed", "current status for pnr number {pnr}",
+    ],
+    ("domain", "live_status"): [
+        "where is train {train} now", "live status of {train}", "running status {train}",
+        "is {train} late today", "track train {train}",
+    ],
+    ("domain", "train_schedule"): [
+        "schedule of {train}", "timetable for train {train}", "what are the stops of {train}",
+        "show route of {train}", "{train} halts",
+    ],
+    ("domain", "train_between_stations"): [
+        "trains from {src} to {dst}", "trains between {src} and {dst} on {date}",
+        "how to go from {src} to {dst}", "{src} to {dst} trains tomorrow", "any train {src} {dst}",
+    ],
+    ("domain", "seat_availability"): [
+        "seats in {train} {cls} on {date}", "is {cls} available in {train}",
+        "seat availability {train} from {src} to {dst}", "check berth availability {train}",
+    ],
+    ("small_talk", "greeting"): ["hi", "hello", "hey there", "good morning", "hello bot"],
+    ("small_talk", "thanks"): ["thanks", "thank you so much", "thx", "thanks a lot", "many thanks"],
+    ("small_talk", "farewell"): ["bye", "goodbye", "see you", "good night", "bye bye"],
+    ("out_of_scope", None): [
+        "who won the match yesterday", "book a flight to goa", "what is the weather",
+        "tell me a joke", "recommend a movie", "how do i cook rice",
+    ],
+}
+STATIONS = ["NDLS", "BCT", "MAS", "HWH", "SBC", "delhi", "mumbai", "chennai", "pune"]
+
+
+def synthetic_examples(n, rng):
+    labels = list(TEMPLATES)
+    examples = []
+    for _ in range(n):
+        category, intent = rng.choice(labels)
+        text = rng.choice(TEMPLATES[(category, intent)]).format(
+            pnr=rng.randrange(10**9, 10**10),
+            train=rng.randrange(10000, 23000),
+            src=rng.choice(STATIONS),
+            dst=rng.choice(STATIONS),
+            date=f"2025-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+            cls=rng.choice(["SL", "3A", "2A", "1A"]),
+        )
+        if rng.random() < 0.3:
+            text = text.capitalize() + rng.choice(["?", " please", " pls", "!"])
+        examples.append({"text": text, "category": category, "intent": intent})
+    return examples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--examples", help="labelled JSONL; synthetic data when omitted")
+    parser.add_argument("--synthetic", type=int, default=5000, help="number of synthetic examples")
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--dim", type=int, default=2048)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--thresholds", default="0.4,0.5,0.6,0.7,0.8")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    if args.examples:
+        with open(args.examples, encoding="utf-8") as fh:
+            examples = [json.loads(line) for line in fh if line.strip()]
+    else:
+        examples = synthetic_examples(args.synthetic, rng)
+    rng.shuffle(examples)
+    split = int(len(examples) * (1 - args.test_fraction))
+    train, test = examples[:split], examples[split:]
+
+    with tempfile.TemporaryDirectory() as path:
+        started = time.perf_counter()
+        KNNIntentClassifier.build(train, path, dim=args.dim)
+        build_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        classifier = KNNIntentClassifier.load(path, k=args.k)
+        load_time = time.perf_counter() - started
+
+        predictions, latencies = [], []
+        for example in test:
+            started = time.perf_counter()
+            predictions.append(classifier.predict(example["text"]))
+            latencies.append(time.perf_counter() - started)
+
+    print(f"train={len(train)} test={len(test)} dim={args.dim} k={args.k}")
+    print(f"build {build_time * 1000:.0f} ms, mmap load {load_time * 1000:.1f} ms")
+    ordered = sorted(latencies)
+    print(
+        f"latency p50 {statistics.median(latencies) * 1e6:.0f} us, "
+        f"p99 {ordered[int(len(ordered) * 0.99)] * 1e6:.0f} us"
+    )
+
+    print("threshold | coverage | precision | overall accuracy")
+    for threshold in (float(t) for t in args.thresholds.split(",")):
+        answered = correct = 0
+        for example, (result, confidence) in zip(test, predictions):
+            if confidence < threshold or len(result["intents"]) > 1:
+                continue
+            answered += 1
+            if (result["category"], result["intent"]) == (example["category"], example.get("intent") or None):
+                correct += 1
+        precision = correct / answered if answered else 0.0
+        print(f"{threshold:9.2f} | {answered / len(test):8.1%} | {precision:9.1%} | {correct / len(test):.1%}")
+
+
+if __name__ == "__main__":
+    main()
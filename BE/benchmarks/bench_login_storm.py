@@ -0,0 +1,82 @@
+"""
+Chat-stream latency under a login storm.
+
+Simulates a chat stream (a token every ``--tick`` seconds) on the event loop
+while ``--logins`` concurrent logins verify argon2 passwords, first inline on
+the loop (the old ``passwordManager`` path) and then through
+``AsyncPasswordManager``. Reports the extra delay seen by the stream and the
+login throughput.
+
+    python -m benchmarks.bench_login_storm --logins 200 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.security.password import AsyncPasswordManager, passwordManager
+
+
+async def chat_stream(stop: asyncio.Event, tick: float, lags: list):
+    while not stop.is_set():
+        expected = time.perf_counter() + tick
+        await asyncio.sleep(tick)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def storm(verify, hashed: str, logins: int, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with limit:
+            assert await verify("correct horse battery staple", hashed)
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def run(label, verify, hashed, args):
+    lags = []
+    stop = asyncio.Event()
+    stream = asyncio.create_task(chat_stream(stop, args.tick, lags))
+    await asyncio.sleep(args.tick * 5)
+
+    started = time.perf_counter()
+    await storm(verify, hashed, args.logins, args.concurrency)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await stream
+    ordered = sorted(lags)
+    print(
+        f"{label:>14} | logins {args.logins / elapsed:6.1f}/s | "
+        f"stream lag p50 {statistics.median(lags) * 1000:7.2f} ms "
+        f"p99 {ordered[int(len(ordered) * 0.99)] * 1000:7.2f} ms "
+        f"max {ordered[-1] * 1000:7.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32, help="logins in flight at once")
+    parser.add_argument("--workers", type=int, default=2, help="hashing pool size")
+    parser.add_argument("--tick", type=float, default=0.02, help="seconds between streamed tokens")
+    args = parser.parse_args()
+
+    hashed = passwordManager.hash_password("correct horse battery staple")
+
+    async def inline_verify(password, hashed):
+        return passwordManager.verify_password(password, hashed)
+
+    await run("inline", inline_verify, hashed, args)
+
+    manager = AsyncPasswordManager(max_workers=args.workers, max_pending=args.logins)
+    await manager.warm_up()
+    try:
+        await run(f"pool({args.workers})", manager.verify_password, hashed, args)
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
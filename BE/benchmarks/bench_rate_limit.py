@@ -0,0 +1,115 @@
+"""
+Cost of the Redis rate limiter per request, at high concurrency.
+
+``--concurrency`` coroutines issue ``--requests`` calls in total against one
+shared Redis client, as the workers do:
+
+- ``get``:     a single GET, the floor for anything that asks Redis per request
+- ``limiter``: ``RateLimiter.hit`` on a user and a conversation key (one EVALSHA)
+
+and the limiter's latency is reported next to the GET's. Limits are set high
+enough that nothing is refused, so every call does the full read-and-write.
+
+Redis is ``--redis host:port``, else a local Redis, else a fakeredis TCP
+server in a subprocess (which needs ``lupa`` for Lua, and is much slower
+than the real thing; absolute numbers only mean something against Redis).
+
+    python -m benchmarks.bench_rate_limit
+    python -m benchmarks.bench_rate_limit --redis 127.0.0.1:6379 --concurrency 500 --requests 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from redis.asyncio import Redis
+
+from app.core.config import get_settings
+from app.core.rate_limit import RateLimiter
+from benchmarks.bench_scaling import start_redis
+from benchmarks.load_chat import percentile
+
+
+async def run(call, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for i in remaining:
+            started = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "calls_per_s": round(requests / elapsed),
+        "latency_ms": {q: round(percentile(latencies, q) * 1000, 3) for q in (50, 95, 99)},
+    }
+
+
+async def measure(host: str, port: int, args) -> dict:
+    # Same pool as the app's (app/container.py).
+    settings = get_settings()
+    redis = Redis(host=host, port=port, decode_responses=True, max_connections=settings.REDIS_MAX_CONNECTIONS)
+    limiter = RateLimiter(redis, "bench=1000000/1,bench.conversation=1000000/1")
+    users = [f"user{i}" for i in range(args.users)]
+
+    async def get(i: int):
+        await redis.get(f"ratelimit:bench:{users[i % len(users)]}")
+
+    async def hit(i: int):
+        user = users[i % len(users)]
+        result = await limiter.hit("bench", user, conversation=f"{user}:c{i % 3}")
+        if result is None:
+            raise SystemExit("rate limit check failed; see the log")
+
+    try:
+        # Loads the script and opens the pool's connections.
+        await run(hit, args.concurrency * 2, args.concurrency)
+        results = {"get": await run(get, args.requests, args.concurrency)}
+        results["limiter"] = await run(hit, args.requests, args.concurrency)
+    finally:
+        await redis.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--users", type=int, default=1000, help="distinct users (keys) in rotation")
+    parser.add_argument("--redis", default="", help="host:port of a Redis to use (default: local or fakeredis)")
+    parser.add_argument("--budget-ms", type=float, default=1.0, help="allowed p50 overhead over a GET")
+    parser.add_argument("--json", help="also write the results as JSON to this path")
+    args = parser.parse_args()
+
+    process, host, port = start_redis(args.redis)
+    try:
+        results = asyncio.run(measure(host, port, args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"redis {host}:{port}{' (fakeredis)' if process else ''} | "
+          f"{args.requests} calls, concurrency {args.concurrency}, {args.users} users")
+    print(f"{'mode':8s} {'calls/s':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for mode, row in results.items():
+        latency = row["latency_ms"]
+        print(f"{mode:8s} {row['calls_per_s']:9d} {latency[50]:8.3f} {latency[95]:8.3f} {latency[99]:8.3f}")
+    added = results["limiter"]["latency_ms"][50] - results["get"]["latency_ms"][50]
+    if process is not None:
+        verdict = "fakeredis, not comparable with the budget"
+    else:
+        verdict = f"{'within' if added <= args.budget_ms else 'OVER'} the {args.budget_ms} ms budget"
+    print(f"limiter adds {added:.3f} ms at p50 over a GET ({verdict})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results, "added_p50_ms": added}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
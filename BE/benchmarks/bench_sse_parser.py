@@ -0,0 +1,109 @@
+"""
+CPU cost of turning an LLM SSE stream into tokens.
+
+Compares the previous ``aiter_lines`` loop (strip, prefix check, ``json.loads``
+and a chain of format probes per chunk) with ``SSEDecoder`` plus a per-stream
+adapter, on the same bytes split into network-sized pieces. Streams are
+synthetic OpenAI-style by default; pass ``--stream-file`` to replay a captured
+response body instead.
+
+    python -m benchmarks.bench_sse_parser --tokens 256 --repeat 200
+    python -m benchmarks.bench_sse_parser --stream-file capture.sse
+"""
+import argparse
+import json
+import random
+import time
+
+from app.service.llm.sse import SSEDecoder, loads, select_adapter
+from benchmarks.stubs import openai_sse_body
+
+
+def split(body: bytes, seed: int = 7):
+    """Cut the body at random points, like TCP reads of 100-1500 bytes."""
+    rng = random.Random(seed)
+    pieces, start = [], 0
+    while start < len(body):
+        end = start + rng.randint(100, 1500)
+        pieces.append(body[start:end])
+        start = end
+    return pieces
+
+
+def legacy_tokens(pieces):
+    # What httpx's aiter_lines + the old loop did: decode, split lines, probe.
+    text = "".join(piece.decode("utf-8") for piece in pieces)
+    tokens = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or not line.startswith("data: "):
+            continue
+        data = line[6:]
+        if data == "[DONE]":
+            break
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            tokens.append(data)
+            continue
+        if "choices" in chunk and chunk["choices"]:
+            token = chunk["choices"][0].get("delta", {}).get("content", "")
+            if token:
+                tokens.append(token)
+        elif "content" in chunk:
+            tokens.append(chunk["content"])
+        elif "text" in chunk:
+            tokens.append(chunk["text"])
+        elif "token" in chunk and "text" in chunk["token"]:
+            tokens.append(chunk["token"]["text"])
+    return tokens
+
+
+def decoder_tokens(pieces):
+    decoder = SSEDecoder()
+    adapter = None
+    tokens = []
+    for piece in pieces:
+        for _, data in decoder.feed(piece):
+            if data == "[DONE]":
+                return tokens
+            chunk = loads(data)
+            if adapter is None:
+                adapter = select_adapter(chunk)
+            token = adapter(chunk)
+            if token:
+                tokens.append(token)
+    return tokens
+
+
+def cpu_per_1k_tokens(fn, pieces, repeat):
+    count = len(fn(pieces))
+    started = time.process_time()
+    for _ in range(repeat):
+        fn(pieces)
+    return (time.process_time() - started) / (repeat * count) * 1000 * 1000, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--stream-file", help="captured SSE response body to replay")
+    args = parser.parse_args()
+
+    if args.stream_file:
+        with open(args.stream_file, "rb") as f:
+            body = f.read()
+    else:
+        body = openai_sse_body(args.tokens)
+    pieces = split(body)
+
+    assert legacy_tokens(pieces) == decoder_tokens(pieces), "parsers disagree"
+    print(f"json decoder: {loads.__module__}")
+    for name, fn in (("aiter_lines loop", legacy_tokens), ("SSEDecoder", decoder_tokens)):
+        ms, count = cpu_per_1k_tokens(fn, pieces, args.repeat)
+        print(f"{name:18s} {ms:7.2f} ms cpu per 1k tokens ({count} tokens/stream, {len(pieces)} reads)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Conversation state throughput as the keyspace is spread over more Redis nodes.
+
+For each node count in ``--nodes`` that many local Redis nodes are started,
+and ``--clients`` processes of ``--threads`` threads each run conversations
+through ``StateManager`` for ``--duration`` seconds. A turn is the Redis work
+of a chat turn with the near cache off: read the state, write it (new
+conversation) or update two fields, and store the user and assistant
+messages (append, read back, trim). Reports turns/s, speedup over the first
+count and turn latency.
+
+``--mode cluster`` makes the nodes a Redis Cluster (slots split evenly) and
+``--mode sharded`` keeps them independent and shards conversations
+client-side (``STATE_REDIS_SHARDS``). Nodes are ``redis-server`` processes
+when it is on the PATH. Without it only sharded mode runs, on fakeredis TCP
+servers, one Python process per node: far slower than Redis, but as each
+node is then CPU-bound the scaling across nodes still shows, as long as the
+clients are not the bottleneck.
+
+``--serve N`` is the local multi-node setup: it starts N nodes and prints the
+settings that point the app (or ``benchmarks.load_chat``) at them, until
+interrupted. Both modes first run every ``StateManager`` operation against
+the nodes from two workers with the near cache on (``check``), and stop on
+a mismatch.
+
+    python -m benchmarks.bench_state_cluster
+    python -m benchmarks.bench_state_cluster --mode cluster --nodes 1,3,6 --clients 8
+    python -m benchmarks.bench_state_cluster --mode cluster --serve 3
+"""
+import argparse
+import json
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from redis import Redis
+from redis.crc import REDIS_CLUSTER_HASH_SLOTS
+
+from benchmarks.bench_scaling import wait_for_port
+from benchmarks.fake_upstreams import free_port
+from benchmarks.load_chat import percentile
+
+ANSWER = "Train 12951 departs NDLS at 16:55 and arrives BCT at 08:35. " * 6
+
+
+def free_cluster_port() -> int:
+    """A free port whose cluster bus port (port + 10000) is free too."""
+    while True:
+        port = random.randint(20000, 45000)
+        try:
+            for candidate in (port, port + 10000):
+                with socket.socket() as sock:
+                    sock.bind(("127.0.0.1", candidate))
+            return port
+        except OSError:
+            continue
+
+
+def start_nodes(count: int, mode: str, workdir: str) -> Tuple[List[subprocess.Popen], str]:
+    """Start ``count`` nodes; returns the processes and their ``host:port,...``."""
+    processes, ports = [], []
+    redis_server = shutil.which("redis-server")
+    if redis_server is None and mode == "cluster":
+        raise SystemExit("--mode cluster needs redis-server on the PATH")
+    try:
+        for _ in range(count):
+            port = free_cluster_port() if mode == "cluster" else free_port()
+            if redis_server:
+                command = [redis_server, "--port", str(port), "--save", "", "--appendonly", "no", "--dir", workdir]
+                if mode == "cluster":
+                    command += ["--cluster-enabled", "yes", "--cluster-config-file", f"nodes-{port}.conf"]
+            else:
+                command = [
+                    sys.executable, "-c",
+                    f"from fakeredis import TcpFakeServer; TcpFakeServer(('127.0.0.1', {port})).serve_forever()",
+                ]
+            processes.append(subprocess.Popen(command, stdout=subprocess.DEVNULL))
+            ports.append(port)
+            wait_for_port(port, processes[-1])
+        if mode == "cluster":
+            form_cluster(ports)
+    except BaseException:
+        stop_nodes(processes)
+        raise
+    return processes, ",".join(f"127.0.0.1:{port}" for port in ports)
+
+
+def form_cluster(ports: List[int], timeout: float = 30.0):
+    """Split the slots evenly over the nodes, introduce them and wait for the cluster to be up."""
+    clients = [Redis(port=port) for port in ports]
+    per_node = REDIS_CLUSTER_HASH_SLOTS // len(clients)
+    for i, client in enumerate(clients):
+        last = REDIS_CLUSTER_HASH_SLOTS - 1 if i == len(clients) - 1 else (i + 1) * per_node - 1
+        # ADDSLOTS rather than ADDSLOTSRANGE, which needs Redis 7
+        client.execute_command("CLUSTER", "ADDSLOTS", *range(i * per_node, last + 1))
+        if i:
+            client.execute_command("CLUSTER", "MEET", "127.0.0.1", ports[0])
+    deadline = time.monotonic() + timeout
+    while any(client.cluster("INFO")["cluster_state"] != "ok" for client in clients):
+        if time.monotonic() > deadline:
+            raise SystemExit(f"cluster of {len(ports)} nodes not up after {timeout:.0f} s")
+        time.sleep(0.1)
+
+
+def stop_nodes(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+
+def state_manager(mode: str, nodes: str, **kwargs):
+    from app.service.redis.state_manager import StateManager
+
+    if mode == "cluster":
+        return StateManager("", 0, 0, cluster_nodes=nodes, **kwargs)
+    return StateManager("", 0, 0, shards=nodes, **kwargs)
+
+
+def check(mode: str, nodes: str, timeout: float = 10.0):
+    """
+    Every StateManager operation against the nodes, from two workers with the
+    near cache on (so writes also publish invalidations); exits on a mismatch.
+    """
+    workers = [state_manager(mode, nodes, cache_entries=100) for _ in range(2)]
+    deadline = time.monotonic() + timeout
+    while not all(worker._active() for worker in workers):
+        if time.monotonic() > deadline:
+            raise SystemExit("near cache never subscribed to the invalidation channel")
+        time.sleep(0.05)
+
+    def expect(what: str, got, wanted):
+        if got != wanted:
+            raise SystemExit(f"check failed: {what}: {got!r} != {wanted!r}")
+
+    def settled(what: str, read, wanted):
+        # Invalidations reach the other worker asynchronously.
+        while read() != wanted and time.monotonic() < deadline:
+            time.sleep(0.01)
+        expect(what, read(), wanted)
+
+    a, b = workers
+    try:
+        for i in range(20):
+            conversation_id = f"check-{i}"
+            state = {"intent": "pnr_status", "params": {"pnr": None}, "stage": "awaiting_params"}
+            a.set_state(conversation_id, state)
+            expect("set_state", b.get_state(conversation_id), state)
+            b.update_state(conversation_id, stage="ready", params={"pnr": "2345678901"})
+            settled("update_state", lambda: a.get_state(conversation_id),
+                    {"intent": "pnr_status", "params": {"pnr": "2345678901"}, "stage": "ready"})
+            for n in range(3):
+                a.add_message(conversation_id, "user", f"message {n}")
+            b.trim_messages(conversation_id, 2)
+            settled("add_message/trim_messages", lambda: [m["content"] for m in a.get_messages(conversation_id)],
+                    ["message 1", "message 2"])
+            b.clear(conversation_id)
+            settled("clear", lambda: (a.get_state(conversation_id), a.get_messages(conversation_id)), (None, []))
+    finally:
+        for worker in workers:
+            worker.close()
+
+
+def client_process(mode: str, nodes: str, client: int, threads: int, duration: float) -> List[float]:
+    state = state_manager(mode, nodes)
+    latencies: List[float] = []
+    deadline = time.monotonic() + duration
+
+    def run(thread: int):
+        i = 0
+        while time.monotonic() < deadline:
+            # Three turns per conversation: a new one, a follow-up, then one with history.
+            conversation_id = f"bench-{client}-{thread}-{i // 3}"
+            started = time.perf_counter()
+            conv_state = state.get_state(conversation_id)
+            if conv_state is None:
+                state.set_state(conversation_id, {
+                    "intent": "pnr_status", "params": {"pnr": None}, "stage": "awaiting_params",
+                })
+            else:
+                state.update_state(conversation_id, stage="ready", params={"pnr": f"{2345678901 + i}"})
+            for role, content in (("user", f"what is the status of pnr {i}"), ("assistant", ANSWER)):
+                state.add_message(conversation_id, role, content)
+                if len(state.get_messages(conversation_id)) > 15:
+                    state.trim_messages(conversation_id, 15)
+            latencies.append(time.perf_counter() - started)
+            i += 1
+
+    workers = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    state.close()
+    return latencies
+
+
+def measure(count: int, args, pool: ProcessPoolExecutor) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        processes, nodes = start_nodes(count, args.mode, workdir)
+        try:
+            check(args.mode, nodes)
+            started = time.perf_counter()
+            futures = [
+                pool.submit(client_process, args.mode, nodes, client, args.threads, args.duration)
+                for client in range(args.clients)
+            ]
+            latencies = [latency for future in futures for latency in future.result()]
+            elapsed = time.perf_counter() - started
+        finally:
+            stop_nodes(processes)
+    return {
+        "nodes": count,
+        "turns": len(latencies),
+        "turns_per_s": round(len(latencies) / elapsed, 1),
+        "latency_ms": {q: round(percentile(latencies, q) * 1000, 2) for q in (50, 99)},
+    }
+
+
+def serve(count: int, mode: str):
+    with tempfile.TemporaryDirectory() as workdir:
+        processes, nodes = start_nodes(count, mode, workdir)
+        try:
+            check(mode, nodes)
+        except BaseException:
+            stop_nodes(processes)
+            raise
+        setting = "STATE_REDIS_CLUSTER_NODES" if mode == "cluster" else "STATE_REDIS_SHARDS"
+        print(f"{count} {mode} nodes up; point the app at them with:\n\n    {setting}={nodes}\n")
+        print("Ctrl-C to stop")
+        try:
+            while all(process.poll() is None for process in processes):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop_nodes(processes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("sharded", "cluster"), default="sharded")
+    parser.add_argument("--nodes", default="1,2,4", help="comma-separated node counts")
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument("--threads", type=int, default=8, help="threads (concurrent conversations) per client")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per node count")
+    parser.add_argument("--serve", type=int, metavar="N", help="start N nodes and keep them running")
+    parser.add_argument("--json", help="also write the results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.mode)
+        return
+
+    backend = "redis-server" if shutil.which("redis-server") else "fakeredis"
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.clients) as pool:
+        for count in (int(n) for n in args.nodes.split(",")):
+            rows.append(measure(count, args, pool))
+            print(f"{count} nodes: {rows[-1]['turns_per_s']} turns/s", file=sys.stderr)
+
+    print(f"{args.mode} on {backend} | {args.clients} clients x {args.threads} threads, {args.duration:.0f} s per run")
+    base = rows[0]["turns_per_s"] or float("nan")
+    print(f"{'nodes':>5s} {'turns/s':>9s} {'speedup':>8s} {'p50 ms':>8s} {'p99 ms':>8s}")
+    for row in rows:
+        print(f"{row['nodes']:5d} {row['turns_per_s']:9.1f} {row['turns_per_s'] / base:7.2f}x "
+              f"{row['latency_ms'][50]:8.2f} {row['latency_ms'][99]:8.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "backend": backend, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Conversation state encoding: JSON (before) vs hash + msgpack (StateManager).
+
+Generates ``--conversations`` synthetic conversations, each a state with a
+few parameters and ``--messages`` history entries (short user messages,
+longer assistant answers, some train lists over the compression threshold),
+and reports per conversation:
+
+- encode and decode CPU time of the state and of the whole history
+- payload bytes (keys, fields and values as sent to Redis)
+- Redis memory (``used_memory`` growth) when a Redis is reachable
+
+Keys are written under ``bench:state:`` and deleted afterwards; nothing else
+in the database is touched.
+
+    python -m benchmarks.bench_state_encoding
+    python -m benchmarks.bench_state_encoding --conversations 100000 --redis 127.0.0.1:6379
+"""
+import argparse
+import json
+import random
+import socket
+import time
+from typing import Callable, Dict, List, Optional
+
+from redis import Redis
+from redis.exceptions import ResponseError
+
+from app.service.redis.state_manager import decode_fields, decode_message, encode_fields, encode_message
+
+PREFIX = "bench:state:"
+INTENTS = {
+    "pnr_status": ["pnr"],
+    "train_between_stations": ["source", "destination", "date"],
+    "seat_availability": ["train_no", "source", "destination", "date", "class_type", "quota"],
+    "live_status": ["train_no", "date"],
+}
+WORDS = "train station platform delayed arrives departs coach berth confirmed waiting list fare".split()
+
+
+def generate(count: int, messages: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    conversations = []
+    for i in range(count):
+        intent = rng.choice(list(INTENTS))
+        params = {name: rng.choice([None, f"{rng.randint(10000, 99999)}", "NDLS", "2025-01-15"])
+                  for name in INTENTS[intent]}
+        history = []
+        for j in range(messages):
+            if j % 2 == 0:
+                history.append({"role": "user", "content": " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))})
+            else:
+                words = rng.randint(20, 120) if rng.random() < 0.8 else rng.randint(250, 400)
+                history.append({"role": "assistant", "content": " ".join(rng.choices(WORDS, k=words))})
+        conversations.append({
+            "id": f"{i:08d}",
+            "state": {"intent": intent, "params": params, "stage": rng.choice(["awaiting_params", "ready"])},
+            "history": history,
+        })
+    return conversations
+
+
+# Each format: state -> value(s) for Redis, history entry -> bytes, and back.
+FORMATS: Dict[str, Dict[str, Callable]] = {
+    "json": {
+        "encode_state": lambda s: json.dumps(s).encode(),
+        "decode_state": json.loads,
+        "encode_message": lambda m: json.dumps(m).encode(),
+        "decode_message": json.loads,
+    },
+    "msgpack": {
+        "encode_state": lambda s: encode_fields(s["intent"], s["stage"], s["params"]),
+        "decode_state": decode_fields,
+        "encode_message": lambda m: encode_message(m["role"], m["content"]),
+        "decode_message": decode_message,
+    },
+}
+
+
+def cpu(conversations: List[dict], codec: Dict[str, Callable]) -> dict:
+    def timed(fn) -> float:
+        started = time.perf_counter()
+        fn()
+        return (time.perf_counter() - started) / len(conversations) * 1e6
+
+    states = [codec["encode_state"](c["state"]) for c in conversations]
+    histories = [[codec["encode_message"](m) for m in c["history"]] for c in conversations]
+    return {
+        "state_encode_us": timed(lambda: [codec["encode_state"](c["state"]) for c in conversations]),
+        "state_decode_us": timed(lambda: [codec["decode_state"](s) for s in states]),
+        "history_encode_us": timed(lambda: [[codec["encode_message"](m) for m in c["history"]] for c in conversations]),
+        "history_decode_us": timed(lambda: [[codec["decode_message"](e) for e in h] for h in histories]),
+    }
+
+
+def payload_bytes(conversations: List[dict], codec: Dict[str, Callable]) -> float:
+    total = 0
+    for c in conversations:
+        state = codec["encode_state"](c["state"])
+        total += len(PREFIX) + len(c["id"]) + 6
+        total += len(state) if isinstance(state, bytes) else sum(len(k) + len(v) for k, v in state.items())
+        total += len(PREFIX) + len(c["id"]) + 9 + sum(len(codec["encode_message"](m)) for m in c["history"])
+    return total / len(conversations)
+
+
+def redis_memory(redis: Redis, name: str, conversations: List[dict], codec: Dict[str, Callable]) -> float:
+    """Bytes of ``used_memory`` per conversation after writing all of them."""
+    def used() -> int:
+        return redis.info("memory")["used_memory"]
+
+    before = used()
+    pipe = redis.pipeline(transaction=False)
+    for i, c in enumerate(conversations):
+        state_key = f"{PREFIX}{name}:{c['id']}:state"
+        state = codec["encode_state"](c["state"])
+        if isinstance(state, bytes):
+            pipe.set(state_key, state)
+        else:
+            pipe.hset(state_key, mapping=state)
+        pipe.rpush(f"{PREFIX}{name}:{c['id']}:messages", *[codec["encode_message"](m) for m in c["history"]])
+        if i % 1000 == 999:
+            pipe.execute()
+    pipe.execute()
+    grown = used() - before
+    delete_prefix(redis, f"{PREFIX}{name}:")
+    return grown / len(conversations)
+
+
+def delete_prefix(redis: Redis, prefix: str):
+    batch = []
+    for key in redis.scan_iter(match=f"{prefix}*", count=1000):
+        batch.append(key)
+        if len(batch) >= 1000:
+            redis.delete(*batch)
+            batch = []
+    if batch:
+        redis.delete(*batch)
+
+
+def connect(spec: str) -> Optional[Redis]:
+    host, _, port = (spec or "127.0.0.1:6379").partition(":")
+    try:
+        socket.create_connection((host, int(port or 6379)), timeout=0.2).close()
+    except OSError:
+        if spec:
+            raise SystemExit(f"Redis not reachable at {spec}")
+        return None
+    redis = Redis(host=host, port=int(port or 6379))
+    try:
+        redis.info("memory")
+    except ResponseError:
+        print(f"{host}:{port} has no INFO (fakeredis?); reporting payload bytes only")
+        return None
+    return redis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=10, help="history entries per conversation")
+    parser.add_argument("--cpu-sample", type=int, default=10_000, help="conversations timed for CPU")
+    parser.add_argument("--redis", default="", help="host:port (default: local Redis if running, else no memory)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the results as JSON to this path")
+    args = parser.parse_args()
+
+    conversations = generate(args.conversations, args.messages, args.seed)
+    redis = connect(args.redis)
+    results = {}
+    for name, codec in FORMATS.items():
+        row = cpu(conversations[:args.cpu_sample], codec)
+        row["payload_bytes"] = payload_bytes(conversations, codec)
+        row["redis_bytes"] = redis_memory(redis, name, conversations, codec) if redis is not None else None
+        results[name] = row
+
+    print(f"{args.conversations} conversations, {args.messages} messages each "
+          f"(CPU over {min(args.cpu_sample, args.conversations)})")
+    print(f"{'format':8s} {'state enc':>10s} {'state dec':>10s} {'hist enc':>10s} {'hist dec':>10s} "
+          f"{'payload B':>10s} {'redis MB/100k':>14s}")
+    for name, row in results.items():
+        memory = f"{row['redis_bytes'] * 100_000 / 2 ** 20:14.1f}" if row["redis_bytes"] is not None else f"{'n/a':>14s}"
+        print(f"{name:8s} {row['state_encode_us']:8.2f}us {row['state_decode_us']:8.2f}us "
+              f"{row['history_encode_us']:8.2f}us {row['history_decode_us']:8.2f}us "
+              f"{row['payload_bytes']:10.0f} {memory}")
+    if redis is None:
+        print("no Redis reachable: payload bytes only (pass --redis host:port for used_memory)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
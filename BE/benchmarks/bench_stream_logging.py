@@ -0,0 +1,102 @@
+"""
+Cost of logging in the LLM streaming loop.
+
+Replays a recorded-style SSE stream through ``LLMClient.generate_stream`` with
+debug logging off, on with sampling, on for every chunk, and on for every
+chunk through a synchronous handler (what per-token ``print`` amounted to).
+Log output goes to /dev/null so only the logging path itself is measured;
+``--sink-latency-us`` makes each write block for a while, like a slow pipe or
+terminal, which is where a synchronous handler stalls the event loop.
+
+    python -m benchmarks.bench_stream_logging --tokens 256 --streams 200 --concurrency 50
+    python -m benchmarks.bench_stream_logging --sink-latency-us 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from app.core.logging import SampledLogger, setup_logging, shutdown_logging
+from app.service.llm import llm_client
+from app.service.llm.llm_client import LLMClient
+from benchmarks.stubs import openai_sse_body, patch_llm_transport
+
+MODES = [
+    # name, level, sample rate, queued
+    ("off", "INFO", 0.01, True),
+    ("debug, sampled 1%", "DEBUG", 0.01, True),
+    ("debug, every chunk", "DEBUG", 1.0, True),
+    ("debug, every chunk, sync", "DEBUG", 1.0, False),
+]
+
+
+async def run_streams(client: LLMClient, streams: int, concurrency: int) -> int:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with limit:
+            count = 0
+            async for _ in client.generate_stream([{"role": "user", "content": "status of 12951"}]):
+                count += 1
+            return count
+
+    return sum(await asyncio.gather(*(one() for _ in range(streams))))
+
+
+class SlowSink:
+    def __init__(self, target, latency: float):
+        self.target = target
+        self.latency = latency
+
+    def write(self, text):
+        time.sleep(self.latency)
+        return self.target.write(text)
+
+    def flush(self):
+        self.target.flush()
+
+
+def configure(level: str, rate: float, queued: bool, sink):
+    shutdown_logging()
+    root = logging.getLogger()
+    if queued:
+        setup_logging(level=level, fmt="json", stream=sink)
+    else:
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        root.handlers[:] = [handler]
+        root.setLevel(level)
+    llm_client.chunk_logger = SampledLogger(llm_client.logger, rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=256, help="chunks per stream")
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sink-latency-us", type=float, default=0.0, help="simulated blocking time per write")
+    args = parser.parse_args()
+
+    restore = patch_llm_transport(openai_sse_body(args.tokens))
+    client = LLMClient("http://llm.bench/v1/chat/completions", "bench", "stub-model")
+    try:
+        with open(os.devnull, "w") as devnull:
+            sink = SlowSink(devnull, args.sink_latency_us / 1e6) if args.sink_latency_us else devnull
+            for name, level, rate, queued in MODES:
+                configure(level, rate, queued, sink)
+                started = time.perf_counter()
+                cpu_started = time.process_time()
+                tokens = asyncio.run(run_streams(client, args.streams, args.concurrency))
+                wall = time.perf_counter() - started
+                cpu = time.process_time() - cpu_started
+                shutdown_logging()
+                # seconds per token * 1e6 == milliseconds per 1k tokens
+                print(f"{name:26s} wall {wall / tokens * 1e6:7.1f} ms | cpu {cpu / tokens * 1e6:7.1f} ms "
+                      f"per 1k tokens ({tokens} tokens)")
+    finally:
+        restore()
+
+
+if __name__ == "__main__":
+    main()
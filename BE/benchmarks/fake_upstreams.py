@@ -0,0 +1,358 @@
+"""
+Local stand-ins for the hosted LLM and the IRCTC RapidAPI, for load tests.
+
+The LLM server speaks the OpenAI chat-completions API the app uses: it answers
+the classifier and extraction prompts from keywords and regexes in the user
+message, and streams formatter answers at a configurable token rate. The IRCTC
+server returns canned payloads shaped like RapidAPI's, with latency and error
+injection. Both count the calls they receive.
+
+Run them on their own (e.g. to point a dev server at them):
+
+    python -m benchmarks.fake_upstreams --llm-port 9101 --irctc-port 9102
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# ---- LLM --------------------------------------------------------------------
+
+INTENT_KEYWORDS = [
+    ("pnr", "domain", "pnr_status"),
+    ("between", "domain", "train_between_stations"),
+    ("schedule", "domain", "train_schedule"),
+    ("live", "domain", "live_status"),
+    ("seat", "domain", "seat_availability"),
+    ("fare", "domain", "get_fare"),
+    ("hello", "small_talk", "greeting"),
+    ("thank", "small_talk", "thanks"),
+    ("bye", "small_talk", "farewell"),
+]
+
+PARAM_PATTERNS = {
+    "pnr": re.compile(r"\b(\d{10})\b"),
+    "train_no": re.compile(r"\b(\d{5})\b"),
+    "trainNo": re.compile(r"\b(\d{5})\b"),
+    "date": re.compile(r"\b(\d{4}-\d{2}-\d{2})\b"),
+    "class_type": re.compile(r"\b(SL|1A|2A|3A|CC|EC)\b"),
+    "quota": re.compile(r"\b(GN|TQ|LD)\b"),
+}
+STATION_CODE = re.compile(r"\b([A-Z]{2,4})\b")
+
+
+def classify(message: str) -> dict:
+    text = message.lower()
+    found = [(category, intent) for keyword, category, intent in INTENT_KEYWORDS if keyword in text]
+    if not found:
+        return {"category": "out_of_scope", "intent": None, "intents": []}
+    category, intent = found[0]
+    intents = [i for c, i in found if c == "domain"] if category == "domain" else []
+    return {"category": category, "intent": intent, "intents": intents}
+
+
+def extract(names: List[str], message: str) -> dict:
+    params = {name: None for name in names}
+    stations = [code for code in STATION_CODE.findall(message) if code not in {"PNR", "SL", "GN", "TQ", "LD", "CC", "EC"}]
+    for name in names:
+        if name in PARAM_PATTERNS:
+            match = PARAM_PATTERNS[name].search(message)
+            params[name] = match.group(1) if match else None
+        elif name == "source" and stations:
+            params[name] = stations[0]
+        elif name == "destination" and len(stations) > 1:
+            params[name] = stations[1]
+        elif name == "query":
+            params[name] = message
+    return params
+
+
+@dataclass
+class LLMConfig:
+    latency: float = 0.15          # seconds before a completion / the first token
+    token_rate: float = 50.0       # streamed tokens per second
+    answer_tokens: int = 60        # tokens per streamed answer
+    jitter: float = 0.2            # +/- fraction applied to latencies
+
+
+@dataclass
+class IRCTCConfig:
+    latency: float = 0.3
+    jitter: float = 0.2
+    error_rate: float = 0.0        # fraction of calls answered with 5xx/429
+    schedule_stops: int = 40       # size of train schedule payloads
+    trains_between: int = 25
+
+
+@dataclass
+class CallLog:
+    calls: Counter = field(default_factory=Counter)
+
+    def add(self, name: str):
+        self.calls[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self.calls)
+
+
+def _jittered(rng: random.Random, seconds: float, jitter: float) -> float:
+    return max(0.0, seconds * (1 + rng.uniform(-jitter, jitter)))
+
+
+def create_llm_app(config: LLMConfig, log: CallLog, seed: int = 1) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    words = ("Your train is on schedule and the details you asked for are listed above. "
+             "Let me know if you need anything else for the journey. ").split()
+
+    def answer(system: str, user: str) -> Tuple[str, str]:
+        if "intent classifier" in system:
+            try:
+                items = json.loads(user)
+            except ValueError:
+                items = None
+            if isinstance(items, list):
+                return "classify_batch", json.dumps([{"id": i["id"], **classify(i["message"])} for i in items])
+            return "classify", json.dumps(classify(user))
+        if "several things at once" in system:
+            schemas, _ = json.JSONDecoder().raw_decode(system, system.index("{"))
+            tasks = [{"intent": intent, "params": extract(list(schema), user)} for intent, schema in schemas.items()]
+            return "extract_tasks", json.dumps(tasks)
+        if "parameter extraction" in system:
+            names = re.search(r"Required parameters: \[(.*?)\]", system)
+            names = re.findall(r"'([^']+)'", names.group(1)) if names else []
+            return "extract_params", json.dumps(extract(names, user))
+        return "completion", "OK"
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user = messages[-1]["content"] if messages else ""
+
+        if body.get("stream"):
+            log.add("stream")
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        kind, content = answer(system, user)
+        log.add(kind)
+        await asyncio.sleep(_jittered(rng, config.latency, config.jitter))
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        }
+
+    async def stream():
+        await asyncio.sleep(_jittered(rng, config.latency, config.jitter))
+        delay = 1.0 / config.token_rate if config.token_rate > 0 else 0.0
+        for i in range(config.answer_tokens):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": words[i % len(words)] + " "}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            if delay:
+                await asyncio.sleep(delay)
+        yield "data: [DONE]\n\n"
+
+    @app.get("/calls")
+    async def calls():
+        return log.snapshot()
+
+    return app
+
+
+# ---- IRCTC --------------------------------------------------------------------
+
+def _wrap(data):
+    return {"status": True, "message": "Success", "timestamp": 1760000000000, "data": data}
+
+
+def irctc_payloads(config: IRCTCConfig) -> Dict[str, dict]:
+    stations = ["NDLS", "GZB", "CNB", "PRYJ", "DDU", "PNBE", "ASN", "HWH", "BCT", "BRC", "RTM", "KOTA", "SWM", "MTJ"]
+    route = [
+        {
+            "station_code": stations[i % len(stations)] + (str(i // len(stations)) if i >= len(stations) else ""),
+            "station_name": f"Station {i}",
+            "sta": f"{(6 + i) % 24:02d}:00",
+            "std": f"{(6 + i) % 24:02d}:05",
+            "day": 1 + (6 + i) // 24,
+            "distance_from_source": i * 42,
+            "platform_number": 1 + i % 6,
+            "stop": True,
+        }
+        for i in range(config.schedule_stops)
+    ]
+    trains = [
+        {
+            "train_number": f"{12301 + i}",
+            "train_name": f"EXPRESS {i}",
+            "from_std": f"{(5 + i) % 24:02d}:30",
+            "to_sta": f"{(17 + i) % 24:02d}:10",
+            "duration": "15:40",
+            "class_type": ["1A", "2A", "3A", "SL"],
+            "run_days": ["Mon", "Wed", "Fri"],
+        }
+        for i in range(config.trains_between)
+    ]
+    return {
+        "/api/v3/getPNRStatus": _wrap({
+            "Pnr": "2345678901", "TrainNo": "12951", "TrainName": "MUMBAI RAJDHANI",
+            "Doj": "02-11-2026", "BoardingPoint": "NDLS", "ReservationUpto": "MMCT",
+            "Class": "3A", "ChartPrepared": False,
+            "PassengerStatus": [
+                {"Number": n, "BookingStatusNew": f"B{n}/{20 + n}", "CurrentStatusNew": "CNF"} for n in range(1, 4)
+            ],
+        }),
+        "/api/v3/trainBetweenStations": _wrap(trains),
+        "/api/v1/getTrainSchedule": _wrap({"train_number": "12951", "route": route}),
+        "/api/v1/liveTrainStatus": _wrap({
+            "train_number": "12951", "train_name": "MUMBAI RAJDHANI",
+            "current_station_name": "KOTA JN", "delay": 12, "status_as_of": "5 min ago",
+        }),
+        "/api/v2/checkSeatAvailability": _wrap([
+            {"date": f"{d:02d}-11-2026", "current_status": f"AVAILABLE-{40 - d}", "total_fare": 1850} for d in range(2, 8)
+        ]),
+        "/api/v1/getFare": _wrap({"general": [{"classType": "3A", "fare": 1850}]}),
+        "/api/v1/SearchTrain": _wrap([{"train_number": "12951", "train_name": "MUMBAI RAJDHANI"}]),
+        "/api/v1/SearchStation": _wrap([{"code": "NDLS", "name": "NEW DELHI"}]),
+    }
+
+
+def create_irctc_app(config: IRCTCConfig, log: CallLog, seed: int = 2) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    # Serialized once; large schedules are then served without re-encoding.
+    payloads = {path: json.dumps(body).encode() for path, body in irctc_payloads(config).items()}
+
+    @app.get("/calls")
+    async def calls():
+        return log.snapshot()
+
+    @app.get("/{path:path}")
+    async def endpoint(path: str):
+        path = "/" + path
+        log.add(path)
+        await asyncio.sleep(_jittered(rng, config.latency, config.jitter))
+        if config.error_rate and rng.random() < config.error_rate:
+            log.add("error")
+            status = rng.choice((429, 500, 503))
+            return JSONResponse({"status": False, "message": "Injected upstream error"}, status_code=status)
+        body = payloads.get(path)
+        if body is None:
+            return JSONResponse({"status": False, "message": "Not found"}, status_code=404)
+        return StreamingResponse(iter([body]), media_type="application/json")
+
+    return app
+
+
+# ---- serving -------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class UpstreamServers:
+    """Runs the fake servers on an event loop in a background thread."""
+
+    def __init__(
+        self,
+        llm: Optional[LLMConfig] = None,
+        irctc: Optional[IRCTCConfig] = None,
+        llm_port: int = 0,
+        irctc_port: int = 0,
+    ):
+        self.llm_log = CallLog()
+        self.irctc_log = CallLog()
+        self.llm_port = llm_port or free_port()
+        self.irctc_port = irctc_port or free_port()
+        self._servers = [
+            self._server(create_llm_app(llm or LLMConfig(), self.llm_log), self.llm_port),
+            self._server(create_irctc_app(irctc or IRCTCConfig(), self.irctc_log), self.irctc_port),
+        ]
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _server(app, port: int) -> uvicorn.Server:
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+        return uvicorn.Server(config)
+
+    @property
+    def llm_url(self) -> str:
+        return f"http://127.0.0.1:{self.llm_port}/v1/chat/completions"
+
+    @property
+    def irctc_url(self) -> str:
+        return f"http://127.0.0.1:{self.irctc_port}"
+
+    def start(self):
+        async def serve():
+            await asyncio.gather(*(server.serve() for server in self._servers))
+
+        self._thread = threading.Thread(target=asyncio.run, args=(serve(),), daemon=True, name="fake-upstreams")
+        self._thread.start()
+        while not all(server.started for server in self._servers):
+            if not self._thread.is_alive():
+                raise RuntimeError("fake upstream servers failed to start")
+            threading.Event().wait(0.02)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-port", type=int, default=9101)
+    parser.add_argument("--irctc-port", type=int, default=9102)
+    parser.add_argument("--llm-latency-ms", type=float, default=150)
+    parser.add_argument("--llm-token-rate", type=float, default=50)
+    parser.add_argument("--llm-answer-tokens", type=int, default=60)
+    parser.add_argument("--irctc-latency-ms", type=float, default=300)
+    parser.add_argument("--irctc-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    servers = UpstreamServers(
+        LLMConfig(
+            latency=args.llm_latency_ms / 1000,
+            token_rate=args.llm_token_rate,
+            answer_tokens=args.llm_answer_tokens,
+        ),
+        IRCTCConfig(latency=args.irctc_latency_ms / 1000, error_rate=args.irctc_error_rate),
+        llm_port=args.llm_port,
+        irctc_port=args.irctc_port,
+    ).start()
+    print(f"HF_API_URL={servers.llm_url}")
+    print(f"RAPIDAPI_BASE_URL={servers.irctc_url}")
+    try:
+        servers._thread.join()
+    except KeyboardInterrupt:
+        servers.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""In-process stand-ins for upstream services, used by the benchmarks."""
+import asyncio
+import json
+import re
+
+INTENT_KEYWORDS = [
+    ("pnr", ("domain", "pnr_status")),
+    ("live", ("domain", "live_status")),
+    ("schedule", ("domain", "train_schedule")),
+    ("seat", ("domain", "seat_availability")),
+    ("fare", ("domain", "get_fare")),
+    ("between", ("domain", "train_between_stations")),
+    ("hello", ("small_talk", "greeting")),
+    ("thank", ("small_talk", "thanks")),
+    ("bye", ("small_talk", "farewell")),
+]
+
+
+def stub_classify(message: str) -> dict:
+    text = message.lower()
+    for keyword, (category, intent) in INTENT_KEYWORDS:
+        if keyword in text:
+            return {"category": category, "intent": intent}
+    return {"category": "out_of_scope", "intent": None}
+
+
+class StubLLMClient:
+    """
+    Mimics ``LLMClient.generate`` for classification prompts.
+
+    Each call costs ``base_latency`` plus ``per_item_latency`` for every item
+    it answers, and at most ``slots`` calls run at once, which is how a hosted
+    inference endpoint behaves under a per-key concurrency limit.
+    """
+
+    def __init__(self, base_latency: float = 0.25, per_item_latency: float = 0.01, slots: int = 8):
+        self.base_latency = base_latency
+        self.per_item_latency = per_item_latency
+        self._slots = asyncio.Semaphore(slots)
+        self.calls = 0
+
+    async def generate(self, messages: list, max_tokens: int = 256) -> str:
+        self.calls += 1
+        content = messages[-1]["content"]
+        try:
+            items = json.loads(content)
+        except ValueError:
+            items = None
+
+        async with self._slots:
+            if isinstance(items, list):
+                await asyncio.sleep(self.base_latency + self.per_item_latency * len(items))
+                return json.dumps([{"id": item["id"], **stub_classify(item["message"])} for item in items])
+
+            await asyncio.sleep(self.base_latency + self.per_item_latency)
+            return json.dumps(stub_classify(content))
+
+    async def generate_stream(self, messages: list):
+        answer = "Here is what I found for you."
+        for word in re.findall(r"\S+\s*", answer):
+            await asyncio.sleep(self.per_item_latency)
+            yield word
+
+
+def openai_sse_body(tokens: int, model: str = "stub-model") -> bytes:
+    """An OpenAI-style ``chat.completion.chunk`` SSE stream of ``tokens`` chunks."""
+    words = "The train is running on time and will reach the next station shortly ".split()
+    events = []
+    for i in range(tokens):
+        chunk = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": words[i % len(words)] + " "}, "finish_reason": None}],
+        }
+        events.append(f"data: {json.dumps(chunk)}\n\n")
+    events.append("data: [DONE]\n\n")
+    return "".join(events).encode()
+
+
+def patch_llm_transport(body: bytes):
+    """Make ``LLMClient`` talk to an in-process transport that replays ``body``."""
+    import httpx
+    from app.service.llm import llm_client
+
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+    )
+    real_client = httpx.AsyncClient
+
+    class _Client(real_client):
+        def __init__(self, *args, **kwargs):
+            kwargs["transport"] = transport
+            super().__init__(*args, **kwargs)
+
+    llm_client.httpx.AsyncClient = _Client
+    return lambda: setattr(llm_client.httpx, "AsyncClient", real_client)
@@ -0,0 +1,115 @@
+"""
+Batch evaluation: run logged user questions through the chat pipeline.
+
+Input is JSONL, one ``{"conversation_id", "message"}`` per line (turns of one
+conversation in order). Output is JSONL, one result per turn as it finishes
+(``index``, intent, params, reply, data cards, stage timings), followed by a
+summary line; the summary is also printed.
+
+By default the file is posted to a running server's
+``/api/v1/admin/chat/batch`` (admin token required), so the run shares that
+process's caches, batcher and upstream pools with live traffic. ``--local``
+runs the same ``BatchRunner`` in this process instead.
+
+    python -m scripts.chat_batch questions.jsonl results.jsonl --url http://localhost:8000 --token $TOKEN
+    python -m scripts.chat_batch questions.jsonl results.jsonl --local --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+
+async def run_remote(args, out) -> dict:
+    summary = {}
+    headers = {"Authorization": f"Bearer {args.token}", "Content-Type": "application/x-ndjson"}
+    with open(args.input, "rb") as fh:
+        body = fh.read()
+    async with httpx.AsyncClient(base_url=args.url, timeout=httpx.Timeout(30.0, read=None)) as client:
+        async with client.stream(
+            "POST", "/api/v1/admin/chat/batch", params={"concurrency": args.concurrency},
+            headers=headers, content=body,
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise SystemExit(f"batch request failed [{response.status_code}]: {response.text}")
+            done = 0
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "summary" in record:
+                    summary = record["summary"]
+                    continue
+                out.write(line + "\n")
+                done += 1
+                if done % 100 == 0:
+                    print(f"{done} turns", file=sys.stderr)
+    return summary
+
+
+async def run_local(args, out) -> dict:
+    from app.core import lifecycle
+    from app.core.config import get_settings
+    from app.main import create_app
+    from app.service.chat.batch_runner import BatchRunner
+
+    settings = get_settings()
+    container = create_app().container
+    await lifecycle.warm_up(container, settings.WARMUP_CONNECTIONS, settings.WARMUP_TIMEOUT_SECONDS)
+    with open(args.input, encoding="utf-8") as fh:
+        items = [json.loads(line) for line in fh if line.strip()]
+    runner = BatchRunner(
+        container.chat_service(),
+        concurrency=args.concurrency,
+        rate_limiter=container.rate_limiter(),
+        admission=container.admission_controller(),
+    )
+    try:
+        async for result in runner.run(items):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        await lifecycle.close(container)
+    return {"run_id": runner.run_id, **runner.stats.summary()}
+
+
+def print_summary(summary: dict):
+    print(f"{summary['turns']} turns, {summary['errors']} errors in {summary['elapsed_s']} s "
+          f"({summary['turns_per_s']} turns/s)")
+    if summary.get("throttled_s"):
+        print(f"waited {summary['throttled_s']} s for the rate limiter / admission control")
+    turn = summary["turn_ms"]
+    if turn["p50"] is not None:
+        print(f"turn          p50 {turn['p50']:8.1f} ms | p95 {turn['p95']:8.1f} ms | p99 {turn['p99']:8.1f} ms")
+    for stage, values in summary["stage_ms"].items():
+        print(f"{stage:13s} p50 {values['p50']:8.1f} ms | p95 {values['p95']:8.1f} ms | "
+              f"total {values['total'] / 1000:8.1f} s over {values['count']} turns")
+    print("intents       " + ", ".join(f"{k} {v}" for k, v in summary["intents"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL of {conversation_id, message}")
+    parser.add_argument("output", help="JSONL results (one line per turn)")
+    parser.add_argument("--url", default="http://localhost:8000", help="server to run the batch on")
+    parser.add_argument("--token", default=os.environ.get("CHAT_BATCH_TOKEN", ""),
+                        help="admin access token (default $CHAT_BATCH_TOKEN)")
+    parser.add_argument("--local", action="store_true", help="run in this process instead of on a server")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    if not args.local and not args.token:
+        raise SystemExit("--token (or CHAT_BATCH_TOKEN) is required unless --local is given")
+
+    with open(args.output, "w", encoding="utf-8") as out:
+        summary = asyncio.run(run_local(args, out) if args.local else run_remote(args, out))
+        if summary:
+            out.write(json.dumps({"summary": summary}) + "\n")
+    if summary:
+        print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Offline training and evaluation of the kNN intent index.
+
+Examples are JSONL, one ``{"text", "category", "intent"}`` per line.
+
+    python -m scripts.intent_index train data/intents.jsonl var/intent_index
+    python -m scripts.intent_index eval  data/intents_holdout.jsonl var/intent_index
+"""
+import argparse
+import json
+import time
+from collections import Counter
+
+from app.service.llm.knn_classifier import KNNIntentClassifier
+
+
+def read_examples(path):
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def train(args):
+    started = time.perf_counter()
+    count = KNNIntentClassifier.build(
+        read_examples(args.examples),
+        args.index,
+        dim=args.dim,
+        ngram_min=args.ngram_min,
+        ngram_max=args.ngram_max,
+    )
+    print(f"Indexed {count} examples into {args.index} in {time.perf_counter() - started:.2f}s")
+
+
+def evaluate(args):
+    classifier = KNNIntentClassifier.load(args.index, k=args.k, threshold=args.threshold)
+    examples = read_examples(args.examples)
+
+    answered = correct = 0
+    confusions = Counter()
+    for example in examples:
+        expected = (example["category"], example.get("intent") or None)
+        result = classifier.classify(example["text"])
+        if result is None:
+            continue
+        answered += 1
+        predicted = (result["category"], result["intent"])
+        if predicted == expected:
+            correct += 1
+        else:
+            confusions[(expected, predicted)] += 1
+
+    total = len(examples)
+    print(f"examples:  {total}")
+    print(f"coverage:  {answered / total:.1%} answered locally at threshold {args.threshold}")
+    print(f"ambiguous: {classifier.ambiguous} confident but left to the LLM as possibly multi-intent")
+    print(f"precision: {correct / answered:.1%}" if answered else "precision: n/a")
+    for (expected, predicted), count in confusions.most_common(10):
+        print(f"  {count:4d}  {expected} -> {predicted}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_train = sub.add_parser("train", help="build an index from labelled examples")
+    p_train.add_argument("examples")
+    p_train.add_argument("index")
+    p_train.add_argument("--dim", type=int, default=2048)
+    p_train.add_argument("--ngram-min", type=int, default=3)
+    p_train.add_argument("--ngram-max", type=int, default=5)
+    p_train.set_defaults(func=train)
+
+    p_eval = sub.add_parser("eval", help="measure coverage and precision on held-out examples")
+    p_eval.add_argument("examples")
+    p_eval.add_argument("index")
+    p_eval.add_argument("--k", type=int, default=5)
+    p_eval.add_argument("--threshold", type=float, default=0.6)
+    p_eval.set_defaults(func=evaluate)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,27 @@
 import { API_BASE_URL, ENDPOINTS } from '../utils/constants';
 import { storage } from '../utils/storage';
 
+// Parses one SSE block ("event: x\ndata: ...\ndata: ...") into { event, data }.
+const parseEvent = (block) => {
+  let event = 'message';
+  const data = [];
+
+  for (const line of block.split('\n')) {
+    if (!line || line.startsWith(':')) continue;
+    const colon = line.indexOf(':');
+    const field = colon === -1 ? line : line.slice(0, colon);
+    let value = colon === -1 ? '' : line.slice(colon + 1);
+    if (value.startsWith(' ')) value = value.slice(1);
+
+    if (field === 'event') event = value;
+    else if (field === 'data') data.push(value);
+  }
+
+  return data.length ? { event, data: data.join('\n') } : null;
+};
+
 export const chatAPI = {
-  async sendMessage(conversationId, message, onToken) {
+  async sendMessage(conversationId, message, { onToken, onData } = {}) {
     const token = storage.getAccessToken();
     const url = `${API_BASE_URL}${ENDPOINTS.CHAT}`;
 
@@ -24,22 +43,34 @@ export const chatAPI = {
 
     const reader = response.body.getReader();
     const decoder = new TextDecoder();
+    let buffer = '';
+
+    const dispatch = (block) => {
+      const parsed = parseEvent(block);
+      if (!parsed) return;
+
+      if (parsed.event === 'data') {
+        if (onData) onData(JSON.parse(parsed.data));
+      } else if (onToken) {
+        // "token" events, and untyped events from older servers
+        onToken(parsed.data);
+      }
+    };
 
     while (true) {
       const { done, value } = await reader.read();
       if (done) break;
 
-      const chunk = decoder.decode(value);
-      const lines = chunk.split('\n');
-
-      for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          const token = line.slice(6);
-          if (token && onToken) {
-            onToken(token);
-          }
-        }
+      // Events may be split across network chunks; only complete blocks are parsed.
+      buffer += decoder.decode(value, { stream: true }).replace(/\r\n?/g, '\n');
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        dispatch(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
       }
     }
+
+    if (buffer.trim()) dispatch(buffer);
   },
-};
\ No newline at end of file
+};
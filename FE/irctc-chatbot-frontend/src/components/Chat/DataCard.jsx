@@ -0,0 +1,92 @@
+import React from 'react';
+
+// Small key/value row used by the card layouts below
+const Row = ({ label, value }) =>
+  value === undefined || value === null || value === '' ? null : (
+    <div className="flex justify-between gap-4">
+      <span className="text-gray-500">{label}</span>
+      <span className="font-medium text-right">{String(value)}</span>
+    </div>
+  );
+
+const PnrStatus = ({ card }) => (
+  <>
+    <div className="font-semibold mb-1">PNR {card.pnr}</div>
+    <Row label="Train" value={card.train} />
+    <Row label="Date" value={card.date} />
+    <Row label="Route" value={card.from && card.to ? `${card.from} → ${card.to}` : null} />
+    <Row label="Class" value={card.class} />
+    <Row label="Chart" value={card.chart_prepared ? 'Prepared' : 'Not prepared'} />
+    {(card.passengers || []).map((p, idx) => (
+      <Row key={idx} label={`Passenger ${p.number ?? idx + 1}`} value={p.current || p.booking} />
+    ))}
+  </>
+);
+
+const TrainList = ({ card }) => (
+  <>
+    <div className="font-semibold mb-1">{card.total} train(s) found</div>
+    {(card.trains || []).map((t) => (
+      <Row
+        key={t.number}
+        label={`${t.number} ${t.name || ''}`}
+        value={[t.departs, t.arrives].filter(Boolean).join(' → ')}
+      />
+    ))}
+  </>
+);
+
+const LiveStatus = ({ card }) => (
+  <>
+    <div className="font-semibold mb-1">{card.train}</div>
+    <Row label="Now at" value={card.current_station} />
+    <Row label="Delay (min)" value={card.delay_minutes} />
+    <Row label="As of" value={card.as_of} />
+  </>
+);
+
+const TrainSchedule = ({ card }) => (
+  <>
+    <div className="font-semibold mb-1">Schedule</div>
+    {(card.stops || []).map((s, idx) => (
+      <Row key={`${s.code}-${idx}`} label={s.name || s.code} value={s.departs || s.arrives} />
+    ))}
+  </>
+);
+
+const SeatAvailability = ({ card }) => (
+  <>
+    <div className="font-semibold mb-1">Seat availability</div>
+    {(card.days || []).map((d) => (
+      <Row key={d.date} label={d.date} value={d.status} />
+    ))}
+  </>
+);
+
+const TaskError = ({ card }) => (
+  <>
+    <div className="font-semibold mb-1">{card.intent.replace(/_/g, ' ')}</div>
+    <div className="text-red-600">{card.error}</div>
+  </>
+);
+
+const LAYOUTS = {
+  pnr_status: PnrStatus,
+  train_list: TrainList,
+  live_status: LiveStatus,
+  train_schedule: TrainSchedule,
+  seat_availability: SeatAvailability,
+  task_error: TaskError,
+};
+
+// Renders the structured "data" event streamed before the text answer
+export const DataCard = ({ card }) => {
+  const Layout = LAYOUTS[card.type];
+  if (!Layout) return null;
+
+  return (
+    <div className="data-card bg-white text-gray-800 rounded-lg p-2 mb-2 text-sm space-y-1">
+      <Layout card={card} />
+    </div>
+  );
+};
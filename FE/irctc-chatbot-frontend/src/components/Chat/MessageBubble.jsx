@@ -1,4 +1,5 @@
 import React from 'react';
+import { DataCard } from './DataCard';
 
 // Common classes for a clean chat bubble design are assumed
 export const MessageBubble = ({ message }) => {
@@ -24,7 +25,12 @@ export const MessageBubble = ({ message }) => {
     <div className={wrapperClasses}>
       {/* 2. Inner div for the actual styled message bubble */}
       <div className={bubbleClasses}>
-        {/* 3. Render the message content */}
+        {/* 3. Structured result cards (arrive before the text answer) */}
+        {(message.cards || []).map((card, idx) => (
+          <DataCard key={idx} card={card} />
+        ))}
+
+        {/* 4. Render the message content */}
         {message.content}
       </div>
     </div>
@@ -9,13 +9,13 @@ export const useChat = (conversationId) => {
     setMessages(prev => [...prev, { role, content }]);
   }, []);
 
-  const updateLastMessage = useCallback((content) => {
+  const updateLastMessage = useCallback((patch) => {
     setMessages(prev => {
       const newMessages = [...prev];
       if (newMessages.length > 0) {
         newMessages[newMessages.length - 1] = {
           ...newMessages[newMessages.length - 1],
-          content,
+          ...patch,
         };
       }
       return newMessages;
@@ -29,16 +29,23 @@ export const useChat = (conversationId) => {
     setIsTyping(true);
 
     let assistantMessage = '';
+    let cards = [];
     addMessage('assistant', '');
 
     try {
-      await chatAPI.sendMessage(conversationId, message, (token) => {
-        assistantMessage += token;
-        updateLastMessage(assistantMessage);
+      await chatAPI.sendMessage(conversationId, message, {
+        onToken: (token) => {
+          assistantMessage += token;
+          updateLastMessage({ content: assistantMessage });
+        },
+        onData: (card) => {
+          cards = [...cards, card];
+          updateLastMessage({ cards });
+        },
       });
     } catch (error) {
       console.error('Error sending message:', error);
-      updateLastMessage('❌ Sorry, I encountered an error. Please try again.');
+      updateLastMessage({ content: '❌ Sorry, I encountered an error. Please try again.' });
     } finally {
       setIsTyping(false);
     }